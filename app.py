@@ -26,10 +26,16 @@ def admin_menu(session: dict):
         divider()
         print("  [1] Reset & Reseed Database")
         print("  [2] View All Employees")
+        print("  [3] Show Storage Profile")
+        print("  [4] Write Queue Metrics")
+        from db.database import DB_MODE
+        if DB_MODE == "memory":
+            print("  [5] Checkpoint In-Memory Database to Disk")
         print("  [0] Back to Main Menu")
         divider()
 
-        choice = get_choice("Select option: ", ["1", "2", "0"])
+        options = ["1", "2", "3", "4", "0"] + (["5"] if DB_MODE == "memory" else [])
+        choice = get_choice("Select option: ", options)
 
         if not choice or choice == "0":
             return
@@ -47,22 +53,21 @@ def admin_menu(session: dict):
             pause()
 
         elif choice == "2":
-            from db.database import get_connection
-            conn = get_connection()
-            rows = conn.execute("""
-                SELECT
-                    e.id,
-                    e.first_name || ' ' || e.last_name AS name,
-                    d.name  AS department,
-                    r.name  AS role,
-                    r.permission_level AS level,
-                    CASE WHEN e.is_active = 1 THEN 'Active' ELSE 'Inactive' END AS status
-                FROM employees e
-                JOIN departments d ON e.department_id = d.id
-                JOIN roles r       ON e.role_id       = r.id
-                ORDER BY r.permission_level DESC, d.name
-            """).fetchall()
-            conn.close()
+            from db.database import connection
+            with connection() as conn:
+                rows = conn.execute("""
+                    SELECT
+                        e.id,
+                        e.first_name || ' ' || e.last_name AS name,
+                        d.name  AS department,
+                        r.name  AS role,
+                        r.permission_level AS level,
+                        CASE WHEN e.is_active = 1 THEN 'Active' ELSE 'Inactive' END AS status
+                    FROM employees e
+                    JOIN departments d ON e.department_id = d.id
+                    JOIN roles r       ON e.role_id       = r.id
+                    ORDER BY r.permission_level DESC, d.name
+                """).fetchall()
 
             print()
             print(f"  {C.BOLD}All Employees — Use ID to log in{C.RESET}\n")
@@ -82,6 +87,23 @@ def admin_menu(session: dict):
             divider()
             pause()
 
+        elif choice == "3":
+            from db.database import print_profile
+            print()
+            print_profile()
+            pause()
+
+        elif choice == "4":
+            from db.writer import print_metrics
+            print()
+            print_metrics()
+            pause()
+
+        elif choice == "5":
+            from db.database import checkpoint
+            checkpoint()
+            pause()
+
 
 # ── Main Menu ─────────────────────────────────────────────────
 
@@ -0,0 +1 @@
+# Latency benchmarks over synthetic datasets; run with python benchmarks/run.py
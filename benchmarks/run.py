@@ -0,0 +1,312 @@
+# Latency benchmarks for the OLTP paths and the business reports.
+#
+# For each scale factor a synthetic dataset is generated with
+# modules/datagen.py (cached in benchmarks/data/, keyed on the generator
+# and schema sources) and copied to a scratch file, so the write
+# benchmarks never change the cached data. Every operation gets a few
+# untimed warm-up calls, then is timed in --repeats rounds that share its
+# --seconds and --iterations budget (at least MIN_SAMPLES calls a round).
+# Each latency is the median of the per-round p50/p95/p99, saved as JSON
+# with its spread (slowest minus fastest round).
+#
+# With a baseline (benchmarks/baseline.json by default) the run fails if
+# an operation got more than --threshold slower on --metric, and by more
+# than SPREAD_FACTOR times the larger spread of the two runs and at least
+# MIN_DELTA_MS, so run-to-run noise never fails the gate. Baselines are
+# only comparable on the machine that recorded them; re-record with
+# --save-baseline after changing hardware.
+#
+#   python benchmarks/run.py                          scales 0.1 and 1, compare with baseline
+#   python benchmarks/run.py --scales 1,10 --only 'report:*'
+#   python benchmarks/run.py --save-baseline
+#   python benchmarks/run.py --compare benchmarks/last_run.json
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import math
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db import migrations
+from db.database import close_pool, set_db_path, set_profile
+from db.profiles import PROFILES
+from modules import datagen
+from benchmarks.workloads import OPERATIONS, Workload
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+RESULTS_PATH = os.path.join(BENCH_DIR, 'last_run.json')
+DATASET_SOURCES = [datagen.__file__, migrations.__file__, migrations.SCHEMA_PATH]
+
+DEFAULT_SCALES = "0.1,1"
+DEFAULT_SECONDS = 2.0
+DEFAULT_ITERATIONS = 2_000
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_REPEATS = 5
+WARMUP_CALLS = 3
+MIN_SAMPLES = 5          # per round
+SPREAD_FACTOR = 2.0      # a regression must exceed this many round spreads...
+MIN_DELTA_MS = 0.1       # ...and this many milliseconds
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "mean_ms")
+
+
+# ── Datasets ─────────────────────────────────────────────────
+
+def dataset_path(scale: float, seed: int) -> str:
+    """Cached dataset for scale and seed, generated on first use."""
+    digest = hashlib.sha256()
+    for path in DATASET_SOURCES:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    path = os.path.join(DATA_DIR, f"sf{scale:g}-seed{seed}-{digest.hexdigest()[:12]}.db")
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        print(f"[BENCH] Generating scale {scale:g} dataset...")
+        datagen.generate(path + ".tmp", scale, seed, force=True, quiet=True)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def dataset_rows(path: str) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        return {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                for t in ("employees", "customers", "products", "orders", "order_items")}
+    finally:
+        conn.close()
+
+
+# ── Measurement ──────────────────────────────────────────────
+
+def percentile(ordered: list, q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def summarize(samples: list, errors: int, busy: float) -> dict:
+    ordered = sorted(samples)
+    ms = lambda s: round(s * 1000, 4)
+    return {
+        "samples":   len(ordered),
+        "errors":    errors,
+        "mean_ms":   ms(sum(ordered) / len(ordered)),
+        "p50_ms":    ms(percentile(ordered, 0.50)),
+        "p95_ms":    ms(percentile(ordered, 0.95)),
+        "p99_ms":    ms(percentile(ordered, 0.99)),
+        "max_ms":    ms(ordered[-1]),
+        "ops_per_s": round(len(ordered) / busy, 1) if busy else None,
+    }
+
+
+def combine(rounds: list) -> dict:
+    """Median of each round's figures, with the spread of the latency metrics."""
+    result = {"rounds":  len(rounds),
+              "samples": sum(r["samples"] for r in rounds),
+              "errors":  sum(r["errors"] for r in rounds)}
+    for key in METRICS + ("max_ms", "ops_per_s"):
+        values = [r[key] for r in rounds if r[key] is not None]
+        result[key] = round(statistics.median(values), 4) if values else None
+    result["spread"] = {m: round(max(r[m] for r in rounds) - min(r[m] for r in rounds), 4)
+                        for m in METRICS}
+    return result
+
+
+def measure(op, workload: Workload, seconds: float, iterations: int,
+            repeats: int = DEFAULT_REPEATS) -> dict:
+    clock = time.perf_counter
+    for _ in range(WARMUP_CALLS):
+        try:
+            op.call(*op.make_args(workload))
+        except Exception:
+            pass
+
+    rounds = []
+    for _ in range(repeats):
+        samples, errors, busy = [], 0, 0.0
+        deadline = clock() + seconds / repeats
+        limit = max(MIN_SAMPLES, iterations // repeats)
+        while len(samples) < limit and (len(samples) < MIN_SAMPLES or clock() < deadline):
+            args = op.make_args(workload)
+            started = clock()
+            try:
+                done = op.call(*args)
+            except Exception:
+                done = False
+            elapsed = clock() - started
+            samples.append(elapsed)
+            busy += elapsed
+            errors += not done
+        rounds.append(summarize(samples, errors, busy))
+    return combine(rounds)
+
+
+def run_scale(scale: float, source: str, seed: int, patterns: list, seconds: float,
+              iterations: int, repeats: int) -> dict:
+    work = os.path.join(DATA_DIR, f"work-{os.getpid()}.db")
+    shutil.copyfile(source, work)
+    set_db_path(work)
+    try:
+        workload = Workload(seed)
+        results = {}
+        for op in OPERATIONS:
+            if patterns and not any(fnmatch.fnmatch(op.name, p) for p in patterns):
+                continue
+            results[op.name] = measure(op, workload, seconds, iterations, repeats)
+            r = results[op.name]
+            print(f"  {scale:>6g}  {op.name:<40}  {r['samples']:>6}  {r['p50_ms']:>9.3f}  "
+                  f"{r['p95_ms']:>9.3f}  {r['p99_ms']:>9.3f}  {r['ops_per_s']:>9,.0f}"
+                  + (f"  ({r['errors']} error(s))" if r["errors"] else ""))
+    finally:
+        close_pool()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(work + suffix):
+                os.remove(work + suffix)
+    return {"dataset": dataset_rows(source), "operations": results}
+
+
+def run(scales: list, seed: int = 42, patterns: list = None, seconds: float = DEFAULT_SECONDS,
+        iterations: int = DEFAULT_ITERATIONS, profile: str = None,
+        repeats: int = DEFAULT_REPEATS) -> dict:
+    """Benchmark every operation at every scale. Returns the results document."""
+    if profile:
+        set_profile(profile)
+    sources = {scale: dataset_path(scale, seed) for scale in scales}
+    print(f"\n  {'SCALE':>6}  {'OPERATION':<40}  {'N':>6}  {'P50 MS':>9}  {'P95 MS':>9}  "
+          f"{'P99 MS':>9}  {'OPS/S':>9}")
+    print("  " + "-" * 100)
+    results = {f"{scale:g}": run_scale(scale, source, seed, patterns or [], seconds,
+                                           iterations, repeats)
+               for scale, source in sources.items()}
+    return {
+        "meta": {
+            "created":    datetime.now().isoformat(timespec="seconds"),
+            "seed":       seed,
+            "seconds":    seconds,
+            "iterations": iterations,
+            "repeats":    repeats,
+            "profile":    profile or os.environ.get("ERP_DB_PROFILE", "oltp"),
+            "python":     platform.python_version(),
+            "sqlite":     sqlite3.sqlite_version,
+            "platform":   platform.platform(),
+        },
+        "scales": results,
+    }
+
+
+# ── Baselines ────────────────────────────────────────────────
+
+def load_results(path: str) -> dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_results(path: str, results: dict):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD,
+            metric: str = "p50_ms") -> list:
+    """One {scale, operation, baseline, current, change, noise, regressed} per shared operation.
+
+    noise is the smallest slowdown in milliseconds that counts: SPREAD_FACTOR
+    times the larger round spread of the two runs, and at least MIN_DELTA_MS.
+    """
+    rows = []
+    for scale, data in current["scales"].items():
+        base_ops = baseline.get("scales", {}).get(scale, {}).get("operations", {})
+        for name, result in data["operations"].items():
+            if name not in base_ops:
+                continue
+            before, now = base_ops[name][metric], result[metric]
+            change = (now - before) / before if before else 0.0
+            spread = max(base_ops[name].get("spread", {}).get(metric, 0.0),
+                         result.get("spread", {}).get(metric, 0.0))
+            noise = max(SPREAD_FACTOR * spread, MIN_DELTA_MS)
+            rows.append({
+                "scale":     scale,
+                "operation": name,
+                "baseline":  before,
+                "current":   now,
+                "change":    change,
+                "noise":     noise,
+                "regressed": change > threshold and now - before > noise,
+            })
+    return rows
+
+
+def print_comparison(rows: list, metric: str, threshold: float) -> int:
+    print(f"\n  Compared with baseline on {metric} (threshold +{threshold:.0%}):\n")
+    print(f"  {'SCALE':>6}  {'OPERATION':<40}  {'BASELINE':>10}  {'CURRENT':>10}  {'CHANGE':>8}  "
+          f"{'NOISE':>8}  RESULT")
+    print("  " + "-" * 106)
+    for r in rows:
+        print(f"  {r['scale']:>6}  {r['operation']:<40}  {r['baseline']:>10.3f}  {r['current']:>10.3f}  "
+              f"{r['change']:>+8.1%}  {r['noise']:>8.3f}  {'REGRESSED' if r['regressed'] else 'ok'}")
+    return sum(r["regressed"] for r in rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark OLTP operations and reports")
+    parser.add_argument("--scales", default=DEFAULT_SCALES,
+                        help=f"comma-separated scale factors (default {DEFAULT_SCALES})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="comma-separated operation name patterns, e.g. 'report:*'")
+    parser.add_argument("--seconds", type=float, default=DEFAULT_SECONDS,
+                        help="time budget per operation")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS,
+                        help="maximum calls per operation")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS,
+                        help=f"timed rounds per operation; figures are their median (default {DEFAULT_REPEATS})")
+    parser.add_argument("--profile", choices=list(PROFILES), help="storage profile to use")
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to save the results")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline to compare with")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the results as the new baseline instead of comparing")
+    parser.add_argument("--compare", metavar="RESULTS",
+                        help="compare a saved results file instead of running")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown as a fraction (default 0.25 = 25%%)")
+    parser.add_argument("--metric", choices=METRICS, default="p50_ms")
+    args = parser.parse_args()
+
+    if args.compare:
+        results = load_results(args.compare)
+    else:
+        scales = [float(s) for s in args.scales.split(",") if s.strip()]
+        patterns = [p.strip() for p in args.only.split(",")] if args.only else None
+        results = run(scales, args.seed, patterns, args.seconds, args.iterations, args.profile,
+                      args.repeats)
+        save_results(args.output, results)
+        print(f"\n[BENCH] Results saved to {os.path.relpath(args.output)}.")
+
+    if args.save_baseline:
+        save_results(args.baseline, results)
+        print(f"[BENCH] Baseline saved to {os.path.relpath(args.baseline)}.")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"[BENCH] No baseline at {os.path.relpath(args.baseline)}; "
+              f"nothing to compare (use --save-baseline).")
+        sys.exit(0)
+
+    rows = compare(results, load_results(args.baseline), args.threshold, args.metric)
+    regressions = print_comparison(rows, args.metric, args.threshold)
+    print()
+    if regressions:
+        print(f"[BENCH] {regressions} of {len(rows)} operation(s) regressed.")
+    else:
+        print(f"[BENCH] No regressions across {len(rows)} operation(s).")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,145 @@
+# The operations the benchmarks time, as headless calls into the modules.
+#
+# Each Operation pairs an untimed argument maker with the timed call, so
+# drawing random ids and building order lines never shows up in the
+# latency. Arguments come from a Workload seeded like the dataset, so two
+# runs against the same dataset issue the same calls.
+
+import os
+import random
+import sys
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db.database import connection
+from db.writer import run_write
+from modules.auth import find_employee
+from modules.customers import REGIONS, find_customers, insert_customer
+from modules.order_service import place_order, set_order_status
+from modules.orders import get_order_detail
+from modules.reports import REPORT_MENU
+
+SEARCH_TERMS = ["apex", "harbor lo", "summit", "core sol", "north", "metro build",
+                "west", "zen", "contact12", "ridge retail", "midwest", "tech"]
+STATUS_POOL = 1_000       # pending orders the status-update benchmark cycles through
+MAX_ORDER_LINES = 5
+
+
+class Operation:
+    __slots__ = ("name", "group", "make_args", "call")
+
+    def __init__(self, name: str, group: str, make_args, call):
+        self.name = name
+        self.group = group
+        self.make_args = make_args
+        self.call = call
+
+
+class Workload:
+    """Ids and random state the operations draw their arguments from."""
+
+    def __init__(self, seed: int = 42):
+        self.rng = random.Random(f"{seed}:workload")
+        self.added = 0
+        with connection() as conn:
+            self.employee_ids = [r[0] for r in conn.execute(
+                "SELECT id FROM employees WHERE is_active = 1 ORDER BY id")]
+            self.customer_ids = [r[0] for r in conn.execute(
+                "SELECT id FROM customers WHERE is_active = 1 ORDER BY id")]
+            self.product_ids = [r[0] for r in conn.execute("SELECT id FROM products ORDER BY id")]
+            self.max_order_id = conn.execute("SELECT MAX(id) FROM orders").fetchone()[0] or 1
+            pending = [r[0] for r in conn.execute(
+                "SELECT id FROM orders WHERE status = 'pending' ORDER BY id DESC LIMIT ?",
+                (STATUS_POOL,))]
+        # order id -> status it is in now; cycled pending <-> cancelled
+        self.status = dict.fromkeys(pending, "pending")
+        self._cycle = deque(pending)
+
+
+# ── Argument makers ──────────────────────────────────────────
+
+def _login_args(w: Workload) -> tuple:
+    return (w.rng.choice(w.employee_ids),)
+
+
+def _search_args(w: Workload) -> tuple:
+    return (w.rng.choice(SEARCH_TERMS),)
+
+
+def _customer_args(w: Workload) -> tuple:
+    w.added += 1
+    n = w.added
+    return (f"Benchmark Customer {n}", f"bench{n}.{w.rng.randrange(10**9)}@example.com",
+            f"555-01{n % 100:02d}", w.rng.choice(REGIONS).title())
+
+
+def _order_args(w: Workload) -> tuple:
+    lines = [(w.rng.choice(w.product_ids), w.rng.randint(1, 3))
+             for _ in range(w.rng.randint(1, MAX_ORDER_LINES))]
+    return (w.rng.choice(w.customer_ids), w.rng.choice(w.employee_ids), lines)
+
+
+def _status_args(w: Workload) -> tuple:
+    if not w._cycle:
+        return (None, None)
+    order_id = w._cycle[0]
+    w._cycle.rotate(-1)
+    new_status = "cancelled" if w.status[order_id] == "pending" else "pending"
+    w.status[order_id] = new_status
+    return (order_id, new_status)
+
+
+def _detail_args(w: Workload) -> tuple:
+    return (w.rng.randint(1, w.max_order_id),)
+
+
+# ── Timed calls ──────────────────────────────────────────────
+# Each returns False when the call did not do what was asked.
+
+def _login(emp_id: int) -> bool:
+    return find_employee(emp_id) is not None
+
+
+def _search(term: str) -> bool:
+    find_customers(term)
+    return True
+
+
+def _add_customer(name: str, email: str, phone: str, region: str) -> bool:
+    return bool(run_write(insert_customer, name, email, phone, region))
+
+
+def _create_order(customer_id: int, employee_id: int, lines: list) -> bool:
+    return place_order(customer_id, employee_id, lines, allow_backorder=True)["ok"]
+
+
+def _update_status(order_id: int, new_status: str) -> bool:
+    if order_id is None:
+        return False
+    run_write(set_order_status, order_id, new_status, None, True)
+    return True
+
+
+def _order_detail(order_id: int) -> bool:
+    return get_order_detail(order_id)[0] is not None
+
+
+def _report(fn):
+    def run() -> bool:
+        deque(fn(stream=True), maxlen=0)
+        return True
+    return run
+
+
+OPERATIONS = [
+    Operation("login",           "oltp", _login_args,    _login),
+    Operation("customer_search", "oltp", _search_args,   _search),
+    Operation("order_detail",    "oltp", _detail_args,   _order_detail),
+    *[Operation(f"report:{fn.__name__}", "report", lambda w: (), _report(fn))
+      for _, fn in REPORT_MENU],
+    # Writes last, so the reports see the generated dataset unchanged
+    Operation("add_customer",    "oltp", _customer_args, _add_customer),
+    Operation("create_order",    "oltp", _order_args,    _create_order),
+    Operation("update_status",   "oltp", _status_args,   _update_status),
+]
@@ -1,41 +1,350 @@
 import sqlite3
 import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
 
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'erp.db')
-SCHEMA_PATH = os.path.join(os.path.dirname(__file__), 'schema.sql')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db.profiles import PROFILES, apply_profile, profile_from_env, read_settings
+from db import migrations
+
+DB_PATH = os.environ.get("ERP_DB_PATH") or os.path.join(os.path.dirname(__file__), '..', 'erp.db')
 SEED_PATH = os.path.join(os.path.dirname(__file__), 'seed.sql')
 
+POOL_SIZE = int(os.environ.get("ERP_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = 30.0          # seconds to wait for a free pooled connection
+STATEMENT_CACHE_SIZE = 256   # prepared statements kept per connection
+BUSY_RETRIES = 6             # attempts for a write that keeps hitting SQLITE_BUSY
+BUSY_BACKOFF = 0.02          # seconds, doubled per attempt (plus jitter)
+
+# "disk" (default) or "memory" — see db/memory.py
+DB_MODE = os.environ.get("ERP_DB_MODE", "disk").strip().lower()
+CHECKPOINT_INTERVAL = float(os.environ.get("ERP_DB_CHECKPOINT_SECONDS", "60"))
+
+_active_profile = profile_from_env()
+_memory = None
+_memory_lock = threading.Lock()
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+
+def get_connection(profile: str = None):
+    # Opens a new, fully configured connection. Most callers should use
+    # connection() / transaction() below, which reuse pooled connections.
+    options = dict(cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+    if DB_MODE == "memory":
+        conn = _memory_db().connect(**options)
+    else:
+        conn = sqlite3.connect(DB_PATH, **options)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
+    apply_profile(conn, profile or _active_profile)
     return conn
 
 
+# ── Storage Profiles ─────────────────────────────────────────
+
+def get_profile() -> str:
+    return _active_profile
+
+
+def set_profile(name: str):
+    """Switch the storage profile used for every new connection."""
+    global _active_profile
+    if name not in PROFILES:
+        raise ValueError(f"Unknown profile '{name}'. Choose from: {', '.join(PROFILES)}")
+    _active_profile = name
+    close_pool()   # pooled connections were configured for the old profile
+
+
+def set_db_path(path: str):
+    """Point every new connection at another database file, e.g. a generated one."""
+    global DB_PATH
+    DB_PATH = path
+    close_pool()
+
+
+def _maintenance_profile() -> str:
+    # Schema setup has to write, even when the process runs read-only.
+    return "oltp" if PROFILES[_active_profile]["query_only"] else _active_profile
+
+
+def describe_profile() -> dict:
+    """Active profile name, its configured settings and the values SQLite reports."""
+    with connection() as conn:
+        effective = read_settings(conn)
+    return {
+        "profile":    _active_profile,
+        "configured": dict(PROFILES[_active_profile]),
+        "effective":  effective,
+    }
+
+
+def print_profile():
+    info = describe_profile()
+    print(f"[DB] Active storage profile: {info['profile']}")
+    for key, value in info["configured"].items():
+        print(f"       {key:<13} = {str(value):<10} (effective: {info['effective'][key]})")
+
+
+# ── In-Memory Mode ───────────────────────────────────────────
+
+def _memory_db():
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                from db.memory import MemoryDatabase
+                from db import golden
+
+                mem = MemoryDatabase(DB_PATH, interval=CHECKPOINT_INTERVAL,
+                                     journal_mode=PROFILES[_maintenance_profile()]["journal_mode"])
+                source = DB_PATH if os.path.exists(DB_PATH) else golden.ensure()
+                mem.load(source)
+                mem.start()
+                print(f"[DB] In-memory mode: loaded {os.path.basename(source)}, "
+                      f"checkpoint every {CHECKPOINT_INTERVAL:g}s")
+                _memory = mem
+    return _memory
+
+
+def checkpoint():
+    """Write the in-memory database back to erp.db (no-op in disk mode)."""
+    if DB_MODE != "memory" or _memory is None:
+        return None
+    seconds = _memory.checkpoint()
+    print(f"[DB] Checkpointed in-memory database to disk in {seconds * 1000:.1f} ms.")
+    return seconds
+
+
+# ── Connection Pool ──────────────────────────────────────────
+
+class ConnectionPool:
+    """Bounded pool of long-lived connections.
+
+    A thread keeps the same connection for the whole of a (possibly nested)
+    connection() block, and idle connections are handed out LIFO, so a
+    single-threaded caller keeps reusing one connection and its warm
+    prepared-statement cache.
+    """
+
+    def __init__(self, factory=get_connection, max_size: int = POOL_SIZE):
+        self._factory = factory
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._idle = []
+        self._open = set()
+        self.max_size = max_size
+
+    def acquire(self, timeout: float = POOL_TIMEOUT) -> sqlite3.Connection:
+        lease = getattr(self._local, "lease", None)
+        if lease is not None:
+            lease[1] += 1
+            return lease[0]
+
+        if not self._slots.acquire(timeout=timeout):
+            raise sqlite3.OperationalError(
+                f"connection pool exhausted ({self.max_size} connections in use)"
+            )
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            try:
+                conn = self._factory()
+            except BaseException:
+                self._slots.release()
+                raise
+            with self._lock:
+                self._open.add(conn)
+
+        self._local.lease = [conn, 1]
+        return conn
+
+    def held(self) -> sqlite3.Connection | None:
+        """The connection this thread is leasing, or None."""
+        lease = getattr(self._local, "lease", None)
+        return lease[0] if lease is not None else None
+
+    def release(self, conn: sqlite3.Connection):
+        lease = self._local.lease
+        if lease is None or lease[0] is not conn:
+            raise RuntimeError("connection released by a thread that does not hold it")
+        lease[1] -= 1
+        if lease[1]:
+            return
+        self._local.lease = None
+
+        # Never hand a half-finished transaction to the next caller
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if conn in self._open:
+                self._idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()     # pool was closed while this connection was leased
+        self._slots.release()
+
+    def close_all(self):
+        # Closes idle connections now; leased ones are closed on release.
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._open.clear()
+        for conn in idle:
+            conn.close()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool, _pool_pid
+    # Connections must never cross a fork, so a child process starts its own pool
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool()
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close_all()
+        _pool = None
+
+
+@contextmanager
+def connection():
+    """Borrow this thread's pooled connection for the duration of the block."""
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def transaction(immediate: bool = False):
+    """Pooled connection that commits on success and rolls back on error.
+
+    immediate=True takes the write lock up front (BEGIN IMMEDIATE), so the
+    reads inside the block cannot be invalidated by another writer.
+    Nested transaction() blocks join the outermost one.
+    """
+    with connection() as conn:
+        if conn.in_transaction:
+            yield conn
+            return
+        if immediate:
+            conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def is_busy_error(e: Exception) -> bool:
+    msg = str(e).lower()
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in msg or "busy" in msg)
+
+
+def run_in_transaction(fn, *args, retries: int = BUSY_RETRIES):
+    """Run fn(conn, *args) in its own BEGIN IMMEDIATE transaction.
+
+    The whole unit is retried with exponential backoff when the database
+    stays busy past the connection's busy_timeout.
+    """
+    for attempt in range(retries):
+        try:
+            with transaction(immediate=True) as conn:
+                return fn(conn, *args)
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or attempt == retries - 1:
+                raise
+            time.sleep(BUSY_BACKOFF * 2 ** attempt * (1 + random.random()))
+
+
+# ── Setup ────────────────────────────────────────────────────
+
 def initialize_db(seed: bool = True):
-    conn = get_connection()
-    with open(SCHEMA_PATH, 'r') as f:
-        conn.executescript(f.read())
-    if seed:
-        cur = conn.execute("SELECT COUNT(*) FROM departments")
-        if cur.fetchone()[0] == 0:
-            with open(SEED_PATH, 'r') as f:
-                conn.executescript(f.read())
-            print("[DB] Database initialized and seeded successfully.")
-        else:
-            print("[DB] Database already contains data — skipping seed.")
-    conn.commit()
-    conn.close()
+    # Fast path: an up-to-date database costs one PRAGMA read on the pooled
+    # connection — no schema file is opened and nothing is written.
+    with connection() as conn:
+        version = migrations.current_version(conn)
+    if version >= migrations.latest_version():
+        return
+
+    conn = get_connection(profile=_maintenance_profile())
+    try:
+        # seed.sql is baseline data: load it at version 1, so the later
+        # migrations backfill it (reservations, ledger, summaries, ...)
+        # exactly as they would an upgraded database.
+        migrations.migrate(conn, target=1)
+        if seed:
+            cur = conn.execute("SELECT COUNT(*) FROM departments")
+            if cur.fetchone()[0] == 0:
+                with open(SEED_PATH, 'r') as f:
+                    conn.executescript(f.read())
+                print("[DB] Database initialized and seeded successfully.")
+            else:
+                print("[DB] Database already contains data — skipping seed.")
+        conn.commit()
+        migrations.migrate(conn)
+    finally:
+        conn.close()
 
 
 def reset_db():
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
-        print("[DB] Existing database removed.")
-    initialize_db(seed=True)
+    # Restores the prebuilt golden image instead of replaying schema + seed;
+    # the image is rebuilt automatically when schema.sql, seed.sql or the
+    # migrations change.
+    from db import golden
+
+    if DB_MODE == "memory":
+        _memory_db().load(golden.ensure())
+        method = "memory"
+    else:
+        if not os.path.exists(DB_PATH):
+            close_pool()
+            for suffix in ("-wal", "-shm"):
+                if os.path.exists(DB_PATH + suffix):
+                    os.remove(DB_PATH + suffix)
+        method = golden.restore(DB_PATH)
+    print(f"[DB] Database restored from golden image ({method}).")
     print("[DB] Database reset complete.")
 
 
 if __name__ == '__main__':
-    initialize_db()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ERP database utilities")
+    parser.add_argument("command", nargs="?", default="init", choices=["init", "reset", "profile", "version", "golden"])
+    parser.add_argument("--profile", choices=list(PROFILES), help="storage profile to use")
+    args = parser.parse_args()
+
+    if args.profile:
+        set_profile(args.profile)
+
+    if args.command == "init":
+        initialize_db()
+    elif args.command == "reset":
+        reset_db()
+    elif args.command == "profile":
+        print_profile()
+    elif args.command == "golden":
+        from db import golden
+        golden.build()
+    elif args.command == "version":
+        with connection() as conn:
+            version = migrations.current_version(conn)
+        print(f"[DB] Schema version {version} (latest {migrations.latest_version()})")
@@ -0,0 +1,110 @@
+# Prebuilt "golden" database image used by reset_db.
+#
+# The image is built once in memory from the migrations and seed.sql, then
+# written to db/golden/ with the sqlite3 backup API. Its file name carries
+# the schema version and a hash of schema.sql, seed.sql, migrations.py and
+# this file, so editing any of them makes the next reset rebuild the image.
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db import migrations
+
+DB_DIR = os.path.dirname(__file__)
+GOLDEN_DIR = os.path.join(DB_DIR, 'golden')
+SEED_PATH = os.path.join(DB_DIR, 'seed.sql')
+SOURCES = [
+    migrations.SCHEMA_PATH,
+    SEED_PATH,
+    os.path.join(DB_DIR, 'migrations.py'),
+    os.path.join(DB_DIR, 'golden.py'),
+]
+
+
+def content_hash() -> str:
+    digest = hashlib.sha256()
+    for path in SOURCES:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def golden_path() -> str:
+    name = f"golden-v{migrations.latest_version()}-{content_hash()}.db"
+    return os.path.join(GOLDEN_DIR, name)
+
+
+def build(path: str = None) -> str:
+    """Build the golden image from schema + seed and return its path."""
+    path = path or golden_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    mem = sqlite3.connect(":memory:")
+    mem.execute("PRAGMA foreign_keys = ON")
+    # Seed at the baseline, then migrate, as initialize_db does
+    migrations.migrate(mem, target=1)
+    with open(SEED_PATH, 'r') as f:
+        mem.executescript(f.read())
+    mem.commit()
+    migrations.migrate(mem)
+
+    # Write to a temp file and rename, so a crash never leaves a half image
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    dest = sqlite3.connect(tmp)
+    mem.backup(dest)
+    dest.close()
+    mem.close()
+    os.replace(tmp, path)
+
+    # Images for older schema/seed versions are no longer useful
+    for name in os.listdir(GOLDEN_DIR):
+        stale = os.path.join(GOLDEN_DIR, name)
+        if name.startswith("golden-") and stale != path:
+            os.remove(stale)
+
+    print(f"[DB] Built golden image {os.path.basename(path)}")
+    return path
+
+
+def ensure() -> str:
+    """Path of a golden image matching the current sources, building it if needed."""
+    path = golden_path()
+    if not os.path.exists(path):
+        build(path)
+    return path
+
+
+def restore(db_path: str) -> str:
+    """Replace db_path with the golden image. Returns the method used.
+
+    An existing database is overwritten in place with a backup-API page
+    copy, which takes the normal SQLite locks, so other open connections
+    simply see the reset data. A missing database is created by file copy.
+    """
+    image = ensure()
+
+    if os.path.exists(db_path):
+        src = sqlite3.connect(f"file:{image}?mode=ro", uri=True)
+        dest = sqlite3.connect(db_path, timeout=30)
+        try:
+            src.backup(dest)
+        finally:
+            dest.close()
+            src.close()
+        return "backup"
+
+    tmp = db_path + ".tmp"
+    shutil.copyfile(image, tmp)
+    os.replace(tmp, db_path)
+    return "copy"
+
+
+if __name__ == '__main__':
+    build()
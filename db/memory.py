@@ -0,0 +1,168 @@
+# In-memory database mode for simulations and test runs.
+#
+# Every connection in the process attaches to one shared in-memory database
+# (SQLite's memdb VFS, so normal locking and busy timeouts still apply).
+# It is loaded from erp.db — or the golden seed image when erp.db does not
+# exist — with the backup API, and written back to erp.db the same way on
+# an interval, at exit, or on demand via checkpoint().
+#
+# A database file records WAL mode in its header, a copy carries it along,
+# and memdb cannot open a database marked WAL. load() therefore stages the
+# file in a private in-memory database with the header set to rollback
+# journal before copying it in, and checkpoint() puts erp.db back into the
+# disk profile's journal mode after writing it.
+
+import atexit
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+MEMORY_URI = "file:/erp-sim?vfs=memdb"
+
+
+class MemoryDatabase:
+
+    def __init__(self, db_path: str, interval: float = 60.0, journal_mode: str = "WAL"):
+        self.db_path = db_path
+        self.journal_mode = journal_mode
+        self.interval = interval
+        self.checkpoints = 0
+        self.last_checkpoint = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # The anchor keeps the shared in-memory database alive for the process
+        self._anchor = sqlite3.connect(MEMORY_URI, uri=True, check_same_thread=False)
+
+    def connect(self, **kwargs) -> sqlite3.Connection:
+        return sqlite3.connect(MEMORY_URI, uri=True, **kwargs)
+
+    def load(self, path: str):
+        """Replace the in-memory contents with the database at path."""
+        src = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        stage = sqlite3.connect(":memory:")
+        try:
+            image = bytearray(src.serialize())
+            image[18:20] = b"\x01\x01"   # file format read/write versions: 1 = rollback, 2 = WAL
+            stage.deserialize(bytes(image))
+            with self._lock:
+                stage.backup(self._anchor)
+        finally:
+            stage.close()
+            src.close()
+
+    def checkpoint(self) -> float:
+        """Copy the in-memory database to disk. Returns the seconds taken."""
+        start = time.perf_counter()
+        dest = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with self._lock:
+                self._anchor.backup(dest)
+            dest.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        finally:
+            dest.close()
+        self.checkpoints += 1
+        self.last_checkpoint = time.time()
+        return time.perf_counter() - start
+
+    def start(self):
+        if self.interval and self.interval > 0:
+            self._thread = threading.Thread(
+                target=self._run, name="erp-memory-checkpoint", daemon=True
+            )
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.checkpoint()
+            except sqlite3.Error as e:
+                print(f"[DB] Periodic checkpoint failed: {e}")
+
+    def close(self, checkpoint: bool = True):
+        if self._anchor is None:
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if checkpoint:
+            self.checkpoint()
+        self._anchor.close()
+        self._anchor = None
+        atexit.unregister(self.close)
+
+
+def roundtrip_check(source: str) -> list:
+    """Copy source to a WAL file on disk, through memory mode and back twice.
+
+    Returns a list of problems; empty when the data, the disk journal mode
+    and a change made in memory all survive. Run in a process that is not
+    itself in memory mode, since both share MEMORY_URI.
+    """
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "erp.db")
+        src, disk = sqlite3.connect(source), sqlite3.connect(path)
+        src.backup(disk)
+        disk.execute("PRAGMA journal_mode = WAL")   # as the disk profiles leave it
+        tables = [r[0] for r in disk.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+            "AND sql NOT LIKE 'CREATE VIRTUAL%'")]
+        expected = {t: disk.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+        disk.close()
+        src.close()
+
+        for round_no in (1, 2):
+            mem = MemoryDatabase(path, interval=0)
+            try:
+                mem.load(path)
+                conn = mem.connect()
+                conn.execute("CREATE TABLE IF NOT EXISTS roundtrip_check (round INTEGER)")
+                conn.execute("INSERT INTO roundtrip_check VALUES (?)", (round_no,))
+                conn.commit()
+                conn.close()
+                mem.checkpoint()
+            except sqlite3.Error as e:
+                problems.append(f"round {round_no}: {e}")
+                break
+            finally:
+                mem.close(checkpoint=False)
+
+            disk = sqlite3.connect(path)
+            try:
+                mode = disk.execute("PRAGMA journal_mode").fetchone()[0]
+                if mode != "wal":
+                    problems.append(f"round {round_no}: erp.db left in {mode} mode")
+                if disk.execute("PRAGMA integrity_check").fetchone()[0] != "ok":
+                    problems.append(f"round {round_no}: integrity check failed")
+                for table, rows in expected.items():
+                    found = disk.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                    if found != rows:
+                        problems.append(f"round {round_no}: {table} has {found} rows, expected {rows}")
+                if disk.execute("SELECT COUNT(*) FROM roundtrip_check").fetchone()[0] != round_no:
+                    problems.append(f"round {round_no}: change made in memory was not written back")
+            finally:
+                disk.close()
+    return problems
+
+
+if __name__ == '__main__':
+    import argparse
+
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from db import golden
+
+    parser = argparse.ArgumentParser(description="In-memory database mode utilities")
+    parser.add_argument("command", choices=["check"])
+    parser.add_argument("source", nargs="?", help="database to copy (default: the golden image)")
+    args = parser.parse_args()
+
+    problems = roundtrip_check(args.source or golden.ensure())
+    for problem in problems:
+        print(f"[DB] Round trip: {problem}")
+    print(f"[DB] Disk -> memory -> disk round trip {'FAILED' if problems else 'passed'}.")
+    sys.exit(1 if problems else 0)
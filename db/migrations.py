@@ -0,0 +1,640 @@
+# Versioned schema migrations, tracked in PRAGMA user_version.
+#
+# Each step is registered with @migration(version, description) and runs
+# once, in version order. schema.sql is the version 1 baseline; every later
+# schema change is a new numbered step at the bottom of this file.
+#
+# Ordinary steps run inside a single transaction together with the
+# user_version bump. Steps registered with online=True manage their own
+# commits (see backfill() below) so a large table is migrated in short
+# batches instead of one long write lock; they must be safe to re-run,
+# because the version is only bumped once the whole step has finished.
+
+import os
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), 'schema.sql')
+
+BACKFILL_BATCH = 5_000   # rows per committed batch in online migrations
+
+MIGRATIONS = []          # (version, description, fn, online), ascending
+
+
+def migration(version: int, description: str, online: bool = False):
+    def register(fn):
+        if MIGRATIONS and version <= MIGRATIONS[-1][0]:
+            raise ValueError(f"Migration {version} registered out of order")
+        MIGRATIONS.append((version, description, fn, online))
+        return fn
+    return register
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pending(conn) -> list:
+    version = current_version(conn)
+    return [m for m in MIGRATIONS if m[0] > version]
+
+
+def migrate(conn, target: int = None) -> list:
+    """Apply every pending migration up to target. Returns the versions applied."""
+    applied = []
+    for version, description, fn, online in pending(conn):
+        if target is not None and version > target:
+            break
+        if online:
+            fn(conn)
+            conn.commit()
+            conn.execute(f"PRAGMA user_version = {version}")
+        else:
+            conn.execute("BEGIN")
+            try:
+                fn(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        print(f"[DB] Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+
+def backfill(conn, table: str, sql: str, batch_size: int = BACKFILL_BATCH) -> int:
+    """Run sql over table in rowid batches, committing after each batch.
+
+    sql receives the batch bounds as two parameters, e.g.
+    "UPDATE t SET x = ... WHERE rowid BETWEEN ? AND ? AND x IS NULL".
+    Returns the number of rows changed.
+    """
+    lo, hi = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table}").fetchone()
+    if lo is None:
+        return 0
+    changed = 0
+    for start in range(lo, hi + 1, batch_size):
+        cur = conn.execute(sql, (start, start + batch_size - 1))
+        conn.commit()
+        changed += max(cur.rowcount, 0)
+    return changed
+
+
+# ── Migrations ───────────────────────────────────────────────
+
+@migration(1, "Baseline schema", online=True)
+def _baseline_schema(conn):
+    # executescript commits as it goes; every statement is IF NOT EXISTS,
+    # so this also adopts databases created before versioning existed.
+    with open(SCHEMA_PATH, 'r') as f:
+        conn.executescript(f.read())
+
+
+@migration(2, "Import checkpoints for resumable bulk imports")
+def _import_checkpoints(conn):
+    # One row per input file; updated in the same transaction as each
+    # imported chunk, so a resumed import never applies a chunk twice.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            source        TEXT    PRIMARY KEY,
+            kind          TEXT    NOT NULL,
+            byte_offset   INTEGER NOT NULL DEFAULT 0,
+            rows_read     INTEGER NOT NULL DEFAULT 0,
+            imported      INTEGER NOT NULL DEFAULT 0,
+            rejected      INTEGER NOT NULL DEFAULT 0,
+            reject_bytes  INTEGER NOT NULL DEFAULT 0,
+            finished      INTEGER NOT NULL DEFAULT 0,
+            updated_at    TEXT    NOT NULL DEFAULT (DATETIME('now'))
+        )
+    """)
+
+
+@migration(3, "Case-insensitive unique index on customer email")
+def _customer_email_nocase(conn):
+    # Lets "email = ? COLLATE NOCASE" lookups use an index instead of
+    # scanning LOWER(email), and enforces case-insensitive uniqueness.
+    # The baseline only had a case-sensitive UNIQUE, so older databases may
+    # hold emails that differ only by case; they get a plain index instead
+    # (add_customer and the bulk import still check for duplicates) until
+    # the duplicates are resolved and the index is recreated.
+    duplicates = conn.execute("""
+        SELECT MIN(email), GROUP_CONCAT(id, ', ')
+        FROM customers
+        GROUP BY email COLLATE NOCASE
+        HAVING COUNT(*) > 1
+    """).fetchall()
+    if not duplicates:
+        conn.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_customers_email_nocase
+            ON customers(email COLLATE NOCASE)
+        """)
+        return
+
+    print(f"[DB] {len(duplicates)} customer email(s) differ only by case; "
+          f"email uniqueness stays case-sensitive:")
+    for email, ids in duplicates:
+        print(f"[DB]   {email} (customer IDs {ids})")
+    print("[DB] Resolve them, then run: DROP INDEX idx_customers_email_nocase; "
+          "CREATE UNIQUE INDEX idx_customers_email_nocase ON customers(email COLLATE NOCASE);")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_customers_email_nocase
+        ON customers(email COLLATE NOCASE)
+    """)
+
+
+_CUSTOMER_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_customers_fts_insert AFTER INSERT ON customers BEGIN
+        INSERT INTO customers_fts (rowid, name, email, region)
+        VALUES (new.id, new.name, new.email, new.region);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_customers_fts_delete AFTER DELETE ON customers BEGIN
+        INSERT INTO customers_fts (customers_fts, rowid, name, email, region)
+        VALUES ('delete', old.id, old.name, old.email, old.region);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_customers_fts_update
+    AFTER UPDATE OF name, email, region ON customers BEGIN
+        INSERT INTO customers_fts (customers_fts, rowid, name, email, region)
+        VALUES ('delete', old.id, old.name, old.email, old.region);
+        INSERT INTO customers_fts (rowid, name, email, region)
+        VALUES (new.id, new.name, new.email, new.region);
+    END
+    """,
+]
+
+
+@migration(4, "FTS5 customer search index")
+def _customer_fts(conn):
+    # External-content FTS5 index over customers, kept in sync by triggers.
+    # SQLite builds without FTS5 skip this step; customer search then falls
+    # back to LIKE scans (see modules/customers.find_customers).
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+                name, email, region,
+                content = 'customers', content_rowid = 'id',
+                prefix = '2 3'
+            )
+        """)
+    except Exception as e:
+        if "fts5" not in str(e):
+            raise
+        print("[DB] FTS5 is not available — customer search will use LIKE.")
+        return
+
+    for sql in _CUSTOMER_FTS_TRIGGERS:
+        conn.execute(sql)
+    conn.execute("INSERT INTO customers_fts (customers_fts) VALUES ('rebuild')")
+
+
+@migration(5, "Change counters for cache invalidation")
+def _table_versions(conn):
+    # table_versions holds a counter per cached data set, bumped by triggers
+    # in the same transaction as the change. Unlike PRAGMA data_version it
+    # also sees writes made on the reading connection itself.
+    #
+    # 'products_catalog' covers the static catalog columns only; stock moves
+    # on every order and is always read live.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name     TEXT    PRIMARY KEY,
+            version  INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO table_versions (name) VALUES ('products_catalog')")
+    bump = "UPDATE table_versions SET version = version + 1 WHERE name = 'products_catalog';"
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_catalog_insert
+        AFTER INSERT ON products BEGIN {bump} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_catalog_delete
+        AFTER DELETE ON products BEGIN {bump} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_catalog_update
+        AFTER UPDATE OF name, category, unit_price, reorder_lvl ON products BEGIN {bump} END
+    """)
+
+
+@migration(6, "Inventory reservations and backorders")
+def _inventory_reservations(conn):
+    # products.stock_qty stays the quantity available to promise; units held
+    # by pending orders move to reserved_qty, units promised without stock
+    # are counted in backorder_qty (see modules/inventory.py).
+    conn.execute("""
+        ALTER TABLE products
+        ADD COLUMN reserved_qty INTEGER NOT NULL DEFAULT 0 CHECK (reserved_qty >= 0)
+    """)
+    conn.execute("""
+        ALTER TABLE products
+        ADD COLUMN backorder_qty INTEGER NOT NULL DEFAULT 0 CHECK (backorder_qty >= 0)
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_reservations (
+            order_id     INTEGER NOT NULL REFERENCES orders(id),
+            product_id   INTEGER NOT NULL REFERENCES products(id),
+            reserved     INTEGER NOT NULL DEFAULT 0 CHECK (reserved >= 0),
+            backordered  INTEGER NOT NULL DEFAULT 0 CHECK (backordered >= 0),
+            PRIMARY KEY (order_id, product_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reservations_backordered
+        ON inventory_reservations(product_id, order_id) WHERE backordered > 0
+    """)
+
+    # Pending orders placed so far already took their units out of
+    # stock_qty; record them as reservations.
+    conn.execute("""
+        INSERT INTO inventory_reservations (order_id, product_id, reserved)
+        SELECT oi.order_id, oi.product_id, SUM(oi.quantity)
+        FROM order_items oi
+        JOIN orders   o ON o.id = oi.order_id
+        JOIN products p ON p.id = oi.product_id
+        WHERE o.status = 'pending' AND p.reorder_lvl > 0
+        GROUP BY oi.order_id, oi.product_id
+    """)
+    conn.execute("""
+        UPDATE products
+        SET reserved_qty = r.total
+        FROM (SELECT product_id, SUM(reserved) AS total
+              FROM inventory_reservations GROUP BY product_id) AS r
+        WHERE products.id = r.product_id
+    """)
+
+
+@migration(7, "Stock movement ledger and snapshots")
+def _inventory_ledger(conn):
+    # Append-only record of every change to products.stock_qty and
+    # reserved_qty (see modules/inventory.py). stock_snapshots holds the
+    # running balance at a movement, so an as-of query reads one snapshot
+    # and the movements after it.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_movements (
+            id              INTEGER PRIMARY KEY,
+            product_id      INTEGER NOT NULL REFERENCES products(id),
+            kind            TEXT    NOT NULL
+                                    CHECK (kind IN ('opening', 'sale', 'ship', 'cancel',
+                                                    'receipt', 'adjustment')),
+            stock_delta     INTEGER NOT NULL DEFAULT 0,
+            reserved_delta  INTEGER NOT NULL DEFAULT 0,
+            order_id        INTEGER REFERENCES orders(id),
+            note            TEXT,
+            created_at      TEXT    NOT NULL DEFAULT (DATETIME('now', 'localtime'))
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_movements_product
+        ON inventory_movements(product_id)
+    """)
+    for action in ("UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_movements_no_{action.lower()}
+            BEFORE {action} ON inventory_movements BEGIN
+                SELECT RAISE(ABORT, 'inventory_movements is append-only');
+            END
+        """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stock_snapshots (
+            product_id    INTEGER NOT NULL REFERENCES products(id),
+            movement_id   INTEGER NOT NULL,   -- last movement included
+            taken_at      TEXT    NOT NULL,   -- created_at of that movement
+            stock_qty     INTEGER NOT NULL,
+            reserved_qty  INTEGER NOT NULL,
+            PRIMARY KEY (product_id, movement_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_snapshots_taken
+        ON stock_snapshots(product_id, taken_at)
+    """)
+
+    # New products start with an opening balance; existing ones get theirs now
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_products_opening_balance
+        AFTER INSERT ON products BEGIN
+            INSERT INTO inventory_movements (product_id, kind, stock_delta, reserved_delta)
+            VALUES (new.id, 'opening', new.stock_qty, new.reserved_qty);
+        END
+    """)
+    conn.execute("""
+        INSERT INTO inventory_movements (product_id, kind, stock_delta, reserved_delta, note)
+        SELECT id, 'opening', stock_qty, reserved_qty, 'balance when the ledger was started'
+        FROM products
+    """)
+
+
+_REORDER_QUEUE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_reorder_queue_insert
+    AFTER INSERT ON products
+    WHEN new.reorder_lvl > 0 AND new.stock_qty < new.reorder_lvl BEGIN
+        INSERT OR IGNORE INTO reorder_queue (product_id) VALUES (new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_reorder_queue_enter
+    AFTER UPDATE OF stock_qty, reorder_lvl ON products
+    WHEN new.reorder_lvl > 0 AND new.stock_qty < new.reorder_lvl
+     AND NOT (old.reorder_lvl > 0 AND old.stock_qty < old.reorder_lvl) BEGIN
+        INSERT OR IGNORE INTO reorder_queue (product_id) VALUES (new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_reorder_queue_leave
+    AFTER UPDATE OF stock_qty, reorder_lvl ON products
+    WHEN NOT (new.reorder_lvl > 0 AND new.stock_qty < new.reorder_lvl)
+     AND old.reorder_lvl > 0 AND old.stock_qty < old.reorder_lvl BEGIN
+        DELETE FROM reorder_queue WHERE product_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_reorder_queue_delete
+    AFTER DELETE ON products BEGIN
+        DELETE FROM reorder_queue WHERE product_id = old.id;
+    END
+    """,
+]
+
+
+@migration(8, "Trigger-maintained reorder queue")
+def _reorder_queue(conn):
+    # reorder_queue holds exactly the tracked products whose available stock
+    # is below their reorder level. The triggers only fire when a product
+    # crosses the threshold, so low-stock reads cost O(products below it).
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS reorder_queue (
+            product_id  INTEGER PRIMARY KEY REFERENCES products(id),
+            queued_at   TEXT    NOT NULL DEFAULT (DATETIME('now', 'localtime'))
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_products_below_reorder
+        ON products(id) WHERE stock_qty < reorder_lvl AND reorder_lvl > 0
+    """)
+    for sql in _REORDER_QUEUE_TRIGGERS:
+        conn.execute(sql)
+    conn.execute("""
+        INSERT OR IGNORE INTO reorder_queue (product_id)
+        SELECT id FROM products WHERE stock_qty < reorder_lvl AND reorder_lvl > 0
+    """)
+
+    # Suggested order: back up to twice the reorder level, plus any backorders
+    conn.execute("""
+        CREATE VIEW IF NOT EXISTS reorder_suggestions AS
+        SELECT
+            p.id                                            AS product_id,
+            p.name                                          AS product,
+            p.category,
+            p.stock_qty                                     AS current_stock,
+            p.reorder_lvl                                   AS reorder_level,
+            p.reorder_lvl - p.stock_qty                     AS units_below_threshold,
+            p.backorder_qty                                 AS backordered,
+            2 * p.reorder_lvl - p.stock_qty + p.backorder_qty AS suggested_qty,
+            p.unit_price,
+            q.queued_at
+        FROM reorder_queue q
+        JOIN products p ON p.id = q.product_id
+    """)
+
+
+_SALES_SUMMARY_ADD = """
+    INSERT INTO sales_by_month (month, orders, revenue_cents)
+    VALUES (STRFTIME('%Y-%m', new.created_at), 1, CAST(ROUND(new.total_amount * 100) AS INTEGER))
+    ON CONFLICT (month) DO UPDATE SET
+        orders = orders + 1, revenue_cents = revenue_cents + excluded.revenue_cents;
+    INSERT INTO sales_by_employee (employee_id, orders, revenue_cents)
+    VALUES (new.employee_id, 1, CAST(ROUND(new.total_amount * 100) AS INTEGER))
+    ON CONFLICT (employee_id) DO UPDATE SET
+        orders = orders + 1, revenue_cents = revenue_cents + excluded.revenue_cents;
+    INSERT INTO sales_by_customer (customer_id, orders, revenue_cents, largest_order)
+    VALUES (new.customer_id, 1, CAST(ROUND(new.total_amount * 100) AS INTEGER), new.total_amount)
+    ON CONFLICT (customer_id) DO UPDATE SET
+        orders = orders + 1, revenue_cents = revenue_cents + excluded.revenue_cents,
+        largest_order = MAX(largest_order, excluded.largest_order);
+"""
+
+# Removing the customer's largest order re-reads that customer's fulfilled
+# orders (idx_orders_customer); every other change is O(1).
+_SALES_SUMMARY_REMOVE = """
+    UPDATE sales_by_month
+    SET orders = orders - 1, revenue_cents = revenue_cents - CAST(ROUND(old.total_amount * 100) AS INTEGER)
+    WHERE month = STRFTIME('%Y-%m', old.created_at);
+    UPDATE sales_by_employee
+    SET orders = orders - 1, revenue_cents = revenue_cents - CAST(ROUND(old.total_amount * 100) AS INTEGER)
+    WHERE employee_id = old.employee_id;
+    UPDATE sales_by_customer
+    SET orders = orders - 1,
+        revenue_cents = revenue_cents - CAST(ROUND(old.total_amount * 100) AS INTEGER),
+        largest_order = CASE WHEN old.total_amount >= largest_order
+                             THEN (SELECT MAX(total_amount) FROM orders
+                                   WHERE customer_id = old.customer_id AND status = 'fulfilled')
+                             ELSE largest_order END
+    WHERE customer_id = old.customer_id;
+"""
+
+
+@migration(9, "Incrementally maintained sales summaries")
+def _sales_summaries(conn):
+    # Fulfilled-order totals by month, employee and customer, kept current
+    # by triggers whenever an order enters or leaves 'fulfilled' (or a
+    # fulfilled order's amount, date, customer or employee changes).
+    # Department and region totals are rolled up from the employee and
+    # customer rows, so they follow the current assignment exactly like
+    # the raw report queries do. Amounts are stored in cents so repeated
+    # adds and removes cannot drift.
+    for table, key in (("sales_by_month", "month TEXT"),
+                       ("sales_by_employee", "employee_id INTEGER"),
+                       ("sales_by_customer", "customer_id INTEGER")):
+        extra = ",\n            largest_order  REAL" if table == "sales_by_customer" else ""
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {key}          PRIMARY KEY,
+                orders         INTEGER NOT NULL DEFAULT 0,
+                revenue_cents  INTEGER NOT NULL DEFAULT 0{extra}
+            )
+        """)
+
+    watched = "status, total_amount, created_at, customer_id, employee_id"
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_sales_insert
+        AFTER INSERT ON orders WHEN new.status = 'fulfilled' BEGIN {_SALES_SUMMARY_ADD} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_sales_delete
+        AFTER DELETE ON orders WHEN old.status = 'fulfilled' BEGIN {_SALES_SUMMARY_REMOVE} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_sales_update_remove
+        AFTER UPDATE OF {watched} ON orders WHEN old.status = 'fulfilled' BEGIN {_SALES_SUMMARY_REMOVE} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_sales_update_add
+        AFTER UPDATE OF {watched} ON orders WHEN new.status = 'fulfilled' BEGIN {_SALES_SUMMARY_ADD} END
+    """)
+
+    # Initial totals for orders fulfilled before the summaries existed
+    conn.execute("""
+        INSERT INTO sales_by_month (month, orders, revenue_cents)
+        SELECT STRFTIME('%Y-%m', created_at), COUNT(*), SUM(CAST(ROUND(total_amount * 100) AS INTEGER))
+        FROM orders WHERE status = 'fulfilled'
+        GROUP BY 1
+    """)
+    conn.execute("""
+        INSERT INTO sales_by_employee (employee_id, orders, revenue_cents)
+        SELECT employee_id, COUNT(*), SUM(CAST(ROUND(total_amount * 100) AS INTEGER))
+        FROM orders WHERE status = 'fulfilled'
+        GROUP BY employee_id
+    """)
+    conn.execute("""
+        INSERT INTO sales_by_customer (customer_id, orders, revenue_cents, largest_order)
+        SELECT customer_id, COUNT(*), SUM(CAST(ROUND(total_amount * 100) AS INTEGER)), MAX(total_amount)
+        FROM orders WHERE status = 'fulfilled'
+        GROUP BY customer_id
+    """)
+
+
+_REPORT_SOURCE_TABLES = ("orders", "customers", "products", "employees",
+                         "departments", "roles")
+
+
+@migration(10, "Change counters for report source tables")
+def _report_table_versions(conn):
+    # One table_versions counter per table the reports read, bumped on any
+    # row change, so cached report results can be checked with a single
+    # read (see modules/report_cache.py).
+    for table in _REPORT_SOURCE_TABLES:
+        conn.execute("INSERT OR IGNORE INTO table_versions (name) VALUES (?)", (table,))
+        bump = f"UPDATE table_versions SET version = version + 1 WHERE name = '{table}';"
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+                AFTER {event} ON {table} BEGIN {bump} END
+            """)
+
+
+_ROW_COUNT_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_row_counts_orders_insert
+    AFTER INSERT ON orders BEGIN
+        INSERT INTO row_counts (name, rows) VALUES ('orders', 1), ('orders/' || new.status, 1)
+        ON CONFLICT (name) DO UPDATE SET rows = rows + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_row_counts_orders_delete
+    AFTER DELETE ON orders BEGIN
+        UPDATE row_counts SET rows = rows - 1 WHERE name IN ('orders', 'orders/' || old.status);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_row_counts_orders_status
+    AFTER UPDATE OF status ON orders WHEN old.status IS NOT new.status BEGIN
+        UPDATE row_counts SET rows = rows - 1 WHERE name = 'orders/' || old.status;
+        INSERT INTO row_counts (name, rows) VALUES ('orders/' || new.status, 1)
+        ON CONFLICT (name) DO UPDATE SET rows = rows + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_row_counts_customers_insert
+    AFTER INSERT ON customers BEGIN
+        INSERT INTO row_counts (name, rows)
+        VALUES ('customers', 1),
+               (CASE new.is_active WHEN 1 THEN 'customers/active' ELSE 'customers/inactive' END, 1)
+        ON CONFLICT (name) DO UPDATE SET rows = rows + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_row_counts_customers_delete
+    AFTER DELETE ON customers BEGIN
+        UPDATE row_counts SET rows = rows - 1
+        WHERE name IN ('customers',
+                       CASE old.is_active WHEN 1 THEN 'customers/active' ELSE 'customers/inactive' END);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_row_counts_customers_active
+    AFTER UPDATE OF is_active ON customers WHEN old.is_active IS NOT new.is_active BEGIN
+        UPDATE row_counts SET rows = rows - 1
+        WHERE name = CASE old.is_active WHEN 1 THEN 'customers/active' ELSE 'customers/inactive' END;
+        INSERT INTO row_counts (name, rows)
+        VALUES (CASE new.is_active WHEN 1 THEN 'customers/active' ELSE 'customers/inactive' END, 1)
+        ON CONFLICT (name) DO UPDATE SET rows = rows + 1;
+    END
+    """,
+]
+
+
+@migration(11, "Keyset pagination indexes and row counts")
+def _keyset_pagination(conn):
+    # The order and customer listings page by seeking on their sort key,
+    # (created_at, id) and (name, id); id is the rowid, which every index
+    # already ends with. idx_orders_status_created also serves every
+    # status-only lookup, so it replaces idx_orders_status.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders(status, created_at)")
+    conn.execute("DROP INDEX IF EXISTS idx_orders_status")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_name ON customers(name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_active_name ON customers(is_active, name)")
+
+    # Listing totals: 'orders', 'orders/<status>', 'customers',
+    # 'customers/active' and 'customers/inactive', kept by triggers so a
+    # page header never has to count.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS row_counts (
+            name  TEXT    PRIMARY KEY,
+            rows  INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for sql in _ROW_COUNT_TRIGGERS:
+        conn.execute(sql)
+    conn.execute("""
+        INSERT INTO row_counts (name, rows)
+        SELECT 'orders', COUNT(*) FROM orders
+        UNION ALL
+        SELECT 'orders/' || status, COUNT(*) FROM orders GROUP BY status
+        UNION ALL
+        SELECT 'customers', COUNT(*) FROM customers
+        UNION ALL
+        SELECT CASE is_active WHEN 1 THEN 'customers/active' ELSE 'customers/inactive' END, COUNT(*)
+        FROM customers GROUP BY is_active
+    """)
+
+
+@migration(12, "Movement counters for automatic stock snapshots")
+def _snapshot_counters(conn):
+    # Movements per product since its last stock snapshot, counted by a
+    # trigger on every ledger insert, so writes can find the products due a
+    # snapshot with one index seek (see modules/inventory.snapshot_due).
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS movements_since_snapshot (
+            product_id  INTEGER PRIMARY KEY REFERENCES products(id),
+            movements   INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_movements_since_snapshot
+        ON movements_since_snapshot(movements)
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_movements_since_snapshot
+        AFTER INSERT ON inventory_movements BEGIN
+            INSERT INTO movements_since_snapshot (product_id, movements) VALUES (new.product_id, 1)
+            ON CONFLICT (product_id) DO UPDATE SET movements = movements + 1;
+        END
+    """)
+    conn.execute("""
+        INSERT INTO movements_since_snapshot (product_id, movements)
+        SELECT m.product_id, COUNT(*)
+        FROM inventory_movements m
+        WHERE m.id > COALESCE((SELECT MAX(movement_id) FROM stock_snapshots s
+                               WHERE s.product_id = m.product_id), 0)
+        GROUP BY m.product_id
+    """)
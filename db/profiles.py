@@ -0,0 +1,74 @@
+# Named storage profiles: the PRAGMA settings applied to every new connection.
+#
+#   oltp                 — default. WAL so reports can read while orders are
+#                          written, one fsync per commit (synchronous=NORMAL).
+#   bulk-load            — large imports / generators. No fsync on commit,
+#                          big page cache, long busy timeout.
+#   read-only-analytics  — report and verification runs. Big cache and mmap,
+#                          and the connection refuses writes (query_only).
+#
+# Select with the ERP_DB_PROFILE environment variable or db.database.set_profile().
+
+import os
+
+DEFAULT_PROFILE = "oltp"
+
+PROFILES = {
+    "oltp": {
+        "journal_mode": "WAL",
+        "synchronous":  "NORMAL",
+        "cache_size":   -64_000,        # KiB (negative = size, not pages)
+        "mmap_size":    256 * 1024**2,
+        "temp_store":   "MEMORY",
+        "busy_timeout": 5_000,          # ms
+        "query_only":   False,
+    },
+    "bulk-load": {
+        "journal_mode": "WAL",
+        "synchronous":  "OFF",
+        "cache_size":   -512_000,
+        "mmap_size":    1024**3,
+        "temp_store":   "MEMORY",
+        "busy_timeout": 30_000,
+        "query_only":   False,
+    },
+    "read-only-analytics": {
+        "journal_mode": "WAL",
+        "synchronous":  "NORMAL",
+        "cache_size":   -256_000,
+        "mmap_size":    1024**3,
+        "temp_store":   "MEMORY",
+        "busy_timeout": 10_000,
+        "query_only":   True,
+    },
+}
+
+# Order matters: the busy timeout must be in place before journal_mode,
+# which may need to wait for a lock.
+PRAGMA_ORDER = [
+    "busy_timeout", "journal_mode", "synchronous",
+    "cache_size", "mmap_size", "temp_store", "query_only",
+]
+
+
+def profile_from_env() -> str:
+    name = os.environ.get("ERP_DB_PROFILE", DEFAULT_PROFILE).strip().lower()
+    if name not in PROFILES:
+        raise ValueError(
+            f"Unknown ERP_DB_PROFILE '{name}'. Choose from: {', '.join(PROFILES)}"
+        )
+    return name
+
+
+def apply_profile(conn, name: str):
+    settings = PROFILES[name]
+    for key in PRAGMA_ORDER:
+        value = settings[key]
+        if isinstance(value, bool):
+            value = "ON" if value else "OFF"
+        conn.execute(f"PRAGMA {key} = {value}")
+
+
+def read_settings(conn) -> dict:
+    # Effective values as reported by SQLite, for display and verification.
+    return {key: conn.execute(f"PRAGMA {key}").fetchone()[0] for key in PRAGMA_ORDER}
@@ -1,3 +1,6 @@
+-- Baseline schema (migration 1). Later changes are numbered steps in
+-- db/migrations.py; the applied version is stored in PRAGMA user_version.
+
 PRAGMA foreign_keys = ON;
 
 -- ------------------------------------------------------------
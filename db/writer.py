@@ -0,0 +1,247 @@
+# Group-commit write queue.
+#
+# A write unit is a callable fn(conn, *args) that performs one logical write
+# (e.g. an order with its line items, stock and customer updates) on the
+# connection it is given and returns a result. It must not commit.
+#
+# A single writer thread drains the queue, runs up to max_batch units inside
+# one BEGIN IMMEDIATE ... COMMIT, and wraps each unit in its own SAVEPOINT:
+# a failing unit is rolled back alone and its caller gets the exception,
+# while the rest of the batch shares a single commit (and a single fsync).
+#
+# Enable with start_writer() or ERP_GROUP_COMMIT=1; modules go through
+# run_write(), which falls back to run_in_transaction() when it is off.
+# A unit that itself calls run_write() runs inline in its own batch, and a
+# caller already inside a write transaction on its pooled connection runs
+# the unit in that transaction; queueing either would wait on itself.
+# With the default max latency of 0 the writer commits whatever queued up
+# while the previous batch was committing; a few milliseconds of extra wait
+# (ERP_GROUP_COMMIT_LATENCY_MS) only pays off when every commit fsyncs.
+
+import atexit
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db.database import get_connection, get_pool, is_busy_error, run_in_transaction
+
+MAX_BATCH = int(os.environ.get("ERP_GROUP_COMMIT_BATCH", "128"))
+MAX_LATENCY = float(os.environ.get("ERP_GROUP_COMMIT_LATENCY_MS", "0")) / 1000
+BEGIN_RETRIES = 5
+
+
+class GroupCommitWriter:
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_latency: float = MAX_LATENCY):
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue = queue.Queue()
+        self._thread = None
+        self._conn = None
+        self._started_at = None
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.units = 0
+        self.failed_units = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.commit_seconds = 0.0
+
+    # ── Lifecycle ──
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="erp-group-commit", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # Drains everything already queued before the thread exits
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    # ── Producers ──
+
+    def submit(self, fn, *args) -> Future:
+        if self._thread is None:
+            raise RuntimeError("group-commit writer is not running")
+        future = Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def execute(self, fn, *args):
+        if threading.current_thread() is self._thread:
+            return self._run_nested(fn, args)
+        return self.submit(fn, *args).result()
+
+    def _run_nested(self, fn, args):
+        # Called from a unit on the writer thread: join the open batch
+        conn = self._conn
+        conn.execute("SAVEPOINT nested_write")
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK TO nested_write")
+            conn.execute("RELEASE nested_write")
+            raise
+        conn.execute("RELEASE nested_write")
+        return result
+
+    # ── Writer thread ──
+
+    def _run(self):
+        conn = self._conn = get_connection()
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.perf_counter() + self.max_latency
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._commit_batch(conn, batch)
+        finally:
+            self._conn = None
+            conn.close()
+
+    def _begin(self, conn):
+        for attempt in range(BEGIN_RETRIES):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt == BEGIN_RETRIES - 1:
+                    raise
+                time.sleep(0.01 * 2 ** attempt)
+
+    def _commit_batch(self, conn, batch):
+        start = time.perf_counter()
+        outcomes = []
+        try:
+            self._begin(conn)
+            for future, fn, args in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT write_unit")
+                try:
+                    result = fn(conn, *args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_unit")
+                    conn.execute("RELEASE write_unit")
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute("RELEASE write_unit")
+                    outcomes.append((future, result, None))
+            conn.commit()
+        except Exception as e:
+            # The batch as a whole could not be committed: every unit fails
+            if conn.in_transaction:
+                conn.rollback()
+            for future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            self.failed_units += len(batch)
+            self.units += len(batch)
+            return
+
+        self.commit_seconds += time.perf_counter() - start
+        self.batches += 1
+        self.units += len(outcomes)
+        self.largest_batch = max(self.largest_batch, len(outcomes))
+        for future, result, error in outcomes:
+            if error is not None:
+                self.failed_units += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    # ── Metrics ──
+
+    def metrics(self) -> dict:
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "running":          self.running,
+            "queued":           self._queue.qsize(),
+            "units":            self.units,
+            "failed_units":     self.failed_units,
+            "batches":          self.batches,
+            "avg_batch_size":   round(self.units / self.batches, 2) if self.batches else 0.0,
+            "largest_batch":    self.largest_batch,
+            "units_per_sec":    round(self.units / elapsed, 1) if elapsed else 0.0,
+            "avg_commit_ms":    round(self.commit_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+            "max_batch":        self.max_batch,
+            "max_latency_ms":   self.max_latency * 1000,
+        }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> GroupCommitWriter | None:
+    return _writer
+
+
+def start_writer(max_batch: int = MAX_BATCH, max_latency: float = MAX_LATENCY) -> GroupCommitWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = GroupCommitWriter(max_batch=max_batch, max_latency=max_latency)
+            _writer.start()
+            atexit.register(stop_writer)
+    return _writer
+
+
+def stop_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
+
+
+def run_write(fn, *args):
+    """Run a write unit through the group-commit writer, or inline if it is off."""
+    if _writer is None and os.environ.get("ERP_GROUP_COMMIT") == "1":
+        start_writer()
+    if _writer is not None:
+        held = get_pool().held()
+        if held is not None and held.in_transaction:
+            # The writer's BEGIN IMMEDIATE would wait on this transaction
+            return fn(held, *args)
+        return _writer.execute(fn, *args)
+    return run_in_transaction(fn, *args)
+
+
+def print_metrics():
+    if _writer is None:
+        print("[DB] Group commit is off — writes commit individually.")
+        return
+    print("[DB] Group-commit write queue")
+    for key, value in _writer.metrics().items():
+        print(f"       {key:<15} = {value}")
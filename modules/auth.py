@@ -5,7 +5,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from db.database import get_connection
+from db.database import connection
 
 
 # ── Permission Levels ────────────────────────────────
@@ -90,6 +90,24 @@ def pause():
     input("  Press Enter to continue...")
 
 
+def find_employee(emp_id: int):
+    """Employee row with role, permission level and department, or None."""
+    with connection() as conn:
+        return conn.execute("""
+            SELECT
+                e.id,
+                e.first_name || ' ' || e.last_name  AS name,
+                e.is_active,
+                r.name                              AS role,
+                r.permission_level                  AS level,
+                d.name                              AS department
+            FROM employees e
+            JOIN roles r       ON e.role_id       = r.id
+            JOIN departments d ON e.department_id = d.id
+            WHERE e.id = ?
+        """, (emp_id,)).fetchone()
+
+
 def login() -> dict | None:
     # Prompt for an employee ID and return a session dict if found and active.
     print_banner()
@@ -111,25 +129,8 @@ def login() -> dict | None:
             continue
 
         emp_id = int(raw)
-        conn = get_connection()
-
-        #TODO: Refactor from here
-        row = conn.execute("""
-            SELECT
-                e.id,
-                e.first_name || ' ' || e.last_name  AS name,
-                e.is_active,
-                r.name                              AS role,
-                r.permission_level                  AS level,
-                d.name                              AS department
-            FROM employees e
-            JOIN roles r       ON e.role_id       = r.id
-            JOIN departments d ON e.department_id = d.id
-            WHERE e.id = ?
-        """, (emp_id,)).fetchone()
-        conn.close()
 
-        #-----------------------------------------------
+        row = find_employee(emp_id)
 
         if not row:
             err(f"No employee found with ID {emp_id}. Try again.")
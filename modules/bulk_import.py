@@ -0,0 +1,598 @@
+# Bulk imports from CSV or JSONL files.
+#
+# Files are streamed, never loaded whole. Rows are applied in chunks; each
+# chunk is one BEGIN IMMEDIATE transaction that also records how far into
+# the file it got (import_checkpoints), so an interrupted import resumes
+# exactly where the last committed chunk ended. Rows that cannot be
+# imported are written to a JSONL reject file together with the reason.
+#
+#   python modules/bulk_import.py orders orders.csv [--employee 1] [--restart]
+#   python modules/bulk_import.py customers customers.jsonl
+
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db.database import connection, run_in_transaction, initialize_db
+from modules.customers import REGIONS, valid_email
+from modules.inventory import record_movements
+
+CHUNK_ROWS = 5_000
+
+
+# ── Reading ──────────────────────────────────────────────────
+
+def _file_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"Unsupported file type '{ext}' (expected .csv or .jsonl)")
+
+
+def _lines(f, position: list):
+    # Decoded lines of f; position holds [byte offset after, lines read]
+    # for the last line handed out, so the caller knows where a record ends.
+    while True:
+        raw = f.readline()
+        if not raw:
+            return
+        position[0] = f.tell()
+        position[1] += 1
+        yield raw.decode("utf-8")
+
+
+def read_rows(path: str, offset: int = 0, line_no: int = 0):
+    """Yield (end_offset, line_no, row) for each record, starting at offset.
+
+    The file is read line by line in binary mode so every record carries the
+    byte offset just after it, which is what checkpoints store. CSV records
+    are parsed by one csv.reader over the whole file, so a quoted field may
+    span lines; the offset is then the end of the record's last line and
+    line_no the line it starts on. line_no counts from the number of data
+    lines already consumed before offset.
+    """
+    fmt = _file_format(path)
+    with open(path, 'rb') as f:
+        fields = None
+        if fmt == "csv":
+            header = f.readline().decode("utf-8-sig")
+            fields = [h.strip().lower() for h in next(csv.reader([header]))]
+            line_no += 1
+        if offset:
+            f.seek(offset)
+        position = [f.tell(), line_no]
+        lines = _lines(f, position)
+
+        if fmt == "csv":
+            reader = csv.reader(lines)
+            while True:
+                first = position[1] + 1
+                try:
+                    values = next(reader)
+                except StopIteration:
+                    break
+                except csv.Error as e:
+                    yield position[0], first, {"_error": f"invalid CSV: {e}"}
+                    continue
+                if not any(v.strip() for v in values):
+                    continue
+                yield position[0], first, {k: (v.strip() or None) for k, v in zip(fields, values)}
+            return
+
+        for raw in lines:
+            text = raw.strip()
+            if not text:
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as e:
+                row = {"_raw": text, "_error": f"invalid JSON: {e}"}
+            yield position[0], position[1], row
+
+
+# ── Checkpoints & Rejects ────────────────────────────────────
+
+def load_checkpoint(source: str):
+    with connection() as conn:
+        return conn.execute(
+            "SELECT * FROM import_checkpoints WHERE source = ?", (source,)
+        ).fetchone()
+
+
+def clear_checkpoint(source: str):
+    run_in_transaction(lambda conn: conn.execute(
+        "DELETE FROM import_checkpoints WHERE source = ?", (source,)
+    ))
+
+
+def save_checkpoint(conn, source: str, kind: str, stats: dict, finished: bool = False):
+    conn.execute("""
+        INSERT INTO import_checkpoints
+            (source, kind, byte_offset, rows_read, imported, rejected, reject_bytes, finished, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, DATETIME('now'))
+        ON CONFLICT(source) DO UPDATE SET
+            byte_offset  = excluded.byte_offset,
+            rows_read    = excluded.rows_read,
+            imported     = excluded.imported,
+            rejected     = excluded.rejected,
+            reject_bytes = excluded.reject_bytes,
+            finished     = excluded.finished,
+            updated_at   = excluded.updated_at
+    """, (source, kind, stats["byte_offset"], stats["rows"], stats["imported"],
+          stats["rejected"], stats["reject_bytes"], int(finished)))
+
+
+class RejectFile:
+    """Append-only JSONL reject log that can be rolled back to a known size."""
+
+    def __init__(self, path: str, size: int = 0):
+        self.path = path
+        mode = 'r+b' if os.path.exists(path) else 'w+b'
+        self._f = open(path, mode)
+        self.rewind(size)
+
+    def rewind(self, size: int):
+        # Drop anything written after the last committed checkpoint
+        self._f.truncate(size)
+        self._f.seek(size)
+
+    def write(self, line_no: int, reason: str, row: dict):
+        record = {"line": line_no, "reason": reason, "row": row}
+        self._f.write((json.dumps(record, default=str) + "\n").encode("utf-8"))
+
+    def sync(self) -> int:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        return self._f.tell()
+
+    def close(self):
+        self._f.close()
+
+
+def _new_stats(checkpoint) -> dict:
+    stats = {"rows": 0, "imported": 0, "rejected": 0, "byte_offset": 0, "reject_bytes": 0}
+    if checkpoint:
+        stats.update(
+            rows=checkpoint["rows_read"], imported=checkpoint["imported"],
+            rejected=checkpoint["rejected"], byte_offset=checkpoint["byte_offset"],
+            reject_bytes=checkpoint["reject_bytes"],
+        )
+    return stats
+
+
+def _report(label: str, stats: dict, rows_this_run: int, seconds: float, done: bool = False):
+    rate = rows_this_run / seconds if seconds else 0.0
+    tail = "done" if done else "..."
+    print(
+        f"[IMPORT] {label}: {stats['rows']:,} rows read, {stats['imported']:,} imported, "
+        f"{stats['rejected']:,} rejected  ({rate:,.0f} rows/s) {tail}"
+    )
+
+
+# ── Orders ───────────────────────────────────────────────────
+# One row per order line. Columns (CSV header or JSON keys):
+#   order_ref                   — rows sharing a ref (consecutively) form one order
+#   customer_id | customer_email
+#   employee_id                 — optional when --employee is given
+#   product_id  | product       — product ID or exact product name
+#   quantity
+#   unit_price                  — optional, defaults to the catalog price
+#   created_at                  — optional, defaults to now
+
+def _group_orders(rows):
+    current, current_ref = [], None
+    for end, line_no, row in rows:
+        ref = row.get("order_ref")
+        if current and (ref is None or ref != current_ref):
+            yield current
+            current = []
+        current.append((end, line_no, row))
+        current_ref = ref
+    if current:
+        yield current
+
+
+def _load_order_lookups() -> dict:
+    with connection() as conn:
+        customers, emails = {}, {}
+        for cid, email, active in conn.execute("SELECT id, email, is_active FROM customers"):
+            customers[cid] = active
+            emails[email.lower()] = cid
+        employees = {eid for (eid,) in conn.execute("SELECT id FROM employees WHERE is_active = 1")}
+        products, names = {}, {}
+        for pid, name, price, reorder in conn.execute(
+            "SELECT id, name, unit_price, reorder_lvl FROM products"
+        ):
+            products[pid] = (price, reorder > 0)
+            names[name.lower()] = pid
+    return {"customers": customers, "emails": emails, "employees": employees,
+            "products": products, "product_names": names}
+
+
+def _as_int(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _resolve_order(rows: list, lookups: dict, default_employee: int, now: str):
+    # Returns (order, None) or (None, reason)
+    first = rows[0][2]
+    if "_error" in first:
+        return None, first["_error"]
+
+    customer_id = _as_int(first.get("customer_id"))
+    if customer_id is None and first.get("customer_email"):
+        customer_id = lookups["emails"].get(str(first["customer_email"]).strip().lower())
+    if customer_id is None or customer_id not in lookups["customers"]:
+        return None, "unknown customer"
+    if not lookups["customers"][customer_id]:
+        return None, f"customer {customer_id} is inactive"
+
+    employee_id = _as_int(first.get("employee_id")) or default_employee
+    if employee_id not in lookups["employees"]:
+        return None, f"unknown or inactive employee {employee_id}"
+
+    lines = {}
+    for _, line_no, row in rows:
+        if "_error" in row:
+            return None, f"line {line_no}: {row['_error']}"
+        product_id = _as_int(row.get("product_id"))
+        if product_id is None and row.get("product"):
+            product_id = lookups["product_names"].get(str(row["product"]).strip().lower())
+        if product_id not in lookups["products"]:
+            return None, f"line {line_no}: unknown product"
+        quantity = _as_int(row.get("quantity"))
+        if not quantity or quantity <= 0:
+            return None, f"line {line_no}: invalid quantity"
+        try:
+            price = float(row["unit_price"]) if row.get("unit_price") not in (None, "") \
+                else lookups["products"][product_id][0]
+        except (TypeError, ValueError):
+            return None, f"line {line_no}: invalid unit_price"
+        if product_id in lines:
+            lines[product_id][0] += quantity
+        else:
+            lines[product_id] = [quantity, price]
+
+    return {
+        "customer_id": customer_id,
+        "employee_id": employee_id,
+        "created_at":  str(first.get("created_at") or now),
+        "lines":       lines,
+    }, None
+
+
+def _apply_order_chunk(conn, chunk: list, lookups: dict, stats: dict, rejects: RejectFile,
+                       source: str, default_employee: int) -> dict:
+    # Runs inside one BEGIN IMMEDIATE transaction; may be retried, so it
+    # starts by rolling the reject file back to the last checkpoint.
+    rejects.rewind(stats["reject_bytes"])
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    products = lookups["products"]
+
+    resolved = []
+    chunk_rejected = 0
+    for rows in chunk:
+        order, reason = _resolve_order(rows, lookups, default_employee, now)
+        if order is None:
+            for _, line_no, row in rows:
+                rejects.write(line_no, reason, row)
+            chunk_rejected += len(rows)
+        else:
+            resolved.append((rows, order))
+
+    # Current stock for every tracked product this chunk touches
+    touched = sorted({pid for _, o in resolved for pid in o["lines"] if products[pid][1]})
+    available = dict(conn.execute(
+        "SELECT id, stock_qty FROM products WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(touched),)
+    ).fetchall())
+
+    next_id = conn.execute("""
+        SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'orders'), 0),
+                   COALESCE((SELECT MAX(id) FROM orders), 0)) + 1
+    """).fetchone()[0]
+
+    order_rows, item_rows, reservation_rows = [], [], []
+    stock_out, last_order = {}, {}
+    chunk_imported = 0
+    for rows, order in resolved:
+        short = [pid for pid, (qty, _) in order["lines"].items()
+                 if products[pid][1] and available.get(pid, 0) < qty]
+        if short:
+            reason = f"insufficient stock for product {short[0]}"
+            for _, line_no, row in rows:
+                rejects.write(line_no, reason, row)
+            chunk_rejected += len(rows)
+            continue
+
+        order_id = next_id
+        next_id += 1
+        total = 0.0
+        for pid, (qty, price) in order["lines"].items():
+            item_rows.append((order_id, pid, qty, price))
+            total += qty * price
+            if products[pid][1]:
+                available[pid] -= qty
+                stock_out[pid] = stock_out.get(pid, 0) + qty
+                reservation_rows.append((order_id, pid, qty))
+        order_rows.append((order_id, order["customer_id"], order["employee_id"],
+                           order["created_at"], round(total, 2)))
+        day = order["created_at"][:10]
+        if day > last_order.get(order["customer_id"], ""):
+            last_order[order["customer_id"]] = day
+        chunk_imported += len(rows)
+
+    conn.executemany("""
+        INSERT INTO orders (id, customer_id, employee_id, status, created_at, total_amount)
+        VALUES (?, ?, ?, 'pending', ?, ?)
+    """, order_rows)
+    conn.executemany("""
+        INSERT INTO order_items (order_id, product_id, quantity, unit_price)
+        VALUES (?, ?, ?, ?)
+    """, item_rows)
+    # Imported orders are pending: their stock is reserved, as in place_order
+    conn.executemany("""
+        INSERT INTO inventory_reservations (order_id, product_id, reserved)
+        VALUES (?, ?, ?)
+    """, reservation_rows)
+    record_movements(conn, "sale", [(pid, -qty, qty, oid) for oid, pid, qty in reservation_rows])
+
+    # Set-based stock and last_order updates: one statement each per chunk
+    conn.execute("""
+        UPDATE products
+        SET stock_qty    = stock_qty - d.qty,
+            reserved_qty = reserved_qty + d.qty
+        FROM (SELECT json_extract(value, '$[0]') AS pid,
+                     json_extract(value, '$[1]') AS qty
+              FROM json_each(?)) AS d
+        WHERE products.id = d.pid
+    """, (json.dumps(list(stock_out.items())),))
+    conn.execute("""
+        UPDATE customers
+        SET last_order = MAX(COALESCE(last_order, ''), d.day)
+        FROM (SELECT json_extract(value, '$[0]') AS cid,
+                     json_extract(value, '$[1]') AS day
+              FROM json_each(?)) AS d
+        WHERE customers.id = d.cid
+    """, (json.dumps(list(last_order.items())),))
+
+    progress = dict(stats)
+    progress["rows"] += sum(len(rows) for rows in chunk)
+    progress["imported"] += chunk_imported
+    progress["rejected"] += chunk_rejected
+    progress["byte_offset"] = chunk[-1][-1][0]
+    progress["reject_bytes"] = rejects.sync()
+    save_checkpoint(conn, source, "orders", progress)
+    return progress
+
+
+def import_orders(path: str, rejects_path: str = None, chunk_rows: int = CHUNK_ROWS,
+                  default_employee: int = None, restart: bool = False) -> dict:
+    """Stream an order-line file into orders / order_items. Returns the final stats."""
+    source = os.path.abspath(path)
+    rejects_path = rejects_path or path + ".rejects.jsonl"
+    if restart:
+        clear_checkpoint(source)
+
+    checkpoint = load_checkpoint(source)
+    stats = _new_stats(checkpoint)
+    if checkpoint and checkpoint["finished"]:
+        print(f"[IMPORT] {path} was already imported (use --restart to import it again).")
+        return stats
+    if checkpoint:
+        print(f"[IMPORT] Resuming {path} after row {stats['rows']:,}.")
+
+    lookups = _load_order_lookups()
+    rejects = RejectFile(rejects_path, stats["reject_bytes"])
+    started, rows_at_start = time.perf_counter(), stats["rows"]
+
+    try:
+        rows = read_rows(path, stats["byte_offset"], stats["rows"])
+        chunk, chunk_size = [], 0
+        for order_rows in _group_orders(rows):
+            chunk.append(order_rows)
+            chunk_size += len(order_rows)
+            if chunk_size >= chunk_rows:
+                stats = run_in_transaction(_apply_order_chunk, chunk, lookups, stats,
+                                           rejects, source, default_employee)
+                _report(path, stats, stats["rows"] - rows_at_start, time.perf_counter() - started)
+                chunk, chunk_size = [], 0
+        if chunk:
+            stats = run_in_transaction(_apply_order_chunk, chunk, lookups, stats,
+                                       rejects, source, default_employee)
+        run_in_transaction(lambda conn: save_checkpoint(conn, source, "orders", stats, finished=True))
+    finally:
+        rejects.close()
+
+    seconds = time.perf_counter() - started
+    stats["seconds"] = round(seconds, 3)
+    stats["rows_per_sec"] = round((stats["rows"] - rows_at_start) / seconds, 1) if seconds else 0.0
+    _report(path, stats, stats["rows"] - rows_at_start, seconds, done=True)
+    if stats["rejected"]:
+        print(f"[IMPORT] Rejected rows written to {rejects_path}")
+    return stats
+
+
+# ── Customers ────────────────────────────────────────────────
+# Columns: name, email, phone (optional), region (one of customers.REGIONS).
+#
+# Each chunk is staged in a temp table and deduplicated in SQL — against
+# existing customers through the NOCASE email index, and within the file
+# on a lower-cased email key — before survivors are inserted in one
+# INSERT ... SELECT.
+
+def _stage_customers(conn):
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS customer_staging (
+            line_no    INTEGER PRIMARY KEY,
+            name       TEXT NOT NULL,
+            email      TEXT NOT NULL,
+            email_key  TEXT NOT NULL,
+            phone      TEXT,
+            region     TEXT NOT NULL,
+            reason     TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS temp.idx_customer_staging_key ON customer_staging(email_key)")
+    conn.execute("DELETE FROM customer_staging")
+
+
+def _validate_customer(row: dict):
+    # Returns (staging values, None) or (None, reason)
+    if "_error" in row:
+        return None, row["_error"]
+    name = str(row.get("name") or "").strip()
+    email = str(row.get("email") or "").strip()
+    phone = str(row.get("phone") or "").strip() or None
+    region = str(row.get("region") or "").strip().lower()
+    if not name:
+        return None, "missing name"
+    if len(name) > 200:
+        return None, "name too long"
+    if not valid_email(email):
+        return None, "invalid email"
+    if region not in REGIONS:
+        return None, f"invalid region '{row.get('region')}'"
+    return (name, email, email.lower(), phone, region.title()), None
+
+
+def _apply_customer_chunk(conn, chunk: list, stats: dict, rejects: RejectFile, source: str) -> dict:
+    rejects.rewind(stats["reject_bytes"])
+    rows = {line_no: row for _, line_no, row in chunk}
+
+    staged, chunk_rejected = [], 0
+    for _, line_no, row in chunk:
+        values, reason = _validate_customer(row)
+        if values is None:
+            rejects.write(line_no, reason, row)
+            chunk_rejected += 1
+        else:
+            staged.append((line_no,) + values)
+
+    _stage_customers(conn)
+    conn.executemany("""
+        INSERT INTO customer_staging (line_no, name, email, email_key, phone, region)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, staged)
+
+    # Existing customers first, then repeats of an earlier line in this chunk
+    conn.execute("""
+        UPDATE customer_staging
+        SET reason = 'duplicate of customer ' || c.id
+        FROM customers c
+        WHERE c.email = customer_staging.email COLLATE NOCASE
+    """)
+    conn.execute("""
+        UPDATE customer_staging
+        SET reason = 'duplicate of line ' || f.first_line
+        FROM (SELECT email_key, MIN(line_no) AS first_line
+              FROM customer_staging
+              GROUP BY email_key
+              HAVING COUNT(*) > 1) AS f
+        WHERE customer_staging.email_key = f.email_key
+          AND customer_staging.line_no > f.first_line
+          AND customer_staging.reason IS NULL
+    """)
+
+    inserted = conn.execute("""
+        INSERT INTO customers (name, email, phone, region, is_active)
+        SELECT name, email, phone, region, 1
+        FROM customer_staging
+        WHERE reason IS NULL
+        ORDER BY line_no
+    """).rowcount
+
+    for line_no, reason in conn.execute(
+        "SELECT line_no, reason FROM customer_staging WHERE reason IS NOT NULL ORDER BY line_no"
+    ):
+        rejects.write(line_no, reason, rows[line_no])
+        chunk_rejected += 1
+
+    progress = dict(stats)
+    progress["rows"] += len(chunk)
+    progress["imported"] += inserted
+    progress["rejected"] += chunk_rejected
+    progress["byte_offset"] = chunk[-1][0]
+    progress["reject_bytes"] = rejects.sync()
+    save_checkpoint(conn, source, "customers", progress)
+    return progress
+
+
+def import_customers(path: str, rejects_path: str = None, chunk_rows: int = CHUNK_ROWS,
+                     restart: bool = False) -> dict:
+    """Stream a customer file into customers, skipping duplicates. Returns the final stats."""
+    source = os.path.abspath(path)
+    rejects_path = rejects_path or path + ".rejects.jsonl"
+    if restart:
+        clear_checkpoint(source)
+
+    checkpoint = load_checkpoint(source)
+    stats = _new_stats(checkpoint)
+    if checkpoint and checkpoint["finished"]:
+        print(f"[IMPORT] {path} was already imported (use --restart to import it again).")
+        return stats
+    if checkpoint:
+        print(f"[IMPORT] Resuming {path} after row {stats['rows']:,}.")
+
+    rejects = RejectFile(rejects_path, stats["reject_bytes"])
+    started, rows_at_start = time.perf_counter(), stats["rows"]
+
+    try:
+        chunk = []
+        for record in read_rows(path, stats["byte_offset"], stats["rows"]):
+            chunk.append(record)
+            if len(chunk) >= chunk_rows:
+                stats = run_in_transaction(_apply_customer_chunk, chunk, stats, rejects, source)
+                _report(path, stats, stats["rows"] - rows_at_start, time.perf_counter() - started)
+                chunk = []
+        if chunk:
+            stats = run_in_transaction(_apply_customer_chunk, chunk, stats, rejects, source)
+        run_in_transaction(lambda conn: save_checkpoint(conn, source, "customers", stats, finished=True))
+    finally:
+        rejects.close()
+
+    seconds = time.perf_counter() - started
+    stats["seconds"] = round(seconds, 3)
+    stats["rows_per_sec"] = round((stats["rows"] - rows_at_start) / seconds, 1) if seconds else 0.0
+    _report(path, stats, stats["rows"] - rows_at_start, seconds, done=True)
+    if stats["rejected"]:
+        print(f"[IMPORT] Rejected rows written to {rejects_path}")
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk import from CSV / JSONL files")
+    sub = parser.add_subparsers(dest="kind", required=True)
+
+    p = sub.add_parser("orders", help="import order lines")
+    p.add_argument("file")
+    p.add_argument("--employee", type=int, help="employee ID for rows without employee_id")
+    p.add_argument("--rejects", help="reject file (default: <file>.rejects.jsonl)")
+    p.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="rows per transaction")
+    p.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+
+    p = sub.add_parser("customers", help="import customers")
+    p.add_argument("file")
+    p.add_argument("--rejects", help="reject file (default: <file>.rejects.jsonl)")
+    p.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="rows per transaction")
+    p.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+
+    args = parser.parse_args()
+    initialize_db()
+
+    if args.kind == "orders":
+        import_orders(args.file, args.rejects, args.chunk, args.employee, args.restart)
+    elif args.kind == "customers":
+        import_customers(args.file, args.rejects, args.chunk, args.restart)
@@ -0,0 +1,148 @@
+# Order cart for interactive order entry.
+#
+# Lines are kept in a dict keyed by product_id (insertion-ordered), so
+# adding, updating and removing a line is O(1) however large the cart is,
+# and the running total is adjusted per change instead of re-summed. The
+# total is kept in cents to avoid float drift across thousands of updates.
+#
+# Lines can also be loaded in bulk from "product_id,quantity" text — pasted
+# at the prompt or read from a file — for wholesale orders with thousands
+# of lines.
+
+import os
+import re
+from itertools import islice
+
+WINDOW = 10   # cart lines shown while entering an order
+
+_SEPARATORS = re.compile(r"[,;\t ]+")
+
+
+class CartLine:
+    __slots__ = ("product_id", "product", "quantity", "unit_price")
+
+    def __init__(self, product_id: int, product: str, quantity: int, unit_price: float):
+        self.product_id = product_id
+        self.product = product
+        self.quantity = quantity
+        self.unit_price = unit_price
+
+    def __getitem__(self, key):
+        # Lets lines be printed by the same helpers as order_items rows
+        return getattr(self, key)
+
+    @property
+    def cents(self) -> int:
+        return round(self.quantity * self.unit_price * 100)
+
+
+class Cart:
+
+    def __init__(self):
+        self._lines = {}      # product_id -> CartLine
+        self._cents = 0
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def __contains__(self, product_id):
+        return product_id in self._lines
+
+    def get(self, product_id: int) -> CartLine | None:
+        return self._lines.get(product_id)
+
+    @property
+    def total(self) -> float:
+        return self._cents / 100
+
+    @property
+    def units(self) -> int:
+        return sum(line.quantity for line in self._lines.values())
+
+    # ── Changes ──
+
+    def set(self, product_id: int, product: str, quantity: int, unit_price: float):
+        """Set a line's quantity; 0 removes it."""
+        self.remove(product_id)
+        if quantity > 0:
+            line = CartLine(product_id, product, quantity, unit_price)
+            self._lines[product_id] = line
+            self._cents += line.cents
+
+    def add(self, product_id: int, product: str, quantity: int, unit_price: float):
+        """Add quantity to a line, creating it if needed."""
+        existing = self._lines.get(product_id)
+        if existing is None:
+            self.set(product_id, product, quantity, unit_price)
+            return
+        self._cents -= existing.cents
+        existing.quantity += quantity
+        self._cents += existing.cents
+
+    def remove(self, product_id: int):
+        line = self._lines.pop(product_id, None)
+        if line is not None:
+            self._cents -= line.cents
+
+    # ── Views ──
+
+    def window(self, start: int = 0, size: int = WINDOW) -> list:
+        return list(islice(self._lines.values(), start, start + size))
+
+    def tail(self, size: int = WINDOW) -> list:
+        # The most recently added lines, oldest first
+        return list(islice(reversed(self._lines.values()), size))[::-1]
+
+    def to_lines(self) -> list:
+        """(product_id, quantity) pairs, as accepted by place_order()."""
+        return [(line.product_id, line.quantity) for line in self._lines.values()]
+
+    # ── Bulk loading ──
+
+    def load(self, entries, catalog) -> tuple:
+        """Add (line_no, product_id, quantity) entries using catalog for names and prices.
+
+        Returns (lines_added, errors) where errors is a list of (line_no, message).
+        """
+        added, errors = 0, []
+        for line_no, product_id, quantity in entries:
+            product = catalog.get(product_id)
+            if product is None:
+                errors.append((line_no, f"unknown product ID {product_id}"))
+                continue
+            self.add(product.id, product.name, quantity, product.unit_price)
+            added += 1
+        return added, errors
+
+
+def parse_lines(lines) -> tuple:
+    """Parse "product_id,quantity" lines (comma, semicolon, tab or space separated).
+
+    Blank lines, '#' comments and a non-numeric header row are skipped.
+    Returns (entries, errors): entries are (line_no, product_id, quantity).
+    """
+    entries, errors = [], []
+    for line_no, raw in enumerate(lines, 1):
+        raw = raw.strip()
+        if not raw or raw.startswith("#"):
+            continue
+        fields = _SEPARATORS.split(raw)
+        if len(fields) != 2 or not all(f.isdigit() for f in fields):
+            if line_no == 1 and not fields[0].isdigit():
+                continue   # header
+            errors.append((line_no, f"expected 'product_id,quantity', got '{raw[:40]}'"))
+            continue
+        product_id, quantity = int(fields[0]), int(fields[1])
+        if quantity <= 0:
+            errors.append((line_no, f"quantity must be positive, got {quantity}"))
+            continue
+        entries.append((line_no, product_id, quantity))
+    return entries, errors
+
+
+def read_lines_file(path: str) -> tuple:
+    with open(os.path.expanduser(path), "r", encoding="utf-8-sig") as f:
+        return parse_lines(f)
@@ -0,0 +1,152 @@
+# Process-level product catalog cache used by order entry.
+#
+# The static part of the catalog (name, category, price, reorder level) is
+# loaded once and kept until table_versions['products_catalog'] changes
+# (bumped by triggers on products, see migration 5). Stock levels change
+# with every order, so they are never cached — only the handful of rows
+# actually displayed are read live.
+#
+# Lookups:
+#   - by ID                          dict
+#   - by word prefix of name/category sorted (token, id) list + bisect
+#   - by substring (3+ characters)   trigram -> ids index, verified
+
+import os
+import sys
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db.database import connection
+
+PAGE_SIZE = 20
+
+Product = namedtuple("Product", "id name category unit_price reorder_lvl")
+
+
+def _words(text: str) -> list:
+    return "".join(ch if ch.isalnum() else " " for ch in text.lower()).split()
+
+
+def _trigrams(text: str) -> set:
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ProductCatalog:
+
+    def __init__(self, version: int, rows):
+        self.version = version
+        self.products = {}        # id -> Product
+        self.ordered = []         # Products sorted by category, name (display order)
+        tokens = []
+        self._trigram_ids = {}
+
+        for row in rows:
+            p = Product(*row)
+            self.products[p.id] = p
+            self.ordered.append(p)
+            for word in set(_words(p.name) + _words(p.category)):
+                tokens.append((word, p.id))
+            for gram in _trigrams(p.name) | _trigrams(p.category):
+                self._trigram_ids.setdefault(gram, []).append(p.id)
+
+        tokens.sort()
+        self._tokens = tokens
+        self._token_keys = [t for t, _ in tokens]
+
+    def __len__(self):
+        return len(self.products)
+
+    def get(self, product_id: int) -> Product | None:
+        return self.products.get(product_id)
+
+    def page(self, page_no: int, page_size: int = PAGE_SIZE) -> list:
+        start = page_no * page_size
+        return self.ordered[start:start + page_size]
+
+    def page_count(self, page_size: int = PAGE_SIZE) -> int:
+        return max(1, -(-len(self.ordered) // page_size))
+
+    def _prefix_ids(self, word: str) -> set:
+        ids = set()
+        i = bisect_left(self._token_keys, word)
+        while i < len(self._tokens) and self._tokens[i][0].startswith(word):
+            ids.add(self._tokens[i][1])
+            i += 1
+        return ids
+
+    def search(self, term: str, limit: int = PAGE_SIZE) -> list:
+        """Products whose words start with every word of term; if none, substring matches."""
+        words = _words(term)
+        if not words:
+            return []
+
+        ids = None
+        for word in words:
+            found = self._prefix_ids(word)
+            ids = found if ids is None else ids & found
+            if not ids:
+                break
+
+        if not ids:
+            needle = term.lower().strip()
+            grams = _trigrams(needle)
+            if grams:
+                candidates = None
+                for gram in grams:
+                    found = set(self._trigram_ids.get(gram, ()))
+                    candidates = found if candidates is None else candidates & found
+                    if not candidates:
+                        break
+                ids = {pid for pid in candidates or ()
+                       if needle in self.products[pid].name.lower()
+                       or needle in self.products[pid].category.lower()}
+
+        matches = sorted((self.products[pid] for pid in ids or ()),
+                         key=lambda p: (p.category, p.name))
+        return matches[:limit]
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def _current_version(conn) -> int:
+    row = conn.execute(
+        "SELECT version FROM table_versions WHERE name = 'products_catalog'"
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def get_catalog() -> ProductCatalog:
+    """The cached catalog, reloaded only if products changed since it was built."""
+    global _catalog
+    with connection() as conn:
+        version = _current_version(conn)
+        if _catalog is not None and _catalog.version == version:
+            return _catalog
+        with _catalog_lock:
+            if _catalog is None or _catalog.version != version:
+                rows = conn.execute("""
+                    SELECT id, name, category, unit_price, reorder_lvl
+                    FROM products
+                    ORDER BY category, name
+                """).fetchall()
+                _catalog = ProductCatalog(version, rows)
+    return _catalog
+
+
+def with_stock(products: list) -> list:
+    """Attach live stock_qty to a (small) list of products, as dicts."""
+    if not products:
+        return []
+    placeholders = ", ".join("?" * len(products))
+    with connection() as conn:
+        stock = dict(conn.execute(
+            f"SELECT id, stock_qty FROM products WHERE id IN ({placeholders})",
+            [p.id for p in products]
+        ).fetchall())
+    return [dict(p._asdict(), stock_qty=stock.get(p.id, 0)) for p in products]
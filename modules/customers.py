@@ -1,57 +1,116 @@
 import os
+import re
+import sqlite3
 import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from db.database import get_connection
+from db import database
+from db.database import connection
+from db.writer import run_write
 from modules.auth import (
     require_permission, print_header, ok, err, warn,
     pause, divider, get_str_input, get_choice, C
 )
+from modules.render import Column, print_table
+from modules.pagination import KeysetPager, browse
 
 REGIONS = ["northeast", "southeast", "south", "midwest", "southwest", "west", "northwest"]
 
 
+SEARCH_LIMIT = 50
+
+
+def valid_email(email: str) -> bool:
+    # Basic format check
+    return "@" in email and "." in email.split("@")[-1]
+
+
+# ── Customer Search ───────────────────────────────────────────
+
+_fts_available = {}     # DB path -> whether customers_fts exists
+
+
+def _has_fts(conn) -> bool:
+    # Keyed on the path, since set_db_path() can switch databases mid-process
+    path = database.DB_PATH
+    if path not in _fts_available:
+        _fts_available[path] = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'customers_fts'"
+        ).fetchone() is not None
+    return _fts_available[path]
+
+
+def _fts_query(term: str) -> str:
+    # Every word must match the start of a token in name, email or region:
+    # "apex log" -> "apex"* AND "log"*
+    tokens = re.findall(r"\w+", term.lower())
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def find_customers(term: str, limit: int = SEARCH_LIMIT, active_only: bool = False) -> list:
+    """Customers matching term, best matches first.
+
+    Uses the FTS5 index (token and prefix matching, bm25 ranking with name
+    weighted above email and region) and falls back to a LIKE scan when
+    FTS5 is unavailable or the term has no searchable words.
+    """
+    active = "AND c.is_active = 1" if active_only else ""
+    with connection() as conn:
+        match = _fts_query(term)
+        if match and _has_fts(conn):
+            return conn.execute(f"""
+                SELECT c.id, c.name, c.email, c.region, c.last_order, c.is_active
+                FROM customers_fts f
+                JOIN customers c ON c.id = f.rowid
+                WHERE customers_fts MATCH ?
+                  {active}
+                ORDER BY bm25(customers_fts, 10.0, 5.0, 1.0), c.name
+                LIMIT ?
+            """, (match, limit)).fetchall()
+
+        return conn.execute(f"""
+            SELECT c.id, c.name, c.email, c.region, c.last_order, c.is_active
+            FROM customers c
+            WHERE (LOWER(c.name) LIKE LOWER(?) OR LOWER(c.email) LIKE LOWER(?))
+              {active}
+            ORDER BY c.name ASC
+            LIMIT ?
+        """, (f"%{term}%", f"%{term}%", limit)).fetchall()
+
+
 # ── Table Printer ─────────────────────────────────────────────
 
-def _print_customer_table(rows):
-    if not rows:
-        warn("No customers found.")
-        return
+def _print_customer_table(rows, footer: str = None):
+    print_table(rows, [
+        Column("id",         "ID",         5),
+        Column("name",       "NAME",       26),
+        Column("email",      "EMAIL",      30),
+        Column("region",     "REGION",     11),
+        Column("last_order", "LAST ORDER", 12),
+        Column("is_active",  "STATUS",     10, fmt=lambda v: "Active" if v else "Inactive",
+               colour={"Active": C.GREEN, "Inactive": C.RED}),
+    ], empty="No customers found.", footer=footer, pager=True)
 
-    # Column widths
-    W = {"id": 5, "name": 26, "email": 30, "region": 11, "last_order": 12, "status": 10}
-
-    def col(val, width):
-        s = str(val or "—")
-        return s[:width].ljust(width)
-
-    # Header
-    print(C.BOLD)
-    print(
-        f"  {'ID':<{W['id']}}  "
-        f"{'NAME':<{W['name']}}  "
-        f"{'EMAIL':<{W['email']}}  "
-        f"{'REGION':<{W['region']}}  "
-        f"{'LAST ORDER':<{W['last_order']}}  "
-        f"{'STATUS':<{W['status']}}"
-    )
-    print(C.RESET, end="")
-    divider()
 
-    for row in rows:
-        status     = "Active" if row["is_active"] else "Inactive"
-        status_clr = C.GREEN if row["is_active"] else C.RED
-        print(
-            f"  {col(row['id'],         W['id'])}  "
-            f"{col(row['name'],        W['name'])}  "
-            f"{col(row['email'],       W['email'])}  "
-            f"{col(row['region'],      W['region'])}  "
-            f"{col(row['last_order'],  W['last_order'])}  "
-            f"{status_clr}{status:<{W['status']}}{C.RESET}"
-        )
+# ── Write Units ───────────────────────────────────────────────
 
-    divider()
-    print(f"  {C.DIM}{len(rows)} record(s) returned.{C.RESET}\n")
+def _customer_with_email(email: str) -> int | None:
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT id FROM customers WHERE email = ? COLLATE NOCASE", (email,)
+        ).fetchone()
+    return row["id"] if row else None
+
+
+def insert_customer(conn, name: str, email: str, phone: str | None, region: str) -> int:
+    cur = conn.execute(
+        """
+        INSERT INTO customers (name, email, phone, region, is_active)
+        VALUES (?, ?, ?, ?, 1)
+        """,
+        (name, email, phone, region)
+    )
+    return cur.lastrowid
 
 
 # ── Add Customer ──────────────────────────────────────────────
@@ -80,18 +139,13 @@ def add_customer(session: dict):
             warn("Cancelled.")
             pause()
             return
-        # Basic format check
-        if "@" not in email or "." not in email.split("@")[-1]:
+        if not valid_email(email):
             err("Please enter a valid email address.")
             continue
         # Duplicate check
-        conn = get_connection()
-        exists = conn.execute(
-            "SELECT id FROM customers WHERE LOWER(email) = LOWER(?)", (email,)
-        ).fetchone()
-        conn.close()
+        exists = _customer_with_email(email)
         if exists:
-            err(f"A customer with email '{email}' already exists (ID {exists['id']}).")
+            err(f"A customer with email '{email}' already exists (ID {exists}).")
             continue
         break
 
@@ -134,17 +188,13 @@ def add_customer(session: dict):
         return
 
     # --- Insert ---
-    conn = get_connection()
-    cur = conn.execute(
-        """
-        INSERT INTO customers (name, email, phone, region, is_active)
-        VALUES (?, ?, ?, ?, 1)
-        """,
-        (name, email, phone, region)
-    )
-    conn.commit()
-    new_id = cur.lastrowid
-    conn.close()
+    # The unique index still rejects a duplicate saved since the check above
+    try:
+        new_id = run_write(insert_customer, name, email, phone, region)
+    except sqlite3.IntegrityError:
+        err(f"A customer with email '{email}' already exists (ID {_customer_with_email(email)}).")
+        pause()
+        return
 
     ok(f"Customer '{name}' added successfully! (ID {new_id})")
     pause()
@@ -172,25 +222,20 @@ def view_customers(session: dict):
         return
 
     if choice == "1":
-        where, label = "WHERE is_active = 1", "Active Customers"
+        active, label = 1, "Active Customers"
     elif choice == "2":
-        where, label = "WHERE is_active = 0", "Inactive Customers"
+        active, label = 0, "Inactive Customers"
     else:
-        where, label = "", "All Customers"
-
-    conn = get_connection()
-    rows = conn.execute(f"""
-        SELECT id, name, email, region, last_order, is_active
-        FROM customers
-        {where}
-        ORDER BY name ASC
-    """).fetchall()
-    conn.close()
-
-    print()
-    print(f"  {C.BOLD}{label}{C.RESET}\n")
-    _print_customer_table(rows)
-    pause()
+        active, label = None, "All Customers"
+
+    pager = KeysetPager(
+        "SELECT id, name, email, region, last_order, is_active FROM customers",
+        keys=(("name", "name"), ("id", "id")),
+        where="is_active = ?" if active is not None else "",
+        params=(active,) if active is not None else (),
+        count_name={1: "customers/active", 0: "customers/inactive"}.get(active, "customers"),
+    )
+    browse(session, pager, label, _print_customer_table, noun="customer")
 
 
 # ── Search Customer ───────────────────────────────────────────
@@ -209,15 +254,7 @@ def search_customer(session: dict):
     if term is None:
         return
 
-    conn = get_connection()
-    rows = conn.execute("""
-        SELECT id, name, email, region, last_order, is_active
-        FROM customers
-        WHERE LOWER(name)  LIKE LOWER(?)
-           OR LOWER(email) LIKE LOWER(?)
-        ORDER BY name ASC
-    """, (f"%{term}%", f"%{term}%")).fetchall()
-    conn.close()
+    rows = find_customers(term)
 
     print()
     if not rows:
@@ -225,6 +262,8 @@ def search_customer(session: dict):
     else:
         print(f"  {C.BOLD}Results for \"{term}\"{C.RESET}\n")
         _print_customer_table(rows)
+        if len(rows) == SEARCH_LIMIT:
+            print(f"  {C.DIM}Showing the top {SEARCH_LIMIT} matches — refine the search to narrow it down.{C.RESET}\n")
 
     pause()
 
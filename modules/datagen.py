@@ -0,0 +1,406 @@
+# Synthetic data at production-like volumes.
+#
+# generate(path, scale, seed) builds a fresh database whose contents depend
+# only on the scale factor, the seed and the end date: the same arguments
+# always produce the same rows. One scale unit is roughly
+#
+#   100 employees, 10,000 customers, 1,000 products,
+#   100,000 orders and 1,000,000 order items
+#
+# Customer spend follows a power law (a few accounts place most orders),
+# order dates follow a growth trend with weekly and year-end seasonality,
+# recent orders are mostly pending and older ones fulfilled or cancelled.
+#
+# Loading runs on a bulk-load connection: baseline schema, secondary
+# indexes dropped, rows inserted with executemany in batches, indexes
+# rebuilt, and then the remaining migrations, whose backfills derive
+# everything else (search index, reservations, ledger, reorder queue,
+# summaries, counters) exactly as they would for an upgraded database.
+#
+#   python modules/datagen.py synth.db --scale 10 --seed 42
+#   ERP_DB_PATH=synth.db python app.py
+
+import bisect
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db import migrations
+from db.profiles import apply_profile
+from modules.customers import REGIONS
+
+INSERT_BATCH = 50_000
+DEFAULT_END = "2024-12-31"
+YEARS = 3
+
+EMPLOYEES_PER_SCALE = 100
+CUSTOMERS_PER_SCALE = 10_000
+PRODUCTS_PER_SCALE = 1_000
+ORDERS_PER_SCALE = 100_000
+MEAN_EXTRA_LINES = 12.5      # lines per order = 1 + exponential with this mean
+
+# Secondary indexes from schema.sql, built after the load instead of during it
+LOAD_INDEXES = {
+    "idx_orders_customer":   "CREATE INDEX idx_orders_customer   ON orders(customer_id)",
+    "idx_orders_employee":   "CREATE INDEX idx_orders_employee   ON orders(employee_id)",
+    "idx_orders_status":     "CREATE INDEX idx_orders_status     ON orders(status)",
+    "idx_orders_created":    "CREATE INDEX idx_orders_created    ON orders(created_at)",
+    "idx_employees_dept":    "CREATE INDEX idx_employees_dept    ON employees(department_id)",
+    "idx_order_items_order": "CREATE INDEX idx_order_items_order ON order_items(order_id)",
+}
+
+DEPARTMENTS = [
+    ("Sales",            850_000.00,   "New York"),
+    ("Engineering",      1_200_000.00, "Austin"),
+    ("Customer Support", 350_000.00,   "Chicago"),
+    ("Finance",          500_000.00,   "New York"),
+    ("Operations",       620_000.00,   "Dallas"),
+    ("Marketing",        410_000.00,   "Denver"),
+    ("Procurement",      280_000.00,   "Atlanta"),
+    ("Human Resources",  240_000.00,   "Chicago"),
+]
+SALES_DEPARTMENT = 1
+
+ROLES = [
+    ("Viewer",        1, "Read-only access to basic records"),
+    ("Sales Rep",     2, "Can add customers and create orders"),
+    ("Supervisor",    3, "Can view all operational reports"),
+    ("Manager",       4, "Can access financial and HR reports"),
+    ("Administrator", 5, "Full system access"),
+]
+ROLE_WEIGHTS = [10, 55, 20, 12, 3]
+DEPARTMENT_WEIGHTS = [40, 20, 12, 6, 8, 6, 4, 4]
+
+FIRST_NAMES = ["James", "Sofia", "Marcus", "Priya", "Leon", "Dana", "Aaliya", "Trevor",
+               "Renee", "Omar", "Claire", "Derek", "Maya", "Ethan", "Lucia", "Noah",
+               "Hana", "Victor", "Grace", "Ivan", "Zara", "Felix", "Nadia", "Samuel"]
+LAST_NAMES = ["Carter", "Nguyen", "Webb", "Sharma", "Fischer", "Brooks", "Hassan", "Kim",
+              "Alvarez", "Jackson", "Wu", "Patel", "Okafor", "Rossi", "Silva", "Novak",
+              "Larsen", "Moreau", "Tanaka", "Cohen", "Haddad", "Murphy", "Kowalski", "Reyes"]
+
+COMPANY_WORDS = ["Apex", "Blue Ridge", "Core", "Delta", "Eastwood", "FrontLine", "GridMark",
+                 "Harbor", "Ironside", "Jade", "Keystone", "Luminary", "Metro", "NorthStar",
+                 "Orion", "Pinnacle", "Quarry", "Redwood", "Summit", "Tidewater", "Unity",
+                 "Vertex", "Westgate", "Zenith"]
+COMPANY_KINDS = ["Logistics", "Retail", "Solutions", "Supply Co.", "Enterprises", "Foods",
+                 "Industries", "Group", "Manufacturing", "Trading", "Partners", "Tech",
+                 "Health Systems", "Wholesale", "Builders", "Labs"]
+REGION_WEIGHTS = [22, 16, 12, 15, 11, 16, 8]
+
+# category: (price range, share of catalog, tracked stock)
+CATEGORIES = {
+    "Software": ((300, 6_000),   30, True),
+    "Cloud":    ((100, 2_500),   20, True),
+    "Hardware": ((150, 15_000),  25, True),
+    "Services": ((250, 4_000),   15, False),
+    "Training": ((150, 1_200),   10, False),
+}
+PRODUCT_WORDS = ["Enterprise", "Standard", "Pro", "Advanced", "Essential", "Premium",
+                 "Compact", "Secure", "Rapid", "Managed"]
+
+QUANTITIES = [1, 2, 3, 4, 5, 10, 20, 50]
+QUANTITY_WEIGHTS = [50, 18, 9, 7, 6, 6, 3, 1]
+
+MONTH_FACTOR = [0.85, 0.85, 1.0, 0.95, 0.95, 1.05, 0.9, 0.9, 1.05, 1.05, 1.25, 1.4]
+WEEKDAY_FACTOR = [1.0, 1.05, 1.05, 1.0, 0.95, 0.5, 0.4]
+
+
+def _batches(rows, size: int = INSERT_BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(conn, sql: str, rows) -> int:
+    count = 0
+    for batch in _batches(rows):
+        conn.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+# ── Generators ───────────────────────────────────────────────
+# Each takes its own Random, derived from the seed, so changing how one
+# table is generated leaves the others as they were.
+
+def _employees(rng: random.Random, count: int, start: date) -> list:
+    rows = []
+    for i in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        department = rng.choices(range(1, len(DEPARTMENTS) + 1), DEPARTMENT_WEIGHTS)[0]
+        role = rng.choices(range(1, len(ROLES) + 1), ROLE_WEIGHTS)[0]
+        hired = start - timedelta(days=rng.randrange(30, 8 * 365))
+        salary = round(rng.lognormvariate(11.2, 0.25) * (1 + 0.15 * (role - 2)), -2)
+        rows.append((i, first, last, f"{first[0]}{last}{i}@erpsim.com".lower(),
+                     department, role, hired.isoformat(), max(salary, 35_000.0),
+                     0 if rng.random() < 0.05 else 1))
+    # Employees 1-5 are active and hold roles 1-5, so every menu can be reached
+    for role, department in enumerate([SALES_DEPARTMENT] * 3 + [4, 5], 1):
+        row = list(rows[role - 1])
+        row[4], row[5], row[8] = department, role, 1
+        rows[role - 1] = tuple(row)
+    return rows
+
+
+def _customers(rng: random.Random, count: int, start: date, days: int) -> list:
+    """Customer rows ordered by signup date; about 30% predate start."""
+    regions = [r.title() for r in REGIONS]
+    signups = sorted(
+        -rng.randrange(1, 2 * 365) if rng.random() < 0.3 else rng.randrange(days)
+        for _ in range(count)
+    )
+    rows = []
+    for i, offset in enumerate(signups, 1):
+        name = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_KINDS)} {i}"
+        email = f"contact{i}@{name.split()[0].lower().replace('-', '')}{i % 97}.example.com"
+        phone = f"{rng.randrange(201, 990)}-555-{rng.randrange(10_000):04d}"
+        region = rng.choices(regions, REGION_WEIGHTS)[0]
+        rows.append((i, name, email, phone, region, (start + timedelta(days=offset)).isoformat(),
+                     0 if rng.random() < 0.03 else 1))
+    return rows
+
+
+def _products(rng: random.Random, count: int) -> list:
+    names = list(CATEGORIES)
+    shares = [CATEGORIES[c][1] for c in names]
+    rows = []
+    for i in range(1, count + 1):
+        category = rng.choices(names, shares)[0]
+        (low, high), _, tracked = CATEGORIES[category]
+        price = round(math.exp(rng.uniform(math.log(low), math.log(high))), 2)
+        if tracked:
+            reorder = rng.randrange(5, 51)
+            stock = rng.randrange(0, 600) if rng.random() > 0.08 else rng.randrange(0, reorder)
+        else:
+            reorder, stock = 0, 999
+        rows.append((i, f"{rng.choice(PRODUCT_WORDS)} {category} {i}", category,
+                     price, stock, reorder))
+    return rows
+
+
+def _day_weights(start: date, days: int) -> list:
+    return [
+        (1 + 0.6 * d / days)
+        * MONTH_FACTOR[(start + timedelta(days=d)).month - 1]
+        * WEEKDAY_FACTOR[(start + timedelta(days=d)).weekday()]
+        for d in range(days)
+    ]
+
+
+def _daily_counts(total: int, weights: list) -> list:
+    """Split total over days in proportion to weights (largest remainder)."""
+    scale = total / sum(weights)
+    shares = [w * scale for w in weights]
+    counts = [int(s) for s in shares]
+    by_remainder = sorted(range(len(shares)), key=lambda d: counts[d] - shares[d])
+    for d in by_remainder[:total - sum(counts)]:
+        counts[d] += 1
+    return counts
+
+
+def _status(rng: random.Random, age: int) -> str:
+    r = rng.random()
+    if age <= 14:
+        return "pending" if r < 0.70 else "cancelled" if r < 0.75 else "fulfilled"
+    if age <= 45:
+        return "pending" if r < 0.10 else "cancelled" if r < 0.16 else "fulfilled"
+    return "pending" if r < 0.005 else "cancelled" if r < 0.07 else "fulfilled"
+
+
+def _orders(rng: random.Random, count: int, start: date, days: int,
+            customers: list, sales_staff: list, products: list, items: list):
+    """Yield order rows in date order; their lines are appended to items.
+
+    items is drained by the caller between batches, so it stays small.
+    """
+    signup_days = [(date.fromisoformat(c[5]) - start).days for c in customers]
+    customer_cum = list(accumulate(rng.paretovariate(1.16) for _ in customers))
+    staff_cum = list(accumulate(rng.paretovariate(3.0) for _ in sales_staff))
+    popularity = list(range(1, len(products) + 1))
+    rng.shuffle(popularity)
+    product_cum = list(accumulate(1 / rank ** 1.1 for rank in popularity))
+    prices = [p[3] for p in products]
+    quantity_cum = list(accumulate(QUANTITY_WEIGHTS))
+
+    order_id = item_id = 0
+    for d, n in enumerate(_daily_counts(count, _day_weights(start, days))):
+        if not n:
+            continue
+        day = start + timedelta(days=d)
+        age = days - 1 - d
+        known = max(1, bisect.bisect_right(signup_days, d))
+        for seconds in sorted(rng.randrange(7 * 3600, 20 * 3600) for _ in range(n)):
+            order_id += 1
+            customer = bisect.bisect_left(customer_cum, rng.random() * customer_cum[known - 1], 0, known - 1)
+            employee = sales_staff[bisect.bisect_left(staff_cum, rng.random() * staff_cum[-1])]
+
+            lines = min(60, 1 + int(rng.expovariate(1 / MEAN_EXTRA_LINES)))
+            picked = rng.choices(range(len(products)), cum_weights=product_cum, k=lines)
+            amounts = rng.choices(QUANTITIES, cum_weights=quantity_cum, k=lines)
+            basket = {}
+            for p, q in zip(picked, amounts):
+                basket[p] = basket.get(p, 0) + q
+            total = 0.0
+            for p, q in basket.items():
+                item_id += 1
+                items.append((item_id, order_id, p + 1, q, prices[p]))
+                total += q * prices[p]
+
+            status = _status(rng, age)
+            created = f"{day.isoformat()} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+            fulfilled = None
+            if status == "fulfilled":
+                fulfilled = (day + timedelta(days=min(age, rng.randrange(1, 8)))).isoformat()
+            yield (order_id, customer + 1, employee, status, created, fulfilled, round(total, 2))
+
+
+# ── Loading ──────────────────────────────────────────────────
+
+def _load_orders(conn, rng, count, start, days, customers, sales_staff, products) -> tuple:
+    items = []
+    orders = _orders(rng, count, start, days, customers, sales_staff, products, items)
+    order_count = item_count = 0
+    for batch in _batches(orders):
+        conn.executemany("""
+            INSERT INTO orders (id, customer_id, employee_id, status, created_at,
+                                fulfilled_at, total_amount)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+        conn.executemany("""
+            INSERT INTO order_items (id, order_id, product_id, quantity, unit_price)
+            VALUES (?, ?, ?, ?, ?)
+        """, items)
+        order_count += len(batch)
+        item_count += len(items)
+        items.clear()
+    return order_count, item_count
+
+
+def generate(path: str, scale: float = 1.0, seed: int = 42, end: str = DEFAULT_END,
+             force: bool = False, quiet: bool = False) -> dict:
+    """Build a synthetic database at path. Returns row counts and timings."""
+    if os.path.exists(path):
+        if not force:
+            raise FileExistsError(f"{path} already exists (use force=True to replace it)")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    def log(message):
+        if not quiet:
+            print(f"[DB] {message}")
+
+    end_day = date.fromisoformat(end)
+    days = YEARS * 365
+    start = end_day - timedelta(days=days - 1)
+    counts = {
+        "employees": max(len(ROLES), round(EMPLOYEES_PER_SCALE * scale)),
+        "customers": max(1, round(CUSTOMERS_PER_SCALE * scale)),
+        "products":  max(1, round(PRODUCTS_PER_SCALE * scale)),
+        "orders":    round(ORDERS_PER_SCALE * scale),
+    }
+    timings = {}
+    started = time.perf_counter()
+
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    apply_profile(conn, "bulk-load")
+    try:
+        migrations.migrate(conn, target=1)
+        conn.execute("PRAGMA foreign_keys = OFF")   # checked once after the load
+        for name in LOAD_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+        phase = time.perf_counter()
+        conn.execute("BEGIN")
+        conn.executemany("INSERT INTO departments (id, name, budget, location) VALUES (?, ?, ?, ?)",
+                         [(i, *d) for i, d in enumerate(DEPARTMENTS, 1)])
+        conn.executemany("INSERT INTO roles (id, name, permission_level, description) VALUES (?, ?, ?, ?)",
+                         [(i, *r) for i, r in enumerate(ROLES, 1)])
+        employees = _employees(random.Random(f"{seed}:employees"), counts["employees"], start)
+        _insert(conn, """
+            INSERT INTO employees (id, first_name, last_name, email, department_id, role_id,
+                                   hire_date, salary, is_active)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, employees)
+        customers = _customers(random.Random(f"{seed}:customers"), counts["customers"], start, days)
+        _insert(conn, """
+            INSERT INTO customers (id, name, email, phone, region, created_at, is_active)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, customers)
+        products = _products(random.Random(f"{seed}:products"), counts["products"])
+        _insert(conn, """
+            INSERT INTO products (id, name, category, unit_price, stock_qty, reorder_lvl)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, products)
+        sales_staff = [e[0] for e in employees if e[4] == SALES_DEPARTMENT and e[5] in (2, 3)]
+        counts["orders"], counts["order_items"] = _load_orders(
+            conn, random.Random(f"{seed}:orders"), counts["orders"], start, days,
+            customers, sales_staff, products)
+        conn.commit()
+        timings["load"] = time.perf_counter() - phase
+        log(f"Loaded {counts['orders']:,} orders and {counts['order_items']:,} order items "
+            f"in {timings['load']:.1f}s")
+
+        phase = time.perf_counter()
+        conn.execute("BEGIN")
+        for sql in LOAD_INDEXES.values():
+            conn.execute(sql)
+        conn.execute("""
+            UPDATE customers SET last_order = m.day
+            FROM (SELECT customer_id, MAX(SUBSTR(created_at, 1, 10)) AS day
+                  FROM orders GROUP BY customer_id) AS m
+            WHERE customers.id = m.customer_id
+        """)
+        conn.commit()
+        timings["index"] = time.perf_counter() - phase
+        log(f"Built indexes in {timings['index']:.1f}s")
+
+        phase = time.perf_counter()
+        migrations.migrate(conn)
+        conn.execute("PRAGMA foreign_keys = ON")
+        problems = conn.execute("PRAGMA foreign_key_check").fetchmany(1)
+        if problems:
+            raise RuntimeError(f"generated data violates a foreign key: {tuple(problems[0])}")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        timings["derive"] = time.perf_counter() - phase
+    finally:
+        conn.close()
+
+    timings["total"] = time.perf_counter() - started
+    log(f"Generated {path} (scale {scale:g}, seed {seed}) in {timings['total']:.1f}s")
+    return {"path": path, "scale": scale, "seed": seed, "end": end,
+            "rows": counts, "seconds": timings}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic ERP database")
+    parser.add_argument("path", help="database file to create")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="scale factor; 1 = 100k orders, ~1M order items (default 1)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", default=DEFAULT_END, help=f"last order date (default {DEFAULT_END})")
+    parser.add_argument("--force", action="store_true", help="replace an existing file")
+    args = parser.parse_args()
+
+    try:
+        result = generate(args.path, args.scale, args.seed, args.end, args.force)
+    except FileExistsError as e:
+        print(f"[DB] {e}", file=sys.stderr)
+        sys.exit(1)
+    for table, rows in result["rows"].items():
+        print(f"       {table:<12} {rows:>12,}")
@@ -0,0 +1,240 @@
+# Streaming export of reports, orders and customers to CSV or JSONL.
+#
+# Rows go from the cursor to the file EXPORT_BATCH at a time (fetchmany,
+# then one writerows / write per batch), so memory stays flat however many
+# rows are exported. The format follows the file extension (.csv, .jsonl,
+# optionally .gz for gzip) unless given explicitly. Files are written
+# under a .part name and renamed when complete, so a failed export never
+# leaves a truncated file behind. "-" writes to stdout.
+#
+#   python modules/export.py report "Monthly Revenue" revenue.csv
+#   python modules/export.py orders orders-2024.jsonl.gz --status fulfilled --since 2024-01-01
+#   python modules/export.py customers customers.csv --inactive
+
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from itertools import chain, islice
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db.database import connection
+from modules.reports import REPORT_MENU
+
+EXPORT_BATCH = 5_000   # rows per fetch and per write
+FORMATS = ("csv", "jsonl")
+GZIP_LEVEL = 6         # gzip(1) default; 9 is several times slower for a few % less
+
+
+def _format_for(path: str, fmt: str = None, compress: bool = None) -> tuple:
+    """(format, compress) from explicit arguments or the file extension."""
+    name = path.lower()
+    gz = name.endswith(".gz")
+    if gz:
+        name = name[:-3]
+    if fmt is None:
+        fmt = "jsonl" if name.endswith((".jsonl", ".ndjson", ".json")) else "csv"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+    return fmt, gz if compress is None else compress
+
+
+@contextmanager
+def _open(path: str, compress: bool):
+    if path == "-":
+        yield sys.stdout
+        return
+    tmp = path + ".part"
+    f = gzip.open(tmp, "wt", compresslevel=GZIP_LEVEL, encoding="utf-8", newline="") if compress \
+        else open(tmp, "w", encoding="utf-8", newline="")
+    try:
+        yield f
+    except BaseException:
+        f.close()
+        os.remove(tmp)
+        raise
+    f.close()
+    os.replace(tmp, path)
+
+
+def _batches(rows, size: int = EXPORT_BATCH):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _cursor_batches(cursor, size: int = EXPORT_BATCH):
+    while batch := cursor.fetchmany(size):
+        yield batch
+
+
+def _write(out, fmt: str, columns: list, batches) -> int:
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        if columns:
+            writer.writerow(columns)
+        for batch in batches:
+            writer.writerows(batch)
+            count += len(batch)
+    else:
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        for batch in batches:
+            out.write("".join(dumps(dict(zip(columns, row))) + "\n" for row in batch))
+            count += len(batch)
+    return count
+
+
+def _result(path: str, count: int, started: float) -> dict:
+    seconds = time.perf_counter() - started
+    return {
+        "path":    path,
+        "rows":    count,
+        "seconds": seconds,
+        "bytes":   os.path.getsize(path) if path != "-" else None,
+    }
+
+
+# ── Exports ──────────────────────────────────────────────────
+
+def export_query(sql: str, params: tuple, path: str, fmt: str = None, compress: bool = None) -> dict:
+    """Stream the result of sql to path. Returns {path, rows, seconds, bytes}."""
+    fmt, compress = _format_for(path, fmt, compress)
+    started = time.perf_counter()
+    with connection() as conn, _open(path, compress) as out:
+        cursor = conn.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        count = _write(out, fmt, columns, _cursor_batches(cursor))
+    return _result(path, count, started)
+
+
+def find_report(name: str):
+    """REPORT_MENU entry by menu number, label or function name."""
+    for i, (label, fn) in enumerate(REPORT_MENU, 1):
+        if name.strip().lower() in (str(i), label.lower(), fn.__name__):
+            return label, fn
+    raise ValueError(f"Unknown report '{name}'.")
+
+
+def export_report(name: str, path: str, fmt: str = None, compress: bool = None) -> dict:
+    _, fn = find_report(name)
+    fmt, compress = _format_for(path, fmt, compress)
+    started = time.perf_counter()
+    rows = fn(stream=True)
+    with _open(path, compress) as out:
+        # Fetching the first batch runs the query, so the columns are known
+        # even when the report is empty
+        batches = _batches(rows)
+        first = next(batches, None)
+        count = _write(out, fmt, rows.columns, chain([first], batches) if first else ())
+    return _result(path, count, started)
+
+
+def export_orders(path: str, status: str = None, since: str = None, until: str = None,
+                  customer_id: int = None, fmt: str = None, compress: bool = None) -> dict:
+    """Order history, oldest first; filters match the order listing plus a date range."""
+    where, params = [], []
+    if status:
+        where.append("o.status = ?")
+        params.append(status)
+    if since:
+        where.append("o.created_at >= ?")
+        params.append(since)
+    if until:
+        where.append("o.created_at < DATE(?, '+1 day')")
+        params.append(until)
+    if customer_id:
+        where.append("o.customer_id = ?")
+        params.append(customer_id)
+    sql = f"""
+        SELECT
+            o.id,
+            o.customer_id,
+            c.name  AS customer,
+            c.region,
+            o.employee_id,
+            e.first_name || ' ' || e.last_name AS employee,
+            o.status,
+            o.created_at,
+            o.fulfilled_at,
+            o.total_amount
+        FROM orders o
+        JOIN customers c  ON o.customer_id  = c.id
+        JOIN employees e  ON o.employee_id  = e.id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY o.id
+    """
+    return export_query(sql, tuple(params), path, fmt, compress)
+
+
+def export_customers(path: str, active: bool = None, region: str = None,
+                     fmt: str = None, compress: bool = None) -> dict:
+    where, params = [], []
+    if active is not None:
+        where.append("is_active = ?")
+        params.append(int(active))
+    if region:
+        where.append("LOWER(region) = LOWER(?)")
+        params.append(region)
+    sql = f"""
+        SELECT id, name, email, phone, region, created_at, last_order, is_active
+        FROM customers
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY id
+    """
+    return export_query(sql, tuple(params), path, fmt, compress)
+
+
+if __name__ == '__main__':
+    import argparse
+    from db.database import initialize_db
+
+    parser = argparse.ArgumentParser(description="Export reports, orders or customers to CSV/JSONL")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def common(p):
+        p.add_argument("path", help="output file (.csv, .jsonl, optionally .gz), or - for stdout")
+        p.add_argument("--format", choices=FORMATS, help="override the format implied by the extension")
+        p.add_argument("--gzip", action="store_true", default=None, help="compress even without .gz")
+
+    p = sub.add_parser("report", help="a business report")
+    p.add_argument("report", help="menu number, label or function name")
+    common(p)
+
+    p = sub.add_parser("orders", help="order history")
+    common(p)
+    p.add_argument("--status", choices=["pending", "fulfilled", "cancelled"])
+    p.add_argument("--since", help="created on or after YYYY-MM-DD")
+    p.add_argument("--until", help="created on or before YYYY-MM-DD")
+    p.add_argument("--customer", type=int)
+
+    p = sub.add_parser("customers", help="customer listing")
+    common(p)
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--active", dest="active", action="store_true", default=None)
+    group.add_argument("--inactive", dest="active", action="store_false")
+    p.add_argument("--region")
+
+    args = parser.parse_args()
+    initialize_db()
+
+    try:
+        if args.command == "report":
+            result = export_report(args.report, args.path, args.format, args.gzip)
+        elif args.command == "orders":
+            result = export_orders(args.path, args.status, args.since, args.until,
+                                   args.customer, args.format, args.gzip)
+        else:
+            result = export_customers(args.path, args.active, args.region, args.format, args.gzip)
+    except ValueError as e:
+        print(f"[EXPORT] {e}", file=sys.stderr)
+        sys.exit(1)
+
+    rate = result["rows"] / result["seconds"] if result["seconds"] else 0
+    size = f", {result['bytes'] / 1024**2:.1f} MiB" if result["bytes"] is not None else ""
+    print(f"[EXPORT] {result['rows']:,} row(s) to {result['path']} in {result['seconds']:.2f}s "
+          f"({rate:,.0f} rows/s{size}).", file=sys.stderr if args.path == "-" else sys.stdout)
@@ -0,0 +1,519 @@
+# Inventory reservations.
+#
+# products.stock_qty is the quantity available to promise: stock on hand
+# that no pending order has claimed. Placing an order moves its units from
+# stock_qty to reserved_qty, fulfilling it ships them (reserved_qty goes
+# down), and cancelling it returns them to stock_qty. On hand is therefore
+# stock_qty + reserved_qty, and availability is one row read per SKU.
+#
+# inventory_reservations records what each pending order holds per product,
+# so a release returns exactly what was taken. Units ordered beyond the
+# available stock can be backordered: they are counted in
+# products.backorder_qty and filled oldest order first as stock is
+# received or released.
+#
+# Every change to stock_qty or reserved_qty is also appended to the
+# inventory_movements ledger in the same transaction. stock_snapshots hold
+# the running balance per product and are taken automatically, in the same
+# transaction, once a product has SNAPSHOT_EVERY movements since its last
+# one; stock as of any date therefore reads one snapshot and a bounded tail
+# of movements, and rebuild_stock() can regenerate and verify the counters
+# from the ledger.
+#
+# Functions taking conn are write units (see db/writer.py): they never
+# commit and rely on the caller's BEGIN IMMEDIATE transaction. Every
+# decrement is conditional, so stock can never go negative.
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db.database import connection, initialize_db, transaction
+
+SNAPSHOT_EVERY = 1_000   # movements per product between snapshots
+
+
+class InventoryError(Exception):
+    """Raised inside a write unit when stock cannot cover a change."""
+
+
+def available_to_promise(product_id: int) -> dict | None:
+    with connection() as conn:
+        row = conn.execute("""
+            SELECT id, stock_qty, reserved_qty, backorder_qty, reorder_lvl
+            FROM products WHERE id = ?
+        """, (product_id,)).fetchone()
+    if row is None:
+        return None
+    return {
+        "product_id":  row["id"],
+        "available":   row["stock_qty"],
+        "reserved":    row["reserved_qty"],
+        "on_hand":     row["stock_qty"] + row["reserved_qty"],
+        "backordered": row["backorder_qty"],
+        "tracked":     row["reorder_lvl"] > 0,
+    }
+
+
+def record_movements(conn, kind: str, rows, note: str = None):
+    """Append (product_id, stock_delta, reserved_delta, order_id) rows to the ledger."""
+    conn.executemany("""
+        INSERT INTO inventory_movements
+            (product_id, kind, stock_delta, reserved_delta, order_id, note)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(pid, kind, stock, reserved, order_id, note)
+          for pid, stock, reserved, order_id in rows if stock or reserved])
+    snapshot_due(conn)
+
+
+# ── Reserving ─────────────────────────────────────────────────
+
+def reserve(conn, product_id: int, quantity: int, allow_backorder: bool = False) -> tuple | None:
+    """Move quantity of a tracked product from stock into reserved.
+
+    Returns (reserved, backordered), or None if stock is short and
+    backorders are not allowed. Untracked products (services) return
+    (0, 0) and are never reserved. Callers record the result with
+    save_reservations(), which also writes the ledger.
+    """
+    taken = quantity
+    if allow_backorder:
+        row = conn.execute(
+            "SELECT stock_qty, reorder_lvl FROM products WHERE id = ?", (product_id,)
+        ).fetchone()
+        if row is None or row["reorder_lvl"] <= 0:
+            return 0, 0
+        taken = min(row["stock_qty"], quantity)
+    short = quantity - taken
+
+    cur = conn.execute("""
+        UPDATE products
+        SET stock_qty     = stock_qty - ?,
+            reserved_qty  = reserved_qty + ?,
+            backorder_qty = backorder_qty + ?
+        WHERE id = ? AND reorder_lvl > 0 AND stock_qty >= ?
+    """, (taken, taken, short, product_id, taken))
+    if cur.rowcount:
+        return taken, short
+
+    row = conn.execute("SELECT reorder_lvl FROM products WHERE id = ?", (product_id,)).fetchone()
+    if row is None or row["reorder_lvl"] <= 0:
+        return 0, 0
+    return None
+
+
+def save_reservations(conn, order_id: int, reservations):
+    """Record (product_id, reserved, backordered) rows for an order."""
+    conn.executemany("""
+        INSERT INTO inventory_reservations (order_id, product_id, reserved, backordered)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (order_id, product_id) DO UPDATE SET
+            reserved    = reserved + excluded.reserved,
+            backordered = backordered + excluded.backordered
+    """, [(order_id, pid, res, back) for pid, res, back in reservations if res or back])
+    record_movements(conn, "sale", [(pid, -res, res, order_id) for pid, res, _ in reservations])
+
+
+def reserve_order(conn, order_id: int, allow_backorder: bool = False) -> int:
+    """Reserve stock for every line of an existing order (e.g. when reopened).
+
+    Raises InventoryError if a line is short and backorders are not allowed.
+    Returns the number of units backordered.
+    """
+    reservations = []
+    for product_id, quantity in conn.execute("""
+        SELECT product_id, SUM(quantity)
+        FROM order_items WHERE order_id = ?
+        GROUP BY product_id
+    """, (order_id,)).fetchall():
+        taken = reserve(conn, product_id, quantity, allow_backorder)
+        if taken is None:
+            raise InventoryError(f"Insufficient stock for product {product_id} to reserve order #{order_id}.")
+        reservations.append((product_id, *taken))
+    save_reservations(conn, order_id, reservations)
+    return sum(back for _, _, back in reservations)
+
+
+# ── Shipping & Releasing ──────────────────────────────────────
+
+def backordered_units(conn, order_id: int) -> int:
+    return conn.execute(
+        "SELECT COALESCE(SUM(backordered), 0) FROM inventory_reservations WHERE order_id = ?",
+        (order_id,)
+    ).fetchone()[0]
+
+
+def ship_orders(conn, order_ids: list):
+    """Consume the reservations of orders being fulfilled, as set-based statements."""
+    ids = json.dumps(order_ids)
+    waiting = conn.execute("""
+        SELECT order_id, SUM(backordered) FROM inventory_reservations
+        WHERE order_id IN (SELECT value FROM json_each(?)) AND backordered > 0
+        GROUP BY order_id LIMIT 1
+    """, (ids,)).fetchone()
+    if waiting:
+        raise InventoryError(
+            f"Order #{waiting[0]} has {waiting[1]} unit(s) on backorder; it can be fulfilled once stock arrives."
+        )
+    conn.execute("""
+        INSERT INTO inventory_movements (product_id, kind, reserved_delta, order_id)
+        SELECT product_id, 'ship', -reserved, order_id
+        FROM inventory_reservations
+        WHERE order_id IN (SELECT value FROM json_each(?)) AND reserved > 0
+    """, (ids,))
+    snapshot_due(conn)
+    conn.execute("""
+        UPDATE products
+        SET reserved_qty = reserved_qty - r.reserved
+        FROM (SELECT product_id, SUM(reserved) AS reserved
+              FROM inventory_reservations
+              WHERE order_id IN (SELECT value FROM json_each(?))
+              GROUP BY product_id) AS r
+        WHERE products.id = r.product_id
+    """, (ids,))
+    conn.execute(
+        "DELETE FROM inventory_reservations WHERE order_id IN (SELECT value FROM json_each(?))", (ids,)
+    )
+
+
+def release_orders(conn, order_ids: list):
+    """Return reserved units of cancelled orders to stock and drop their backorders."""
+    ids = json.dumps(order_ids)
+    product_ids = [pid for (pid,) in conn.execute("""
+        SELECT DISTINCT product_id FROM inventory_reservations
+        WHERE order_id IN (SELECT value FROM json_each(?))
+    """, (ids,))]
+    conn.execute("""
+        INSERT INTO inventory_movements (product_id, kind, stock_delta, reserved_delta, order_id)
+        SELECT product_id, 'cancel', reserved, -reserved, order_id
+        FROM inventory_reservations
+        WHERE order_id IN (SELECT value FROM json_each(?)) AND reserved > 0
+    """, (ids,))
+    snapshot_due(conn)
+    conn.execute("""
+        UPDATE products
+        SET stock_qty     = stock_qty + r.reserved,
+            reserved_qty  = reserved_qty - r.reserved,
+            backorder_qty = backorder_qty - r.backordered
+        FROM (SELECT product_id, SUM(reserved) AS reserved, SUM(backordered) AS backordered
+              FROM inventory_reservations
+              WHERE order_id IN (SELECT value FROM json_each(?))
+              GROUP BY product_id) AS r
+        WHERE products.id = r.product_id
+    """, (ids,))
+    conn.execute(
+        "DELETE FROM inventory_reservations WHERE order_id IN (SELECT value FROM json_each(?))", (ids,)
+    )
+    fill_backorders(conn, product_ids)
+
+
+# ── Receiving & Backorders ────────────────────────────────────
+
+def fill_backorders(conn, product_ids) -> int:
+    """Allocate available stock to backordered lines, oldest order first.
+
+    Returns the number of units moved from backorder to reserved.
+    """
+    filled = 0
+    for product_id in product_ids:
+        row = conn.execute(
+            "SELECT stock_qty, backorder_qty FROM products WHERE id = ?", (product_id,)
+        ).fetchone()
+        if row is None or not row["backorder_qty"] or not row["stock_qty"]:
+            continue
+        stock, allocated, movements = row["stock_qty"], 0, []
+        for order_id, backordered in conn.execute("""
+            SELECT order_id, backordered FROM inventory_reservations
+            WHERE product_id = ? AND backordered > 0
+            ORDER BY order_id
+        """, (product_id,)).fetchall():
+            take = min(stock - allocated, backordered)
+            conn.execute("""
+                UPDATE inventory_reservations
+                SET reserved = reserved + ?, backordered = backordered - ?
+                WHERE order_id = ? AND product_id = ?
+            """, (take, take, order_id, product_id))
+            movements.append((product_id, -take, take, order_id))
+            allocated += take
+            if allocated == stock:
+                break
+        conn.execute("""
+            UPDATE products
+            SET stock_qty     = stock_qty - ?,
+                reserved_qty  = reserved_qty + ?,
+                backorder_qty = backorder_qty - ?
+            WHERE id = ? AND stock_qty >= ?
+        """, (allocated, allocated, allocated, product_id, allocated))
+        record_movements(conn, "sale", movements, note="backorder filled")
+        filled += allocated
+    return filled
+
+
+def receive_stock(conn, product_id: int, quantity: int, note: str = None) -> int:
+    """Add received units to stock, filling backorders first. Returns units filled."""
+    if quantity <= 0:
+        raise InventoryError("Received quantity must be positive.")
+    cur = conn.execute(
+        "UPDATE products SET stock_qty = stock_qty + ? WHERE id = ?", (quantity, product_id)
+    )
+    if cur.rowcount == 0:
+        raise InventoryError(f"No product with ID {product_id}.")
+    record_movements(conn, "receipt", [(product_id, quantity, 0, None)], note)
+    return fill_backorders(conn, [product_id])
+
+
+def adjust_stock(conn, product_id: int, delta: int, note: str) -> int:
+    """Correct available stock by delta (stock counts, shrinkage). Returns units filled."""
+    if not delta:
+        raise InventoryError("Adjustment must be non-zero.")
+    cur = conn.execute(
+        "UPDATE products SET stock_qty = stock_qty + ? WHERE id = ? AND stock_qty + ? >= 0",
+        (delta, product_id, delta)
+    )
+    if cur.rowcount == 0:
+        raise InventoryError(f"No product with ID {product_id}, or not enough available stock to remove {-delta}.")
+    record_movements(conn, "adjustment", [(product_id, delta, 0, None)], note)
+    return fill_backorders(conn, [product_id]) if delta > 0 else 0
+
+
+# ── Reorders ──────────────────────────────────────────────────
+# reorder_queue is kept in step with products by triggers (migration 8),
+# so these reads touch only the products below their reorder level.
+
+def pending_reorders(limit: int = None) -> list:
+    """Products below their reorder level, most urgent first, with a suggested order quantity."""
+    with connection() as conn:
+        return conn.execute("""
+            SELECT * FROM reorder_suggestions
+            ORDER BY units_below_threshold DESC, product_id
+            LIMIT ?
+        """, (limit if limit is not None else -1,)).fetchall()
+
+
+def sync_reorder_queue(conn) -> int:
+    """Re-derive reorder_queue from the partial threshold index. Returns rows changed."""
+    below = "SELECT id FROM products WHERE stock_qty < reorder_lvl AND reorder_lvl > 0"
+    removed = conn.execute(f"DELETE FROM reorder_queue WHERE product_id NOT IN ({below})").rowcount
+    added = conn.execute(f"INSERT OR IGNORE INTO reorder_queue (product_id) {below}").rowcount
+    return removed + added
+
+
+# ── Ledger: Snapshots, As-Of & Rebuild ────────────────────────
+# Snapshots are keyed on the last movement they include. Movement times
+# only move forward, so the first snapshot after an as-of time bounds the
+# movements that have to be summed. movements_since_snapshot (migration 12)
+# counts each product's movements since its last snapshot.
+
+def take_snapshots(conn, min_movements: int = SNAPSHOT_EVERY, product_ids=None) -> int:
+    """Snapshot each product (default: all) with at least min_movements since its last snapshot."""
+    if product_ids is None:
+        product_ids = [pid for (pid,) in conn.execute("SELECT id FROM products")]
+    taken = 0
+    for product_id in product_ids:
+        last = conn.execute("""
+            SELECT movement_id, stock_qty, reserved_qty FROM stock_snapshots
+            WHERE product_id = ? ORDER BY movement_id DESC LIMIT 1
+        """, (product_id,)).fetchone()
+        start, stock, reserved = tuple(last) if last else (0, 0, 0)
+        count, stock_delta, reserved_delta, last_id = conn.execute("""
+            SELECT COUNT(*), SUM(stock_delta), SUM(reserved_delta), MAX(id)
+            FROM inventory_movements
+            WHERE product_id = ? AND id > ?
+        """, (product_id, start)).fetchone()
+        if not count or count < min_movements:
+            continue
+        conn.execute("""
+            INSERT INTO stock_snapshots (product_id, movement_id, taken_at, stock_qty, reserved_qty)
+            SELECT ?, id, created_at, ?, ? FROM inventory_movements WHERE id = ?
+        """, (product_id, stock + stock_delta, reserved + reserved_delta, last_id))
+        conn.execute(
+            "UPDATE movements_since_snapshot SET movements = 0 WHERE product_id = ?", (product_id,)
+        )
+        taken += 1
+    return taken
+
+
+def snapshot_due(conn) -> int:
+    """Snapshot the products with SNAPSHOT_EVERY movements since their last snapshot."""
+    due = [pid for (pid,) in conn.execute(
+        "SELECT product_id FROM movements_since_snapshot WHERE movements >= ?", (SNAPSHOT_EVERY,)
+    )]
+    return take_snapshots(conn, SNAPSHOT_EVERY, due) if due else 0
+
+
+def stock_as_of(product_id: int, when: str) -> dict:
+    """Available, reserved and on-hand stock at a date ('YYYY-MM-DD', end of day) or time."""
+    if len(when) == 10:
+        when += " 23:59:59"
+    with connection() as conn:
+        snap = conn.execute("""
+            SELECT movement_id, stock_qty, reserved_qty FROM stock_snapshots
+            WHERE product_id = ? AND taken_at <= ?
+            ORDER BY taken_at DESC, movement_id DESC LIMIT 1
+        """, (product_id, when)).fetchone()
+        start, stock, reserved = tuple(snap) if snap else (0, 0, 0)
+        stop = conn.execute("""
+            SELECT MIN(movement_id) FROM stock_snapshots
+            WHERE product_id = ? AND movement_id > ?
+        """, (product_id, start)).fetchone()[0]
+        stock_delta, reserved_delta, tail = conn.execute("""
+            SELECT COALESCE(SUM(stock_delta), 0), COALESCE(SUM(reserved_delta), 0), COUNT(*)
+            FROM inventory_movements
+            WHERE product_id = ? AND id > ? AND id <= COALESCE(?, 9223372036854775807)
+              AND created_at <= ?
+        """, (product_id, start, stop, when)).fetchone()
+    stock += stock_delta
+    reserved += reserved_delta
+    return {"product_id": product_id, "as_of": when, "available": stock,
+            "reserved": reserved, "on_hand": stock + reserved, "movements_read": tail}
+
+
+def rebuild_stock(conn, apply: bool = True) -> dict:
+    """Regenerate products.stock_qty / reserved_qty from the ledger and verify them.
+
+    With apply=False only reports. Also checks every snapshot against the
+    ledger and the reorder queue against the products below threshold.
+    """
+    ledger = """
+        SELECT p.id, COALESCE(l.stock, 0) AS stock, COALESCE(l.reserved, 0) AS reserved
+        FROM products p
+        LEFT JOIN (SELECT product_id, SUM(stock_delta) AS stock, SUM(reserved_delta) AS reserved
+                   FROM inventory_movements GROUP BY product_id) AS l
+               ON l.product_id = p.id
+    """
+    mismatch_sql = f"""
+        SELECT p.id, p.stock_qty, p.reserved_qty, l.stock, l.reserved
+        FROM products p JOIN ({ledger}) AS l ON l.id = p.id
+        WHERE p.stock_qty != l.stock OR p.reserved_qty != l.reserved
+    """
+    mismatches = conn.execute(mismatch_sql).fetchall()
+    if apply and mismatches:
+        conn.execute(f"""
+            UPDATE products
+            SET stock_qty = l.stock, reserved_qty = l.reserved
+            FROM ({ledger}) AS l
+            WHERE products.id = l.id
+              AND (products.stock_qty != l.stock OR products.reserved_qty != l.reserved)
+        """)
+        if conn.execute(mismatch_sql).fetchone():
+            raise InventoryError("Stock still differs from the ledger after rebuild.")
+
+    bad_snapshots = conn.execute("""
+        SELECT COUNT(*)
+        FROM stock_snapshots s
+        JOIN (SELECT id,
+                     SUM(stock_delta)    OVER w AS stock,
+                     SUM(reserved_delta) OVER w AS reserved
+              FROM inventory_movements
+              WINDOW w AS (PARTITION BY product_id ORDER BY id)) AS m
+          ON m.id = s.movement_id
+        WHERE m.stock != s.stock_qty OR m.reserved != s.reserved_qty
+    """).fetchone()[0]
+
+    if apply:
+        queue_drift = sync_reorder_queue(conn)
+    else:
+        queue_drift = conn.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT id FROM products WHERE stock_qty < reorder_lvl AND reorder_lvl > 0
+                EXCEPT SELECT product_id FROM reorder_queue
+                UNION ALL
+                SELECT product_id FROM reorder_queue
+                EXCEPT SELECT id FROM products WHERE stock_qty < reorder_lvl AND reorder_lvl > 0
+            )
+        """).fetchone()[0]
+
+    return {
+        "products":      conn.execute("SELECT COUNT(*) FROM products").fetchone()[0],
+        "mismatched":    [tuple(m) for m in mismatches],
+        "fixed":         len(mismatches) if apply else 0,
+        "bad_snapshots": bad_snapshots,
+        "queue_drift":   queue_drift,
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    from db.writer import run_write
+
+    parser = argparse.ArgumentParser(description="Inventory receipts, adjustments and ledger tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("receive", help="record received stock")
+    p.add_argument("product", type=int)
+    p.add_argument("quantity", type=int)
+    p.add_argument("--note")
+
+    p = sub.add_parser("adjust", help="correct available stock by +/- units")
+    p.add_argument("product", type=int)
+    p.add_argument("delta", type=int)
+    p.add_argument("--note", required=True, help="reason, e.g. 'cycle count' or 'damaged'")
+
+    p = sub.add_parser("as-of", help="stock on a date (YYYY-MM-DD) or time")
+    p.add_argument("when")
+    p.add_argument("products", nargs="*", type=int, help="product IDs (default: all tracked)")
+
+    p = sub.add_parser("snapshot", help="snapshot products with many movements since their last snapshot")
+    p.add_argument("--min", type=int, default=SNAPSHOT_EVERY, help="minimum movements since the last snapshot")
+
+    p = sub.add_parser("reorders", help="products below their reorder level")
+    p.add_argument("--limit", type=int)
+
+    p = sub.add_parser("rebuild", help="regenerate stock counters from the ledger and verify them")
+    p.add_argument("--check", action="store_true", help="only report differences")
+
+    args = parser.parse_args()
+    initialize_db()
+
+    try:
+        if args.command == "receive":
+            filled = run_write(receive_stock, args.product, args.quantity, args.note)
+            print(f"[INVENTORY] Received {args.quantity} of product {args.product}; "
+                  f"{filled} unit(s) filled backorders.")
+
+        elif args.command == "adjust":
+            filled = run_write(adjust_stock, args.product, args.delta, args.note)
+            print(f"[INVENTORY] Adjusted product {args.product} by {args.delta:+}"
+                  + (f"; {filled} unit(s) filled backorders." if filled else "."))
+
+        elif args.command == "as-of":
+            with connection() as conn:
+                names = dict(conn.execute("SELECT id, name FROM products WHERE reorder_lvl > 0"))
+                if args.products:
+                    names = dict(conn.execute(
+                        "SELECT id, name FROM products WHERE id IN (SELECT value FROM json_each(?))",
+                        (str(args.products),)
+                    ))
+            print(f"  {'ID':<5}  {'PRODUCT':<34}  {'AVAILABLE':>9}  {'RESERVED':>8}  {'ON HAND':>7}")
+            for product_id, name in sorted(names.items()):
+                s = stock_as_of(product_id, args.when)
+                print(f"  {product_id:<5}  {name[:34]:<34}  {s['available']:>9}  {s['reserved']:>8}  {s['on_hand']:>7}")
+
+        elif args.command == "snapshot":
+            with transaction(immediate=True) as conn:
+                taken = take_snapshots(conn, args.min)
+            print(f"[INVENTORY] Took {taken} snapshot(s).")
+
+        elif args.command == "reorders":
+            rows = pending_reorders(args.limit)
+            print(f"  {'ID':<5}  {'PRODUCT':<34}  {'STOCK':>5}  {'LEVEL':>5}  {'BACKORD':>7}  {'SUGGESTED':>9}")
+            for r in rows:
+                print(f"  {r['product_id']:<5}  {r['product'][:34]:<34}  {r['current_stock']:>5}  "
+                      f"{r['reorder_level']:>5}  {r['backordered']:>7}  {r['suggested_qty']:>9}")
+            print(f"[INVENTORY] {len(rows)} product(s) to reorder.")
+
+        elif args.command == "rebuild":
+            with transaction(immediate=True) as conn:
+                result = rebuild_stock(conn, apply=not args.check)
+            for product_id, stock, reserved, l_stock, l_reserved in result["mismatched"]:
+                print(f"[INVENTORY] Product {product_id}: stock {stock}/{l_stock}, "
+                      f"reserved {reserved}/{l_reserved} (counter/ledger)")
+            verb = "fixed" if not args.check else "differ"
+            print(f"[INVENTORY] {result['products']} product(s) checked, "
+                  f"{len(result['mismatched'])} {verb}, {result['bad_snapshots']} bad snapshot(s), "
+                  f"{result['queue_drift']} reorder queue row(s) out of step.")
+    except InventoryError as e:
+        print(f"[INVENTORY] {e}")
+        sys.exit(1)
@@ -0,0 +1,347 @@
+# Headless order placement — no prompts, safe for many concurrent callers.
+#
+# place_order() runs as one write unit (see db/writer.py): inside a
+# BEGIN IMMEDIATE transaction it re-reads prices and stock, reserves stock
+# with conditional updates that can never go below zero (modules/inventory.py),
+# and either commits the whole order or rolls it all back and reports what
+# was wrong per line.
+#
+# change_status() moves any number of orders between statuses in one
+# transaction: the state machine is checked in SQL, and fulfilment,
+# cancellation and restocking run as set-based statements. Each order gets
+# its own outcome. set_order_status() is the single-order form used by the menus.
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db.database import connection, initialize_db
+from db.writer import run_write
+from modules.inventory import InventoryError, reserve, reserve_order, save_reservations, \
+    ship_orders, release_orders
+
+# Per-line outcomes
+LINE_OK = "ok"
+LINE_UNKNOWN_PRODUCT = "unknown_product"
+LINE_INVALID_QTY = "invalid_quantity"
+LINE_INSUFFICIENT_STOCK = "insufficient_stock"
+
+
+# Allowed status changes: current status -> new statuses
+TRANSITIONS = {
+    "pending":   ("fulfilled", "cancelled"),
+    "cancelled": ("pending",),
+}
+
+# Per-order outcomes of a status change
+CHANGE_OK = "ok"
+CHANGE_NOT_FOUND = "not_found"
+CHANGE_INVALID = "invalid_transition"
+CHANGE_BACKORDERED = "backordered"
+CHANGE_INSUFFICIENT_STOCK = "insufficient_stock"
+
+
+class OrderRejected(Exception):
+    """Raised inside the write unit so the whole order is rolled back."""
+
+    def __init__(self, result: dict):
+        super().__init__(result["error"])
+        self.result = result
+
+
+def normalize_lines(lines) -> list:
+    # Accepts (product_id, quantity) pairs or dicts with those keys and
+    # merges repeated products into one line, keeping first-seen order.
+    merged = {}
+    for line in lines:
+        if isinstance(line, dict):
+            product_id, quantity = line["product_id"], line["quantity"]
+        else:
+            product_id, quantity = line
+        product_id, quantity = int(product_id), int(quantity)
+        merged[product_id] = merged.get(product_id, 0) + quantity
+    return [{"product_id": pid, "quantity": qty} for pid, qty in merged.items()]
+
+
+def _result(ok: bool, lines: list, order_id: int = None, error: str = None) -> dict:
+    return {
+        "ok":           ok,
+        "order_id":     order_id,
+        "total_amount": round(sum(l["quantity"] * (l["unit_price"] or 0) for l in lines), 2),
+        "lines":        lines,
+        "error":        error,
+    }
+
+
+def apply_order(conn, customer_id: int, employee_id: int, lines: list, created_at: str,
+                allow_backorder: bool = False) -> dict:
+    """Write unit: insert one order or raise OrderRejected. Never commits."""
+    customer = conn.execute(
+        "SELECT id FROM customers WHERE id = ? AND is_active = 1", (customer_id,)
+    ).fetchone()
+    employee = conn.execute(
+        "SELECT id FROM employees WHERE id = ? AND is_active = 1", (employee_id,)
+    ).fetchone()
+
+    # One lookup for every product on the order, however many lines it has
+    products = {row["id"]: row for row in conn.execute("""
+        SELECT id, name, unit_price, stock_qty, reorder_lvl
+        FROM products
+        WHERE id IN (SELECT value FROM json_each(?))
+    """, (json.dumps([line["product_id"] for line in lines]),))}
+
+    outcomes = []
+    for line in lines:
+        product = products.get(line["product_id"])
+        outcome = {
+            "product_id": line["product_id"],
+            "name":       product["name"] if product else None,
+            "quantity":   line["quantity"],
+            "unit_price": product["unit_price"] if product else None,
+            "available":  product["stock_qty"] if product else None,
+            "tracked":    bool(product and product["reorder_lvl"] > 0),
+            "backordered": 0,
+            "status":     LINE_OK,
+        }
+        if product is None:
+            outcome["status"] = LINE_UNKNOWN_PRODUCT
+        elif line["quantity"] <= 0:
+            outcome["status"] = LINE_INVALID_QTY
+        outcomes.append(outcome)
+
+    if not customer:
+        raise OrderRejected(_result(False, outcomes, error=f"No active customer with ID {customer_id}."))
+    if not employee:
+        raise OrderRejected(_result(False, outcomes, error=f"No active employee with ID {employee_id}."))
+    if not outcomes:
+        raise OrderRejected(_result(False, outcomes, error="An order must have at least one line item."))
+
+    # Reserve stock for physical products (reorder_lvl > 0; services are
+    # not stock-tracked). Each reservation is a conditional decrement, so
+    # stock can never be oversold; short lines fail unless backordered.
+    reservations = []
+    for outcome in outcomes:
+        if outcome["status"] != LINE_OK:
+            continue
+        taken = reserve(conn, outcome["product_id"], outcome["quantity"], allow_backorder)
+        if taken is None:
+            outcome["status"] = LINE_INSUFFICIENT_STOCK
+            continue
+        outcome["backordered"] = taken[1]
+        reservations.append((outcome["product_id"], *taken))
+
+    if any(o["status"] != LINE_OK for o in outcomes):
+        raise OrderRejected(_result(False, outcomes, error="One or more lines could not be fulfilled."))
+
+    total_amount = round(sum(o["quantity"] * o["unit_price"] for o in outcomes), 2)
+    order_id = conn.execute("""
+        INSERT INTO orders (customer_id, employee_id, status, created_at, total_amount)
+        VALUES (?, ?, 'pending', ?, ?)
+    """, (customer_id, employee_id, created_at, total_amount)).lastrowid
+
+    conn.executemany("""
+        INSERT INTO order_items (order_id, product_id, quantity, unit_price)
+        VALUES (?, ?, ?, ?)
+    """, [(order_id, o["product_id"], o["quantity"], o["unit_price"]) for o in outcomes])
+    save_reservations(conn, order_id, reservations)
+
+    conn.execute(
+        "UPDATE customers SET last_order = ? WHERE id = ?", (created_at[:10], customer_id)
+    )
+    return _result(True, outcomes, order_id=order_id)
+
+
+def place_order(customer_id: int, employee_id: int, lines, created_at: str = None,
+                allow_backorder: bool = False) -> dict:
+    """Place an order without any prompts.
+
+    lines is an iterable of (product_id, quantity) pairs or dicts. Returns
+    a dict with ok, order_id, total_amount, error and per-line outcomes
+    (status, unit_price, the stock that was available and, with
+    allow_backorder, the units backordered).
+    """
+    created_at = created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        return run_write(apply_order, customer_id, employee_id, normalize_lines(lines),
+                         created_at, allow_backorder)
+    except OrderRejected as e:
+        return e.result
+
+
+# ── Status Changes ────────────────────────────────────────────
+
+def change_status(conn, order_ids, new_status: str, changed_at: str = None,
+                  allow_backorder: bool = False) -> list:
+    """Write unit: move orders to new_status, shipping, releasing or re-reserving their stock.
+
+    Orders that cannot make the change are left untouched. Returns one
+    {order_id, old_status, outcome} dict per requested order.
+    """
+    changed_at = changed_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    ids = json.dumps(sorted({int(i) for i in order_ids}))
+    allowed = json.dumps([[old, new] for old, news in TRANSITIONS.items() for new in news])
+
+    outcomes = [dict(row) for row in conn.execute("""
+        WITH requested(order_id) AS (SELECT value FROM json_each(?)),
+             allowed(old_status, new_status) AS (
+                 SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?)
+             )
+        SELECT r.order_id,
+               o.status AS old_status,
+               CASE
+                   WHEN o.id IS NULL         THEN 'not_found'
+                   WHEN a.old_status IS NULL THEN 'invalid_transition'
+                   WHEN a.new_status = 'fulfilled' AND EXISTS (
+                        SELECT 1 FROM inventory_reservations ir
+                        WHERE ir.order_id = o.id AND ir.backordered > 0
+                   )                         THEN 'backordered'
+                   ELSE 'ok'
+               END AS outcome
+        FROM requested r
+        LEFT JOIN orders  o ON o.id = r.order_id
+        LEFT JOIN allowed a ON a.old_status = o.status AND a.new_status = ?
+        ORDER BY r.order_id
+    """, (ids, allowed, new_status))]
+
+    ready = [o for o in outcomes if o["outcome"] == CHANGE_OK]
+    if new_status == "fulfilled":
+        ship_orders(conn, [o["order_id"] for o in ready])
+    elif new_status == "cancelled":
+        release_orders(conn, [o["order_id"] for o in ready])
+    else:
+        # Reopening re-reserves stock oldest order first; an order that
+        # cannot be covered is rolled back alone and stays cancelled.
+        for o in ready:
+            conn.execute("SAVEPOINT reopen_order")
+            try:
+                reserve_order(conn, o["order_id"], allow_backorder)
+            except InventoryError:
+                conn.execute("ROLLBACK TO reopen_order")
+                o["outcome"] = CHANGE_INSUFFICIENT_STOCK
+            conn.execute("RELEASE reopen_order")
+
+    conn.execute("""
+        UPDATE orders
+        SET status = ?, fulfilled_at = ?
+        WHERE id IN (SELECT value FROM json_each(?))
+    """, (new_status, changed_at if new_status == "fulfilled" else None,
+          json.dumps([o["order_id"] for o in outcomes if o["outcome"] == CHANGE_OK])))
+    return outcomes
+
+
+def set_order_status(conn, order_id: int, new_status: str, changed_at: str = None,
+                     allow_backorder: bool = False) -> str:
+    """Write unit: change_status() for one order.
+
+    Raises InventoryError if the change is not allowed or stock cannot
+    cover it. Returns the previous status.
+    """
+    result = change_status(conn, [order_id], new_status, changed_at, allow_backorder)[0]
+    outcome, old_status = result["outcome"], result["old_status"]
+    if outcome == CHANGE_NOT_FOUND:
+        raise InventoryError(f"No order found with ID {order_id}.")
+    if outcome == CHANGE_INVALID:
+        raise InventoryError(f"Order #{order_id} is {old_status} and cannot be marked {new_status}.")
+    if outcome == CHANGE_BACKORDERED:
+        raise InventoryError(
+            f"Order #{order_id} has units on backorder; it can be fulfilled once stock arrives."
+        )
+    if outcome == CHANGE_INSUFFICIENT_STOCK:
+        raise InventoryError(f"Insufficient stock to reserve order #{order_id}.")
+    return old_status
+
+
+# ── Bulk Status Changes ───────────────────────────────────────
+
+def find_orders(status: str = None, older_than_days: int = None, region: str = None,
+                customer_id: int = None, limit: int = None) -> list:
+    """Order IDs matching a filter, oldest first."""
+    where, params = [], []
+    if status:
+        where.append("o.status = ?")
+        params.append(status)
+    if older_than_days is not None:
+        where.append("o.created_at < DATETIME('now', 'localtime', ?)")
+        params.append(f"-{int(older_than_days)} days")
+    if region:
+        where.append("c.region = ? COLLATE NOCASE")
+        params.append(region)
+    if customer_id is not None:
+        where.append("o.customer_id = ?")
+        params.append(customer_id)
+    sql = f"""
+        SELECT o.id
+        FROM orders o
+        JOIN customers c ON c.id = o.customer_id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY o.id
+        LIMIT ?
+    """
+    with connection() as conn:
+        return [row[0] for row in conn.execute(sql, params + [limit if limit is not None else -1])]
+
+
+def read_order_ids(path: str) -> list:
+    """Order IDs from a file: the first field of each line (headers and comments are skipped)."""
+    ids = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            fields = line.replace(",", " ").split()
+            if fields and fields[0].isdigit():
+                ids.append(int(fields[0]))
+    return ids
+
+
+def bulk_change_status(order_ids, new_status: str, allow_backorder: bool = False) -> dict:
+    """Change the status of many orders in one transaction.
+
+    Returns {"outcomes": [...], "counts": {outcome: n}, "seconds": float}.
+    """
+    started = time.perf_counter()
+    outcomes = run_write(change_status, list(order_ids), new_status, None, allow_backorder)
+    counts = {}
+    for o in outcomes:
+        counts[o["outcome"]] = counts.get(o["outcome"], 0) + 1
+    return {"outcomes": outcomes, "counts": counts,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk order status changes")
+    parser.add_argument("new_status", choices=["fulfilled", "cancelled", "pending"])
+    parser.add_argument("--ids", help="comma-separated order IDs")
+    parser.add_argument("--file", help="file with one order ID per line")
+    parser.add_argument("--status", help="select orders currently in this status")
+    parser.add_argument("--older-than", type=int, metavar="DAYS", help="select orders created more than DAYS ago")
+    parser.add_argument("--region", help="select orders of customers in this region")
+    parser.add_argument("--customer", type=int, help="select orders of this customer")
+    parser.add_argument("--limit", type=int, help="select at most this many orders")
+    parser.add_argument("--backorder", action="store_true", help="when reopening, backorder missing stock")
+    parser.add_argument("--show", type=int, default=20, help="per-order outcomes to print (default 20)")
+    args = parser.parse_args()
+    initialize_db()
+
+    order_ids = []
+    if args.ids:
+        order_ids += [int(i) for i in args.ids.split(",") if i.strip()]
+    if args.file:
+        order_ids += read_order_ids(args.file)
+    if args.status or args.older_than is not None or args.region or args.customer is not None:
+        order_ids += find_orders(args.status, args.older_than, args.region, args.customer, args.limit)
+    if not order_ids:
+        parser.error("no orders selected (use --ids, --file or a filter)")
+
+    result = bulk_change_status(order_ids, args.new_status, args.backorder)
+    for o in result["outcomes"][:args.show]:
+        print(f"  #{o['order_id']:<8} {str(o['old_status'] or '—'):<10} {o['outcome']}")
+    if len(result["outcomes"]) > args.show:
+        print(f"  ... {len(result['outcomes']) - args.show:,} more")
+    summary = ", ".join(f"{n:,} {outcome}" for outcome, n in sorted(result["counts"].items()))
+    print(f"[ORDERS] {len(result['outcomes']):,} order(s) -> {args.new_status}: {summary}  "
+          f"({result['seconds']}s)")
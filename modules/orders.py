@@ -1,64 +1,40 @@
 import os
 import sys
-from datetime import datetime
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from db.database import get_connection
+from db.database import connection
+from db.writer import run_write
+from modules.order_service import place_order, set_order_status, LINE_OK, LINE_INSUFFICIENT_STOCK
+from modules.inventory import InventoryError, backordered_units
+from modules.customers import find_customers
+from modules.catalog import get_catalog, with_stock
+from modules.cart import Cart, WINDOW as CART_WINDOW, parse_lines, read_lines_file
+from modules.render import Column, print_table
+from modules.pagination import KeysetPager, browse
 from modules.auth import (
     require_permission, print_header, ok, err, warn,
     pause, divider, get_str_input, get_int_input, get_choice, C
 )
 
+CUSTOMER_PICK_LIMIT = 20
 
-# ── Table Printers ────────────────────────────────────────────
-
-def _print_order_table(rows):
-    if not rows:
-        warn("No orders found.")
-        return
 
-    W = {"id": 5, "customer": 24, "employee": 20, "status": 11, "created": 12, "total": 12}
-
-    def col(val, width):
-        return str(val or "—")[:width].ljust(width)
-
-    def status_color(s):
-        return {
-            "fulfilled": C.GREEN,
-            "pending":   C.YELLOW,
-            "cancelled": C.RED,
-        }.get(s, C.RESET)
-
-    print(C.BOLD)
-    print(
-        f"  {'ID':<{W['id']}}  "
-        f"{'CUSTOMER':<{W['customer']}}  "
-        f"{'PROCESSED BY':<{W['employee']}}  "
-        f"{'STATUS':<{W['status']}}  "
-        f"{'DATE':<{W['created']}}  "
-        f"{'TOTAL':>{W['total']}}"
-    )
-    print(C.RESET, end="")
-    divider()
-
-    for row in rows:
-        sc = status_color(row["status"])
-        total = f"${row['total_amount']:,.2f}" if row["total_amount"] else "—"
-        print(
-            f"  {col(row['id'],           W['id'])}  "
-            f"{col(row['customer'],      W['customer'])}  "
-            f"{col(row['employee'],      W['employee'])}  "
-            f"{sc}{col(row['status'], W['status'])}{C.RESET}  "
-            f"{col(row['created_at'][:10], W['created'])}  "
-            f"{total:>{W['total']}}"
-        )
+# ── Table Printers ────────────────────────────────────────────
 
-    divider()
-    print(f"  {C.DIM}{len(rows)} record(s) returned.{C.RESET}\n")
+def _print_order_table(rows, footer: str = None):
+    print_table(rows, [
+        Column("id",           "ID",           5),
+        Column("customer",     "CUSTOMER",     24),
+        Column("employee",     "PROCESSED BY", 20),
+        Column("status",       "STATUS",       11,
+               colour={"fulfilled": C.GREEN, "pending": C.YELLOW, "cancelled": C.RED}),
+        Column("created_at",   "DATE",         12, fmt=lambda v: v[:10] if v else "—"),
+        Column("total_amount", "TOTAL",        12, ">", fmt=lambda v: f"${v:,.2f}" if v else "—"),
+    ], empty="No orders found.", footer=footer, pager=True)
 
 
-def _print_line_items(items):
+def _print_line_items(items, hidden: int = 0):
     if not items:
         return
     print(f"\n  {C.BOLD}Line Items:{C.RESET}")
@@ -73,11 +49,14 @@ def _print_line_items(items):
             f"${item['unit_price']:>10,.2f}  "
             f"${subtotal:>10,.2f}"
         )
+    if hidden > 0:
+        print(f"  {C.DIM}... {hidden:,} more line(s) not shown{C.RESET}")
     divider("─", 55)
 
 
-def _print_product_catalog(products):
-    print(f"\n  {C.BOLD}Available Products:{C.RESET}")
+def _print_product_catalog(products, title: str = "Available Products", page: tuple = None):
+    heading = f"{title} (page {page[0] + 1} of {page[1]})" if page else title
+    print(f"\n  {C.BOLD}{heading}:{C.RESET}")
     divider("─", 62)
     print(f"  {'ID':<5}  {'PRODUCT':<34}  {'CATEGORY':<12}  {'PRICE':>10}  {'STOCK':>6}")
     divider("─", 62)
@@ -94,6 +73,60 @@ def _print_product_catalog(products):
     print(f"  {C.DIM}* Red stock = below reorder threshold{C.RESET}\n")
 
 
+def _load_cart_lines(cart, catalog):
+    # Bulk entry: a file path, or pasted "product_id,quantity" lines ending
+    # with a blank line. Loaded lines add to any quantity already in the cart.
+    print(f"  {C.DIM}Enter a file path, or paste 'product_id,quantity' lines and finish with a blank line.{C.RESET}")
+    first = get_str_input("Lines : ", allow_blank=True)
+    if not first:
+        return
+
+    if os.path.isfile(os.path.expanduser(first)):
+        try:
+            entries, errors = read_lines_file(first)
+        except (OSError, UnicodeDecodeError) as e:
+            err(f"Could not read '{first}': {e}")
+            return
+    else:
+        pasted = [first]
+        while True:
+            try:
+                raw = get_str_input("", allow_blank=True)
+            except EOFError:
+                break
+            except KeyboardInterrupt:
+                print()
+                warn("Load cancelled — the cart is unchanged.")
+                return
+            if not raw:
+                break
+            pasted.append(raw)
+        entries, errors = parse_lines(pasted)
+
+    added, unknown = cart.load(entries, catalog)
+    errors = sorted(errors + unknown)
+    ok(f"Loaded {added:,} line(s) — cart has {len(cart):,} line(s), total ${cart.total:,.2f}")
+    if errors:
+        warn(f"{len(errors):,} line(s) skipped:")
+        for line_no, message in errors[:CART_WINDOW]:
+            print(f"    line {line_no}: {message}")
+        if len(errors) > CART_WINDOW:
+            print(f"    {C.DIM}... and {len(errors) - CART_WINDOW:,} more{C.RESET}")
+    print(f"  {C.DIM}Stock is checked for every line when the order is submitted.{C.RESET}")
+
+
+def _print_rejected_lines(result: dict):
+    rejected = [line for line in result["lines"] if line["status"] != LINE_OK]
+    for line in rejected[:CART_WINDOW]:
+        print(
+            f"    {str(line['name'] or line['product_id'])[:34]:<34}  "
+            f"qty {line['quantity']:>4}  {C.RED}{line['status']}{C.RESET}"
+            f"  (available: {line['available'] if line['available'] is not None else '—'})"
+        )
+    if len(rejected) > CART_WINDOW:
+        print(f"    {C.DIM}... and {len(rejected) - CART_WINDOW:,} more rejected line(s){C.RESET}")
+
+
 # ── Create the Order ──────────────────────────────────────────────
 
 def create_order(session: dict):
@@ -118,15 +151,7 @@ def create_order(session: dict):
             pause()
             return
 
-        conn = get_connection()
-        results = conn.execute("""
-            SELECT id, name, email, region
-            FROM customers
-            WHERE is_active = 1
-              AND (LOWER(name) LIKE LOWER(?) OR LOWER(email) LIKE LOWER(?))
-            ORDER BY name
-        """, (f"%{term}%", f"%{term}%")).fetchall()
-        conn.close()
+        results = find_customers(term, limit=CUSTOMER_PICK_LIMIT, active_only=True)
 
         if not results:
             warn(f"No active customers found matching '{term}'. Try again.")
@@ -147,54 +172,76 @@ def create_order(session: dict):
             ok(f"Customer selected: {customer['name']}")
 
     print(f"\n  {C.BOLD}Step 2 of 3 — Add Line Items{C.RESET}")
-    print(f"  {C.DIM}Add products to the order. Enter product ID and quantity.{C.RESET}")
-    print(f"  {C.DIM}Type '0' when done adding items.{C.RESET}\n")
+    print(f"  {C.DIM}Add products to the order. Find a product, then enter a quantity.{C.RESET}")
 
-    conn = get_connection()
-    products = conn.execute("""
-        SELECT id, name, category, unit_price, stock_qty, reorder_lvl
-        FROM products
-        ORDER BY category, name
-    """).fetchall()
-    conn.close()
+    catalog = get_catalog()
+    page_no = 0
+    _print_product_catalog(with_stock(catalog.page(page_no)), page=(page_no, catalog.page_count()))
 
-    _print_product_catalog(products)
-    product_map = {p["id"]: p for p in products}
-
-    line_items = []   # list of dicts: {product_id, name, quantity, unit_price}
+    cart = Cart()
 
     while True:
-        # Show running cart
-        if line_items:
-            running_total = sum(i["quantity"] * i["unit_price"] for i in line_items)
-            print(f"  {C.CYAN}Cart ({len(line_items)} item(s))  —  Running total: ${running_total:,.2f}{C.RESET}")
-            _print_line_items(line_items)
+        # Show running cart (most recent lines only)
+        if cart:
+            print(f"  {C.CYAN}Cart ({len(cart):,} line(s))  —  Running total: ${cart.total:,.2f}{C.RESET}")
+            _print_line_items(cart.tail(), hidden=len(cart) - CART_WINDOW)
 
-        print(f"  {C.DIM}Enter product ID to add, or 0 to finish.{C.RESET}")
-        prod_id = get_int_input("Product ID : ", min_val=1)
+        print(f"  {C.DIM}Enter a product ID or part of a product name / category.{C.RESET}")
+        print(f"  {C.DIM}[:n] / [:p] = next / previous catalog page, [:l] = load lines, 0 = finish.{C.RESET}")
+        raw = get_str_input("Product : ")
 
-        if prod_id is None:
-            if not line_items:
+        if raw is None:
+            if not cart:
                 err("An order must have at least one line item.")
                 continue
             break
 
-        if prod_id not in product_map:
-            err(f"No product found with ID {prod_id}.")
+        # Commands are prefixed with ':' so any word can still be searched
+        if raw.lower() in (":n", ":p"):
+            step = 1 if raw.lower() == ":n" else -1
+            page_no = min(max(page_no + step, 0), catalog.page_count() - 1)
+            _print_product_catalog(with_stock(catalog.page(page_no)), page=(page_no, catalog.page_count()))
+            continue
+
+        if raw.lower() == ":l":
+            _load_cart_lines(cart, catalog)
             continue
 
-        product = product_map[prod_id]
+        if raw.isdigit():
+            match = catalog.get(int(raw))
+            if match is None:
+                err(f"No product found with ID {raw}.")
+                continue
+        else:
+            matches = catalog.search(raw)
+            if not matches:
+                warn(f"No products match '{raw}'.")
+                continue
+            if len(matches) == 1:
+                match = matches[0]
+            else:
+                _print_product_catalog(with_stock(matches), title=f"Products matching '{raw}'")
+                pick = get_int_input("Product ID (0 to search again): ", min_val=1)
+                if pick is None:
+                    continue
+                match = catalog.get(pick)
+                if match is None:
+                    err(f"No product found with ID {pick}.")
+                    continue
+
+        product = with_stock([match])[0]   # live stock for the chosen product
+        prod_id = product["id"]
 
         # Check if already in cart
-        existing = next((i for i in line_items if i["product_id"] == prod_id), None)
+        existing = cart.get(prod_id)
         if existing:
-            warn(f"'{product['name']}' is already in the cart (qty: {existing['quantity']}).")
+            warn(f"'{product['name']}' is already in the cart (qty: {existing.quantity}).")
             qty = get_int_input("New quantity (0 to remove): ", min_val=0)
             if qty is None or qty == 0:
-                line_items = [i for i in line_items if i["product_id"] != prod_id]
+                cart.remove(prod_id)
                 ok(f"Removed '{product['name']}' from cart.")
             else:
-                existing["quantity"] = qty
+                cart.set(prod_id, product["name"], qty, product["unit_price"])
                 ok(f"Updated '{product['name']}' quantity to {qty}.")
             continue
 
@@ -206,15 +253,10 @@ def create_order(session: dict):
         if product["reorder_lvl"] > 0 and qty > product["stock_qty"]:
             warn(
                 f"Requested qty ({qty}) exceeds current stock ({product['stock_qty']}). "
-                "Adding anyway — inventory team will be notified."
+                "Stock is re-checked on submit; short lines can then be backordered."
             )
 
-        line_items.append({
-            "product_id": prod_id,
-            "name":       product["name"],
-            "quantity":   qty,
-            "unit_price": product["unit_price"],
-        })
+        cart.set(prod_id, product["name"], qty, product["unit_price"])
         ok(f"Added: {product['name']}  x{qty}  @ ${product['unit_price']:,.2f}")
 
     # ── Review & Confirm ──────────────────────────────
@@ -224,9 +266,8 @@ def create_order(session: dict):
     print(f"  Processed : {session['name']}  ({session['role']})")
     print(f"  Status    : pending")
 
-    total_amount = sum(i["quantity"] * i["unit_price"] for i in line_items)
-    _print_line_items(line_items)
-    print(f"\n  {C.BOLD}Order Total: {C.GREEN}${total_amount:,.2f}{C.RESET}")
+    _print_line_items(cart.window(), hidden=len(cart) - CART_WINDOW)
+    print(f"\n  {C.BOLD}Order Total: {C.GREEN}${cart.total:,.2f}{C.RESET}  ({len(cart):,} line(s), {cart.units:,} unit(s))")
     divider()
 
     confirm = get_choice("Submit this order? [y/n]: ", ["y", "n"])
@@ -236,41 +277,40 @@ def create_order(session: dict):
         return
 
     # ── Commit Transaction ────────────────────────────────────
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    conn = get_connection()
     try:
-        cur = conn.execute("""
-            INSERT INTO orders (customer_id, employee_id, status, created_at, total_amount)
-            VALUES (?, ?, 'pending', ?, ?)
-        """, (customer["id"], session["id"], now, total_amount))
-        order_id = cur.lastrowid
-
-        for item in line_items:
-            conn.execute("""
-                INSERT INTO order_items (order_id, product_id, quantity, unit_price)
-                VALUES (?, ?, ?, ?)
-            """, (order_id, item["product_id"], item["quantity"], item["unit_price"]))
-
-            # Decrement stock for physical products
-            conn.execute("""
-                UPDATE products
-                SET stock_qty = MAX(0, stock_qty - ?)
-                WHERE id = ? AND reorder_lvl > 0
-            """, (item["quantity"], item["product_id"]))
-
-        # Update customer last_order timestamp
-        conn.execute("""
-            UPDATE customers SET last_order = ? WHERE id = ?
-        """, (now[:10], customer["id"]))
-
-        conn.commit()
-        ok(f"Order #{order_id} created successfully! Total: ${total_amount:,.2f}")
-
+        result = place_order(customer["id"], session["id"], cart.to_lines())
     except Exception as e:
-        conn.rollback()
         err(f"Transaction failed and was rolled back. Detail: {e}")
-    finally:
-        conn.close()
+        pause()
+        return
+
+    if not result["ok"]:
+        err(f"Order rejected and rolled back — {result['error']}")
+        _print_rejected_lines(result)
+
+        # Lines that are only short on stock can be placed on backorder
+        short_only = all(l["status"] in (LINE_OK, LINE_INSUFFICIENT_STOCK) for l in result["lines"])
+        if not short_only or get_choice(
+            "Place the order with the missing units on backorder? [y/n]: ", ["y", "n"]
+        ) != "y":
+            pause()
+            return
+        try:
+            result = place_order(customer["id"], session["id"], cart.to_lines(), allow_backorder=True)
+        except Exception as e:
+            err(f"Transaction failed and was rolled back. Detail: {e}")
+            pause()
+            return
+        if not result["ok"]:
+            err(f"Order rejected and rolled back — {result['error']}")
+            _print_rejected_lines(result)
+            pause()
+            return
+
+    ok(f"Order #{result['order_id']} created successfully! Total: ${result['total_amount']:,.2f}")
+    backordered = sum(line["backordered"] for line in result["lines"])
+    if backordered:
+        warn(f"{backordered:,} unit(s) are on backorder; the order can be fulfilled once stock arrives.")
 
     pause()
 
@@ -301,14 +341,14 @@ def view_orders(session: dict):
         _view_order_detail(session)
         return
 
-    filters = {"1": ("", "All Orders"),
-               "2": ("WHERE o.status = 'pending'",   "Pending Orders"),
-               "3": ("WHERE o.status = 'fulfilled'", "Fulfilled Orders"),
-               "4": ("WHERE o.status = 'cancelled'", "Cancelled Orders")}
-    where, label = filters[choice]
+    filters = {"1": (None,        "All Orders"),
+               "2": ("pending",   "Pending Orders"),
+               "3": ("fulfilled", "Fulfilled Orders"),
+               "4": ("cancelled", "Cancelled Orders")}
+    status, label = filters[choice]
 
-    conn = get_connection()
-    rows = conn.execute(f"""
+    pager = KeysetPager(
+        """
         SELECT
             o.id,
             c.name  AS customer,
@@ -319,15 +359,45 @@ def view_orders(session: dict):
         FROM orders o
         JOIN customers c  ON o.customer_id  = c.id
         JOIN employees e  ON o.employee_id  = e.id
-        {where}
-        ORDER BY o.created_at DESC
-    """).fetchall()
-    conn.close()
-
-    print()
-    print(f"  {C.BOLD}{label}{C.RESET}\n")
-    _print_order_table(rows)
-    pause()
+        """,
+        keys=(("o.created_at", "created_at"), ("o.id", "id")),
+        where="o.status = ?" if status else "",
+        params=(status,) if status else (),
+        descending=True,
+        count_name=f"orders/{status}" if status else "orders",
+    )
+    browse(session, pager, label, _print_order_table, noun="order")
+
+
+def get_order_detail(order_id: int) -> tuple:
+    """(order, line items, backordered units); order is None if not found."""
+    with connection() as conn:
+        order = conn.execute("""
+            SELECT
+                o.id,
+                c.name  AS customer,
+                c.region,
+                e.first_name || ' ' || e.last_name AS employee,
+                o.status,
+                o.created_at,
+                o.fulfilled_at,
+                o.total_amount
+            FROM orders o
+            JOIN customers c ON o.customer_id = c.id
+            JOIN employees e ON o.employee_id = e.id
+            WHERE o.id = ?
+        """, (order_id,)).fetchone()
+
+        items, waiting = [], 0
+        if order:
+            items = conn.execute("""
+                SELECT p.name AS product, oi.quantity, oi.unit_price
+                FROM order_items oi
+                JOIN products p ON oi.product_id = p.id
+                WHERE oi.order_id = ?
+            """, (order_id,)).fetchall()
+            waiting = backordered_units(conn, order_id)
+    return order, items, waiting
 
 
 def _view_order_detail(session: dict):
@@ -336,37 +406,13 @@ def _view_order_detail(session: dict):
     if order_id is None:
         return
 
-    conn = get_connection()
-    order = conn.execute("""
-        SELECT
-            o.id,
-            c.name  AS customer,
-            c.region,
-            e.first_name || ' ' || e.last_name AS employee,
-            o.status,
-            o.created_at,
-            o.fulfilled_at,
-            o.total_amount
-        FROM orders o
-        JOIN customers c ON o.customer_id = c.id
-        JOIN employees e ON o.employee_id = e.id
-        WHERE o.id = ?
-    """, (order_id,)).fetchone()
+    order, items, waiting = get_order_detail(order_id)
 
     if not order:
-        conn.close()
         err(f"No order found with ID {order_id}.")
         pause()
         return
 
-    items = conn.execute("""
-        SELECT p.name AS product, oi.quantity, oi.unit_price
-        FROM order_items oi
-        JOIN products p ON oi.product_id = p.id
-        WHERE oi.order_id = ?
-    """, (order_id,)).fetchall()
-    conn.close()
-
     sc = {"fulfilled": C.GREEN, "pending": C.YELLOW, "cancelled": C.RED}.get(order["status"], C.RESET)
     print()
     divider()
@@ -378,6 +424,8 @@ def _view_order_detail(session: dict):
     print(f"  Created      : {order['created_at']}")
     if order["fulfilled_at"]:
         print(f"  Fulfilled    : {order['fulfilled_at']}")
+    if waiting:
+        print(f"  Backordered  : {C.YELLOW}{waiting:,} unit(s) awaiting stock{C.RESET}")
     _print_line_items(items)
     print(f"  {C.BOLD}Total: {C.GREEN}${order['total_amount']:,.2f}{C.RESET}")
     divider()
@@ -400,14 +448,13 @@ def update_order_status(session: dict):
     if order_id is None:
         return
 
-    conn = get_connection()
-    order = conn.execute("""
-        SELECT o.id, c.name AS customer, o.status, o.total_amount
-        FROM orders o
-        JOIN customers c ON o.customer_id = c.id
-        WHERE o.id = ?
-    """, (order_id,)).fetchone()
-    conn.close()
+    with connection() as conn:
+        order = conn.execute("""
+            SELECT o.id, c.name AS customer, o.status, o.total_amount
+            FROM orders o
+            JOIN customers c ON o.customer_id = c.id
+            WHERE o.id = ?
+        """, (order_id,)).fetchone()
 
     if not order:
         err(f"No order found with ID {order_id}.")
@@ -442,29 +489,30 @@ def update_order_status(session: dict):
         pause()
         return
 
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
     if order["status"] == "pending" and choice == "1":
-        new_status, fulfilled_at = "fulfilled", now
+        new_status = "fulfilled"
     elif order["status"] == "pending" and choice == "2":
-        new_status, fulfilled_at = "cancelled", None
+        new_status = "cancelled"
     else:
-        new_status, fulfilled_at = "pending", None
+        new_status = "pending"
 
-    conn = get_connection()
-    try:
-        conn.execute("""
-            UPDATE orders
-            SET status = ?, fulfilled_at = ?
-            WHERE id = ?
-        """, (new_status, fulfilled_at, order_id))
-        conn.commit()
-        ok(f"Order #{order_id} status updated to '{new_status.upper()}'.")
-    except Exception as e:
-        conn.rollback()
-        err(f"Update failed: {e}")
-    finally:
-        conn.close()
+    # Fulfilling ships the reserved stock, cancelling returns it, and
+    # reopening reserves it again (or backorders what is missing).
+    allow_backorder = False
+    while True:
+        try:
+            run_write(set_order_status, order_id, new_status, None, allow_backorder)
+            ok(f"Order #{order_id} status updated to '{new_status.upper()}'.")
+        except InventoryError as e:
+            err(f"Update failed: {e}")
+            if new_status == "pending" and not allow_backorder and get_choice(
+                "Reopen it with the missing units on backorder? [y/n]: ", ["y", "n"]
+            ) == "y":
+                allow_backorder = True
+                continue
+        except Exception as e:
+            err(f"Update failed: {e}")
+        break
 
     pause()
 
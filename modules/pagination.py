@@ -0,0 +1,142 @@
+# Keyset (seek) pagination for the order and customer listings.
+#
+# A page is read by seeking past the last row of the current page (or
+# before its first row, going back) on the listing's unique sort key, e.g.
+# (created_at, id), instead of using OFFSET. Every page is then one index
+# range read of page_size + 1 rows, however deep the user goes, and
+# nothing beyond the page is ever fetched. Totals come from the
+# trigger-maintained row_counts table (migration 11), so the page header
+# never counts rows either.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db.database import connection
+from modules.auth import print_header, get_choice, get_int_input, C
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 500
+
+
+def row_count(name: str) -> int | None:
+    with connection() as conn:
+        row = conn.execute("SELECT rows FROM row_counts WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+class KeysetPager:
+    """Pages through select ... [WHERE where] ordered by keys.
+
+    keys are (expression, result column) pairs that together are unique,
+    e.g. (("o.created_at", "created_at"), ("o.id", "id")).
+    """
+
+    def __init__(self, select: str, keys: tuple, where: str = "", params: tuple = (),
+                 descending: bool = False, page_size: int = PAGE_SIZE, count_name: str = None):
+        self.select = select
+        self.keys = keys
+        self.where = where
+        self.params = tuple(params)
+        self.descending = descending
+        self.page_size = page_size
+        self.count_name = count_name
+        self.rows = []
+        self.page_no = 0
+        self.has_next = self.has_prev = False
+
+    def _fetch(self, boundary, forward: bool) -> tuple:
+        ascending = forward != self.descending
+        exprs = [expr for expr, _ in self.keys]
+        conditions, params = ([self.where] if self.where else []), list(self.params)
+        if boundary is not None:
+            conditions.append(f"({', '.join(exprs)}) {'>' if ascending else '<'} "
+                              f"({', '.join('?' * len(exprs))})")
+            params += boundary
+        direction = "ASC" if ascending else "DESC"
+        sql = (f"{self.select}\n"
+               f"{'WHERE ' + ' AND '.join(conditions) if conditions else ''}\n"
+               f"ORDER BY {', '.join(f'{e} {direction}' for e in exprs)}\n"
+               f"LIMIT ?")
+        params.append(self.page_size + 1)
+        with connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if not forward:
+            rows.reverse()
+        return rows, more
+
+    def _key(self, row) -> list:
+        return [row[column] for _, column in self.keys]
+
+    def first(self) -> list:
+        self.rows, self.has_next = self._fetch(None, True)
+        self.page_no, self.has_prev = 0, False
+        return self.rows
+
+    def next(self) -> list:
+        if self.has_next:
+            self.rows, self.has_next = self._fetch(self._key(self.rows[-1]), True)
+            self.page_no += 1
+            self.has_prev = True
+        return self.rows
+
+    def prev(self) -> list:
+        if self.has_prev:
+            rows, self.has_prev = self._fetch(self._key(self.rows[0]), False)
+            if not self.has_prev or len(rows) < self.page_size:
+                return self.first()   # rows before us were deleted; start over
+            self.rows, self.has_next = rows, True
+            self.page_no -= 1
+        return self.rows
+
+    def resize(self, page_size: int) -> list:
+        self.page_size = page_size
+        return self.first()
+
+    def total(self) -> int | None:
+        return row_count(self.count_name) if self.count_name else None
+
+
+def browse(session: dict, pager: KeysetPager, title: str, print_page, noun: str = "record"):
+    """Page through pager until the user goes back.
+
+    print_page(rows, footer) prints one page. The page size chosen is kept
+    in the session for the next listing.
+    """
+    pager.page_size = session.get("page_size", pager.page_size)
+    pager.first()
+
+    while True:
+        print_header(session)
+        print(f"  {C.BOLD}{title}{C.RESET}")
+
+        total = pager.total()
+        pages = f" of {max(1, -(-total // pager.page_size)):,}" if total is not None else ""
+        counted = f"  ·  {total:,} {noun}(s)" if total is not None else ""
+        print_page(pager.rows, f"Page {pager.page_no + 1}{pages}{counted}")
+
+        options, valid = [], ["s"]
+        if pager.has_next:
+            options.append("[N] Next page")
+            valid.append("n")
+        if pager.has_prev:
+            options.append("[P] Previous page")
+            valid.append("p")
+        options += ["[S] Page size", "[0] Back"]
+        print("  " + "   ".join(options))
+
+        choice = get_choice("Select option: ", valid)
+        if not choice:
+            return
+        if choice == "n":
+            pager.next()
+        elif choice == "p":
+            pager.prev()
+        else:
+            size = get_int_input(f"Rows per page (1-{MAX_PAGE_SIZE}): ", 1, MAX_PAGE_SIZE)
+            if size:
+                session["page_size"] = size
+                pager.resize(size)
@@ -0,0 +1,223 @@
+# Table rendering shared by the order, customer and report listings and
+# verify_queries.py.
+#
+# Rows may be a list or a generator streaming from a cursor. Columns are
+# laid out once per table: widths come from the Column spec or from the
+# header plus the first SAMPLE_ROWS rows, and each column's type is
+# inferred from that sample instead of being tested on every cell. The
+# result is a single format string per table, so a row costs one
+# str.format() call. Output is collected and written WRITE_BATCH rows at a
+# time, so printing starts after one sample window and memory stays flat.
+#
+# Long output can go through a pager: pass pager=True and set ERP_PAGER
+# (or PAGER), e.g. "less -R". It is only used on a terminal and when the
+# table is taller than the screen.
+
+import os
+import shutil
+import subprocess
+import sys
+from contextlib import contextmanager
+from itertools import chain, islice
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from modules.auth import C, warn
+
+SAMPLE_ROWS = 200
+WRITE_BATCH = 1_000
+
+
+class Column:
+    """One table column.
+
+    fmt turns a value into display text (default: str, falsy -> blank);
+    colour is an ANSI code for the whole column or a dict of display
+    text -> code. width and align default to sampled width and left.
+    """
+
+    __slots__ = ("key", "title", "width", "align", "fmt", "colour")
+
+    def __init__(self, key: str, title: str = None, width: int = None, align: str = "<",
+                 fmt=None, colour=None):
+        self.key = key
+        self.title = title if title is not None else key
+        self.width = width
+        self.align = align
+        self.fmt = fmt
+        self.colour = colour
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _layout(rows, columns, blank: str, cap: int, titles, number_colour: str) -> tuple:
+    """Sample rows and fill in widths and colours.
+
+    Returns (columns, rows, sampled); columns is None if there are no rows.
+    """
+    rows = iter(rows)
+    head = list(islice(rows, SAMPLE_ROWS))
+    if not head:
+        return None, rows, 0
+    if columns is None:
+        columns = [Column(k, titles(k)) for k in head[0].keys()]
+    else:
+        # Specs may be reused; fill in a copy
+        columns = [Column(c.key, c.title, c.width, c.align, c.fmt, c.colour) for c in columns]
+
+    for col in columns:
+        values = [row[col.key] for row in head]
+        if col.colour is None and number_colour:
+            present = [v for v in values if v is not None]
+            if present and all(_is_number(v) for v in present):
+                col.colour = number_colour
+        if col.width is None:
+            text = _text_fn(col, blank)
+            width = max([len(col.title)] + [len(text(v)) for v in values])
+            col.width = min(width, cap) if cap else width
+    return columns, chain(head, rows), len(head)
+
+
+def _text_fn(col: Column, blank: str):
+    if col.fmt is not None:
+        return col.fmt
+    return lambda v: str(v) if v else blank
+
+
+def _compile(columns, gap: str, truncate: bool) -> tuple:
+    """(row template, [(column index, colour map)]).
+
+    Columns coloured by value get an extra format slot, after the cells,
+    for the colour code looked up per row.
+    """
+    parts, lookups = [], []
+    slot = len(columns)
+    for i, col in enumerate(columns):
+        spec = f"{col.align}{col.width}" + (f".{col.width}" if truncate else "")
+        cell = "{%d:%s}" % (i, spec)
+        if isinstance(col.colour, dict):
+            parts.append("{%d}%s%s" % (slot, cell, C.RESET))
+            lookups.append((i, col.colour))
+            slot += 1
+        elif col.colour:
+            parts.append(f"{col.colour}{cell}{C.RESET}")
+        else:
+            parts.append(cell)
+    return "  " + gap.join(parts), lookups
+
+
+def _header(columns, gap: str) -> str:
+    return "  " + gap.join(f"{col.title:{col.align}{col.width}.{col.width}}" for col in columns)
+
+
+def _terminal_rows() -> int:
+    return shutil.get_terminal_size((80, 24)).lines
+
+
+@contextmanager
+def _output(pager: bool, tall: bool):
+    command = os.environ.get("ERP_PAGER") or os.environ.get("PAGER")
+    if not (pager and tall and command and sys.stdout.isatty()):
+        yield sys.stdout.write
+        return
+    sys.stdout.flush()
+    proc = subprocess.Popen(command, shell=True, stdin=subprocess.PIPE, text=True)
+    try:
+        yield proc.stdin.write
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        proc.wait()
+
+
+def _write_rows(write, rows, columns, template: str, lookups, texts) -> int:
+    count, lines = 0, []
+    keyed = list(zip(texts, (col.key for col in columns)))
+    for row in rows:
+        cells = [text(row[key]) for text, key in keyed]
+        if lookups:
+            cells += [colours.get(cells[i], "") for i, colours in lookups]
+        lines.append(template.format(*cells))
+        count += 1
+        if len(lines) >= WRITE_BATCH:
+            write("\n".join(lines) + "\n")
+            lines.clear()
+    if lines:
+        write("\n".join(lines) + "\n")
+    return count
+
+
+def _render(rows, columns, *, gap, blank, cap, truncate, titles, number_colour,
+            pager, head, foot) -> int | None:
+    """Lay out and write a table; head/foot build the text around the rows.
+
+    Returns the number of rows, or None if there were none.
+    """
+    columns, rows, sampled = _layout(rows, columns, blank, cap, titles, number_colour)
+    if columns is None:
+        return None
+    template, lookups = _compile(columns, gap, truncate)
+    texts = [_text_fn(col, blank) for col in columns]
+
+    count = 0
+    try:
+        with _output(pager, sampled > _terminal_rows() - 6) as write:
+            write(head(_header(columns, gap), columns))
+            count = _write_rows(write, rows, columns, template, lookups, texts)
+            write(foot(columns, count))
+    except BrokenPipeError:
+        pass   # pager closed early
+    finally:
+        close = getattr(rows, "close", None)
+        if close:
+            close()
+    return count
+
+
+# ── Public printers ──────────────────────────────────────────
+
+def print_table(rows, columns: list = None, *, noun: str = "record", empty: str = None,
+                footer: str = None, gap: str = "  ", blank: str = "—", cap: int = 36,
+                pager: bool = False) -> int:
+    """Print rows in the application's style.
+
+    Without columns, one column per result key is built, sized from the
+    sample and capped at cap characters; numeric columns are highlighted.
+    footer replaces the "N record(s) returned." line. Returns the number
+    of rows printed.
+    """
+    def rule(columns):
+        width = sum(col.width for col in columns) + len(gap) * (len(columns) - 1) + 2
+        return C.DIM + "─" * width + C.RESET
+
+    def head(header, columns):
+        return f"\n{C.BOLD}{header}{C.RESET}\n{rule(columns)}\n"
+
+    def foot(columns, count):
+        return f"{rule(columns)}\n  {C.DIM}{footer or f'{count} {noun}(s) returned.'}{C.RESET}\n\n"
+
+    count = _render(rows, columns, gap=gap, blank=blank, cap=cap, truncate=True,
+                    titles=str.upper, number_colour=C.CYAN if columns is None else None,
+                    pager=pager, head=head, foot=foot)
+    if count is None:
+        warn(empty or f"No {noun}s found.")
+        return 0
+    return count
+
+
+def print_plain(rows) -> int:
+    """Print rows as a plain '|'-separated grid without colour or truncation."""
+    def head(header, columns):
+        return header + "\n  " + "-+-".join("-" * col.width for col in columns) + "\n"
+
+    count = _render(rows, None, gap=" | ", blank="", cap=None, truncate=False,
+                    titles=str, number_colour=None, pager=False,
+                    head=head, foot=lambda columns, count: f"\n  [{count} row(s) returned]\n")
+    if count is None:
+        print("  (no results)")
+        return 0
+    return count
@@ -0,0 +1,142 @@
+# Result cache for the business reports.
+#
+# Results are keyed by report and arguments and stamped with the
+# table_versions counters of the tables the report reads (REPORT_SOURCES,
+# bumped by triggers from migration 10). A cached result is served while
+# those counters are unchanged — one primary-key read instead of the
+# query — and while its TTL, if any, has not run out. PRAGMA data_version
+# is not used: it is per connection and misses writes made through the
+# pooled connection doing the reading.
+#
+# The counters are read before the report runs, so a write that lands in
+# between can only make the entry look older than its data: the next call
+# sees a newer version and recomputes. A result is never served stale.
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db.database import connection
+from modules.reports import REPORT_SOURCES, REPORT_TTL
+
+MAX_ENTRIES = 64
+MAX_CACHED_ROWS = 10_000   # larger streamed results are not kept
+ALL_SOURCES = tuple(sorted({t for tables in REPORT_SOURCES.values() for t in tables}))
+
+
+def _versions(tables: tuple) -> tuple:
+    with connection() as conn:
+        found = dict(conn.execute(
+            f"SELECT name, version FROM table_versions WHERE name IN ({', '.join('?' * len(tables))})",
+            tables
+        ).fetchall())
+    return tuple(found.get(t, 0) for t in tables)
+
+
+class ReportCache:
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()    # key -> (versions, expires_at, rows), LRU order
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.invalidated = self.expired = self.evicted = 0
+
+    def _lookup(self, fn, args, kwargs) -> tuple:
+        """(key, versions, rows); rows is None unless a current entry exists."""
+        key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        versions = _versions(REPORT_SOURCES.get(fn, ALL_SOURCES))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                cached_versions, expires_at, rows = entry
+                if cached_versions != versions:
+                    self.invalidated += 1
+                elif expires_at is not None and now >= expires_at:
+                    self.expired += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return key, versions, rows
+            self.misses += 1
+        return key, versions, None
+
+    def _store(self, key, versions, fn, rows: list):
+        ttl = REPORT_TTL.get(fn)
+        with self._lock:
+            self._entries[key] = (versions, time.monotonic() + ttl if ttl else None, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def run(self, fn, *args, **kwargs) -> list:
+        """fn(*args, **kwargs), served from the cache when still current."""
+        key, versions, rows = self._lookup(fn, args, kwargs)
+        if rows is None:
+            rows = fn(*args, **kwargs)
+            self._store(key, versions, fn, rows)
+        return rows
+
+    def stream(self, fn, *args, **kwargs):
+        """Like run(), but yields rows as they are fetched (fn(..., stream=True)).
+
+        A result is only kept if it has at most MAX_CACHED_ROWS rows and was
+        read to the end.
+        """
+        key, versions, rows = self._lookup(fn, args, kwargs)
+        if rows is not None:
+            yield from rows
+            return
+        kept = []
+        for row in fn(*args, stream=True, **kwargs):
+            if kept is not None:
+                kept.append(row)
+                if len(kept) > MAX_CACHED_ROWS:
+                    kept = None
+            yield row
+        if kept is not None:
+            self._store(key, versions, fn, kept)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries":     len(self._entries),
+                "max_entries": self.max_entries,
+                "hits":        self.hits,
+                "misses":      self.misses,
+                "hit_rate":    self.hits / lookups if lookups else 0.0,
+                "invalidated": self.invalidated,
+                "expired":     self.expired,
+                "evicted":     self.evicted,
+            }
+
+
+_cache = ReportCache()
+
+
+def run_report(fn, *args, **kwargs) -> list:
+    return _cache.run(fn, *args, **kwargs)
+
+
+def stream_report(fn, *args, **kwargs):
+    return _cache.stream(fn, *args, **kwargs)
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
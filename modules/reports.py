@@ -1,10 +1,81 @@
-from db.database import get_connection
+from db.database import connection
 
-def _fetch(sql: str, params: tuple = ()) -> list:
-    conn = get_connection()
-    cur = conn.execute(sql, params)
-    rows = cur.fetchall()
-    conn.close()
+FETCH_BATCH = 500   # rows per fetchmany() when streaming
+
+# Every report takes stream=True to get a RowStream instead of a list:
+# rows are fetched FETCH_BATCH at a time, so memory stays flat however
+# large the result, and the pooled connection is held until the stream
+# is exhausted or closed. Its columns are known once the first row has
+# been asked for, even when there are no rows.
+
+def _fetch(sql: str, params: tuple = (), stream: bool = False):
+    if stream:
+        return _stream(sql, params)
+    with connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+class RowStream:
+    """Rows of a streamed query; columns is set once the query has run."""
+
+    def __init__(self, sql: str, params: tuple = (), batch_size: int = FETCH_BATCH):
+        self.columns = None
+        self._rows = self._generate(sql, params, batch_size)
+
+    def _generate(self, sql: str, params: tuple, batch_size: int):
+        with connection() as conn:
+            cursor = conn.execute(sql, params)
+            self.columns = [d[0] for d in cursor.description]
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    return
+                yield from batch
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+    def close(self):
+        self._rows.close()
+
+
+def _stream(sql: str, params: tuple = (), batch_size: int = FETCH_BATCH) -> RowStream:
+    return RowStream(sql, params, batch_size)
+
+
+# The revenue reports read the sales_by_* summary tables (migration 9), which
+# triggers keep current as orders enter and leave 'fulfilled', so they cost
+# the same however many orders there are. The raw QUERY_* versions are kept
+# as the reference; verify=True runs both and raises SummaryMismatch if they
+# disagree (see modules/sales_summary.py to rebuild).
+
+class SummaryMismatch(Exception):
+    pass
+
+
+def _same_value(a, b) -> bool:
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(a - b) <= 0.01          # summaries sum cents, raw sums floats
+    return a == b
+
+
+def _fetch_summary(summary_sql: str, raw_sql: str, verify: bool, stream: bool = False):
+    if stream and not verify:
+        return _stream(summary_sql)
+    rows = _fetch(summary_sql)
+    if verify:
+        expected = _fetch(raw_sql)
+        # Ties may come back in a different order, so compare sorted by key
+        ours = sorted((tuple(r) for r in rows), key=lambda r: str(r[0]))
+        theirs = sorted((tuple(r) for r in expected), key=lambda r: str(r[0]))
+        if len(ours) != len(theirs):
+            raise SummaryMismatch(f"{len(ours)} summary row(s), {len(theirs)} raw row(s)")
+        for a, b in zip(ours, theirs):
+            if not all(_same_value(x, y) for x, y in zip(a, b)):
+                raise SummaryMismatch(f"summary row {a} != raw row {b}")
     return rows
 
 
@@ -21,9 +92,19 @@ GROUP BY month
 ORDER BY month DESC;
 """
 
-def monthly_revenue():
+SUMMARY_MONTHLY_REVENUE = """
+SELECT
+    month,
+    orders                          AS total_orders,
+    revenue_cents / 100.0           AS revenue
+FROM sales_by_month
+WHERE orders > 0
+ORDER BY month DESC;
+"""
+
+def monthly_revenue(verify: bool = False, stream: bool = False):
     """Total fulfilled revenue grouped by calendar month."""
-    return _fetch(QUERY_MONTHLY_REVENUE)
+    return _fetch_summary(SUMMARY_MONTHLY_REVENUE, QUERY_MONTHLY_REVENUE, verify, stream)
 
 
 # ── Revenue by Department ───────────────────────────────────────────
@@ -42,9 +123,24 @@ GROUP BY d.name
 ORDER BY total_revenue DESC;
 """
 
-def revenue_by_department():
+SUMMARY_REVENUE_BY_DEPARTMENT = """
+SELECT
+    d.name                          AS department,
+    SUM(s.orders)                   AS orders_processed,
+    SUM(s.revenue_cents) / 100.0    AS total_revenue,
+    ROUND(SUM(s.revenue_cents) / 100.0 / SUM(s.orders), 2)
+                                    AS avg_order_value
+FROM sales_by_employee s
+JOIN employees e ON s.employee_id = e.id
+JOIN departments d ON e.department_id = d.id
+WHERE s.orders > 0
+GROUP BY d.name
+ORDER BY total_revenue DESC;
+"""
+
+def revenue_by_department(verify: bool = False, stream: bool = False):
     """Which departments are driving the most fulfilled revenue."""
-    return _fetch(QUERY_REVENUE_BY_DEPARTMENT)
+    return _fetch_summary(SUMMARY_REVENUE_BY_DEPARTMENT, QUERY_REVENUE_BY_DEPARTMENT, verify, stream)
 
 
 # ── Top 5 Customers by Spend ────────────────────────────────────────
@@ -64,9 +160,9 @@ ORDER BY lifetime_spend DESC
 LIMIT 5;
 """
 
-def top_customers():
+def top_customers(stream: bool = False):
     """Top 5 customers ranked by total lifetime spend."""
-    return _fetch(QUERY_TOP_CUSTOMERS)
+    return _fetch(QUERY_TOP_CUSTOMERS, stream=stream)
 
 
 # ── Inactive Customer Accounts (90+ days no order) ──────────────────
@@ -77,19 +173,19 @@ SELECT
     c.email,
     c.region,
     c.last_order,
-    CAST(JULIANDAY('now') - JULIANDAY(c.last_order)
+    CAST(JULIANDAY(?) - JULIANDAY(c.last_order)
          AS INTEGER)                                    AS days_since_order,
     CASE WHEN c.is_active = 1 THEN 'Active'
          ELSE 'Deactivated' END                         AS account_status
 FROM customers c
 WHERE c.last_order IS NULL
-   OR JULIANDAY('now') - JULIANDAY(c.last_order) > 90
+   OR JULIANDAY(?) - JULIANDAY(c.last_order) > 90
 ORDER BY days_since_order DESC;
 """
 
-def inactive_customers():
-    """Customers with no order activity in the last 90+ days."""
-    return _fetch(QUERY_INACTIVE_CUSTOMERS)
+def inactive_customers(stream: bool = False, as_of: str = "now"):
+    """Customers with no order activity in the 90+ days before as_of (default today)."""
+    return _fetch(QUERY_INACTIVE_CUSTOMERS, (as_of, as_of), stream=stream)
 
 
 # ── Employee Order Performance ──────────────────────────────────────
@@ -111,30 +207,48 @@ GROUP BY e.id
 ORDER BY orders_handled DESC;
 """
 
-def employee_performance():
+SUMMARY_EMPLOYEE_PERFORMANCE = """
+SELECT
+    e.first_name || ' ' || e.last_name  AS employee,
+    d.name                              AS department,
+    r.name                              AS role,
+    COALESCE(s.orders, 0)               AS orders_handled,
+    CASE WHEN s.orders > 0 THEN s.revenue_cents / 100.0 END
+                                        AS total_value,
+    CASE WHEN s.orders > 0 THEN ROUND(s.revenue_cents / 100.0 / s.orders, 2) END
+                                        AS avg_order_value
+FROM employees e
+JOIN departments d ON e.department_id = d.id
+JOIN roles r ON e.role_id = r.id
+LEFT JOIN sales_by_employee s ON s.employee_id = e.id
+WHERE e.is_active = 1
+ORDER BY orders_handled DESC, e.id;
+"""
+
+def employee_performance(verify: bool = False, stream: bool = False):
     """How many orders and total value each active employee has processed."""
-    return _fetch(QUERY_EMPLOYEE_PERFORMANCE)
+    return _fetch_summary(SUMMARY_EMPLOYEE_PERFORMANCE, QUERY_EMPLOYEE_PERFORMANCE, verify, stream)
 
 
 # ── Low Stock Product Alert ─────────────────────────────────────────
 
 QUERY_LOW_STOCK = """
 SELECT
-    name                            AS product,
+    product,
     category,
-    stock_qty                       AS current_stock,
-    reorder_lvl                     AS reorder_level,
-    reorder_lvl - stock_qty         AS units_below_threshold,
+    current_stock,
+    reorder_level,
+    units_below_threshold,
+    backordered,
+    suggested_qty,
     unit_price
-FROM products
-WHERE stock_qty < reorder_lvl
-  AND reorder_lvl > 0              -- exclude service items
+FROM reorder_suggestions            -- trigger-maintained reorder queue
 ORDER BY units_below_threshold DESC;
 """
 
-def low_stock_alert():
-    """Products whose stock quantity is below their reorder threshold."""
-    return _fetch(QUERY_LOW_STOCK)
+def low_stock_alert(stream: bool = False):
+    """Products whose available stock is below their reorder threshold."""
+    return _fetch(QUERY_LOW_STOCK, stream=stream)
 
 
 # ── Orders by Status ─────────────────────────────────────────────────
@@ -152,9 +266,9 @@ GROUP BY status
 ORDER BY order_count DESC;
 """
 
-def orders_by_status():
+def orders_by_status(stream: bool = False):
     """Breakdown of all orders grouped by fulfillment status."""
-    return _fetch(QUERY_ORDERS_BY_STATUS)
+    return _fetch(QUERY_ORDERS_BY_STATUS, stream=stream)
 
 
 # ── Average Order Value by Region ────────────────────────────────────
@@ -173,9 +287,24 @@ GROUP BY c.region
 ORDER BY total_revenue DESC;
 """
 
-def aov_by_region():
+SUMMARY_AOV_BY_REGION = """
+SELECT
+    c.region,
+    SUM(s.orders)                   AS total_orders,
+    SUM(s.revenue_cents) / 100.0    AS total_revenue,
+    ROUND(SUM(s.revenue_cents) / 100.0 / SUM(s.orders), 2)
+                                    AS avg_order_value,
+    MAX(s.largest_order)            AS largest_order
+FROM sales_by_customer s
+JOIN customers c ON s.customer_id = c.id
+WHERE s.orders > 0
+GROUP BY c.region
+ORDER BY total_revenue DESC;
+"""
+
+def aov_by_region(verify: bool = False, stream: bool = False):
     """Average order value and total revenue broken down by customer region."""
-    return _fetch(QUERY_AOV_BY_REGION)
+    return _fetch_summary(SUMMARY_AOV_BY_REGION, QUERY_AOV_BY_REGION, verify, stream)
 
 
 # ── Department Headcount & Average Salary ───────────────────────────
@@ -196,9 +325,9 @@ GROUP BY d.id
 ORDER BY headcount DESC;
 """
 
-def dept_headcount():
+def dept_headcount(stream: bool = False):
     """Headcount, salary averages, and payroll as a % of department budget."""
-    return _fetch(QUERY_DEPT_HEADCOUNT)
+    return _fetch(QUERY_DEPT_HEADCOUNT, stream=stream)
 
 
 # ── Role-Based Access Audit ────────────────────────────────────────
@@ -220,9 +349,9 @@ WHERE r.permission_level >= 4
 ORDER BY r.permission_level DESC, d.name;
 """
 
-def access_audit():
+def access_audit(stream: bool = False):
     """Employees with elevated permissions (level 4–5) for security review."""
-    return _fetch(QUERY_ACCESS_AUDIT)
+    return _fetch(QUERY_ACCESS_AUDIT, stream=stream)
 
 
 # ── Query Registry (used by CLI menu) ────────────────────────────────────────
@@ -239,3 +368,28 @@ REPORT_MENU = [
     ("Department Headcount & Salary",  dept_headcount),
     ("Role-Based Access Audit",        access_audit),
 ]
+
+
+# ── Cache metadata (used by modules/report_cache.py) ─────────────────────────
+
+# Tables each report reads; its cached result is reused until one of their
+# table_versions counters moves. The sales_by_* summaries change only with
+# orders.
+REPORT_SOURCES = {
+    monthly_revenue:       ("orders",),
+    revenue_by_department: ("orders", "employees", "departments"),
+    top_customers:         ("orders", "customers"),
+    inactive_customers:    ("customers",),
+    employee_performance:  ("orders", "employees", "departments", "roles"),
+    low_stock_alert:       ("products",),
+    orders_by_status:      ("orders",),
+    aov_by_region:         ("orders", "customers"),
+    dept_headcount:        ("departments", "employees"),
+    access_audit:          ("employees", "roles", "departments"),
+}
+
+# Seconds a result stays valid even without changes, for reports that
+# depend on the current date.
+REPORT_TTL = {
+    inactive_customers: 300,
+}
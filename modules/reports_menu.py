@@ -3,53 +3,17 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from modules.auth import (
-    require_permission, print_header, warn, pause, divider, get_choice, C
+    require_permission, print_header, pause, divider, get_choice, C
 )
 from modules.reports import REPORT_MENU
+from modules.report_cache import stream_report, cache_stats
+from modules.render import print_table
 
 FINANCIAL_REPORT_INDEXES = {0, 1, 8, 9}  # Monthly Revenue, Dept Revenue, Dept Payroll, Access Audit
 
-def _print_report(label: str, rows: list):
-    print(f"\n  {C.BOLD}{C.CYAN}{label}{C.RESET}\n")
-
-    if not rows:
-        warn("No data returned for this report.")
-        return
-
-    keys = list(rows[0].keys())
-
-    # Calculate column widths from headers and data
-    widths = {k: len(str(k)) for k in keys}
-    for row in rows:
-        for k in keys:
-            widths[k] = max(widths[k], len(str(row[k] or "—")))
-
-    # Cap column at 36 chars
-    for k in widths:
-        widths[k] = min(widths[k], 36)
-
-    def fmt(val, width):
-        return str(val or "—")[:width].ljust(width)
-
-    # Header row
-    divider("─", sum(widths.values()) + len(keys) * 3 + 2)
-    print(C.BOLD + "  " + "   ".join(str(k).upper()[:widths[k]].ljust(widths[k]) for k in keys) + C.RESET)
-    divider("─", sum(widths.values()) + len(keys) * 3 + 2)
-
-    for row in rows:
-        parts = []
-        for k in keys:
-            val = row[k]
-            raw = str(val or "—")[:widths[k]]
-            try:
-                float(str(val).replace(",", "").replace("$", ""))
-                parts.append(f"{C.CYAN}{raw.ljust(widths[k])}{C.RESET}")
-            except (ValueError, TypeError):
-                parts.append(raw.ljust(widths[k]))
-        print("  " + "   ".join(parts))
-
-    divider("─", sum(widths.values()) + len(keys) * 3 + 2)
-    print(f"  {C.DIM}{len(rows)} row(s) returned.{C.RESET}\n")
+def _print_report(label: str, rows):
+    print(f"\n  {C.BOLD}{C.CYAN}{label}{C.RESET}")
+    print_table(rows, gap="   ", noun="row", empty="No data returned for this report.", pager=True)
 
 
 def _run_report(session: dict, index: int):
@@ -63,8 +27,7 @@ def _run_report(session: dict, index: int):
         return
 
     print_header(session)
-    rows = fn()
-    _print_report(label, rows)
+    _print_report(label, stream_report(fn))
     pause()
 
 
@@ -92,6 +55,12 @@ def reports_menu(session: dict):
 
         print()
         print(f"  {C.DIM}[ 0] Back to Main Menu{C.RESET}")
+        if session["level"] >= 5:
+            stats = cache_stats()
+            print(f"\n  {C.DIM}Report cache: {stats['entries']}/{stats['max_entries']} entries, "
+                  f"{stats['hits']} hit(s), {stats['misses']} miss(es) ({stats['hit_rate']:.0%}), "
+                  f"{stats['invalidated']} invalidated, {stats['expired']} expired, "
+                  f"{stats['evicted']} evicted{C.RESET}")
         divider()
 
         valid = ["0"]
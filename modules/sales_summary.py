@@ -0,0 +1,95 @@
+# Sales summary tables behind the revenue reports.
+#
+# sales_by_month, sales_by_employee and sales_by_customer hold fulfilled
+# order counts and revenue (in cents), maintained by triggers on orders
+# (migration 9). Department and region totals are rolled up from the
+# employee and customer rows at report time. rebuild_summaries()
+# regenerates all three from orders — after a bulk load with triggers
+# bypassed, or if verify finds drift.
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from db.database import initialize_db, transaction
+from modules.reports import (
+    SummaryMismatch, monthly_revenue, revenue_by_department,
+    employee_performance, aov_by_region,
+)
+
+SUMMARY_REPORTS = [
+    ("Monthly Revenue",            monthly_revenue),
+    ("Revenue by Department",      revenue_by_department),
+    ("Employee Order Performance", employee_performance),
+    ("Avg Order Value by Region",  aov_by_region),
+]
+
+
+def rebuild_summaries(conn) -> dict:
+    """Recompute every summary row from orders. Write unit: never commits."""
+    conn.execute("DELETE FROM sales_by_month")
+    conn.execute("DELETE FROM sales_by_employee")
+    conn.execute("DELETE FROM sales_by_customer")
+    conn.execute("""
+        INSERT INTO sales_by_month (month, orders, revenue_cents)
+        SELECT STRFTIME('%Y-%m', created_at), COUNT(*), SUM(CAST(ROUND(total_amount * 100) AS INTEGER))
+        FROM orders WHERE status = 'fulfilled'
+        GROUP BY 1
+    """)
+    conn.execute("""
+        INSERT INTO sales_by_employee (employee_id, orders, revenue_cents)
+        SELECT employee_id, COUNT(*), SUM(CAST(ROUND(total_amount * 100) AS INTEGER))
+        FROM orders WHERE status = 'fulfilled'
+        GROUP BY employee_id
+    """)
+    conn.execute("""
+        INSERT INTO sales_by_customer (customer_id, orders, revenue_cents, largest_order)
+        SELECT customer_id, COUNT(*), SUM(CAST(ROUND(total_amount * 100) AS INTEGER)), MAX(total_amount)
+        FROM orders WHERE status = 'fulfilled'
+        GROUP BY customer_id
+    """)
+    return {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ("sales_by_month", "sales_by_employee", "sales_by_customer")
+    }
+
+
+def verify_summaries() -> list:
+    """Run each summary-backed report against its raw query.
+
+    Returns (label, error) pairs; error is None when the report matches.
+    """
+    results = []
+    for label, fn in SUMMARY_REPORTS:
+        try:
+            fn(verify=True)
+            results.append((label, None))
+        except SummaryMismatch as e:
+            results.append((label, str(e)))
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild or verify the sales summary tables")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    args = parser.parse_args()
+    initialize_db()
+
+    if args.command == "rebuild":
+        started = time.perf_counter()
+        with transaction(immediate=True) as conn:
+            counts = rebuild_summaries(conn)
+        print(f"[REPORTS] Rebuilt {counts['sales_by_month']} month, {counts['sales_by_employee']} employee "
+              f"and {counts['sales_by_customer']} customer row(s) in {time.perf_counter() - started:.2f}s.")
+    else:
+        failed = 0
+        for label, error in verify_summaries():
+            print(f"[REPORTS] {label}: {'OK' if error is None else 'MISMATCH — ' + error}")
+            failed += error is not None
+        if failed:
+            print(f"[REPORTS] {failed} report(s) differ; run 'rebuild' to regenerate the summaries.")
+            sys.exit(1)
@@ -2,8 +2,36 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
 
-from db.database import initialize_db
+# Runs the business queries as a verification pass — e.g. after a data
+# migration. Queries run concurrently, each worker thread on its own pooled
+# connection opened with the read-only-analytics profile. Every result is
+# timed and its digest compared with the golden digests recorded for the
+# dataset; the exit status is 1 on any mismatch or latency budget breach.
+#
+#   python verify_queries.py                  verify against verify_golden.json
+#   python verify_queries.py --record         record golden digests for the dataset
+#   python verify_queries.py --show           also print every result
+
+import argparse
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from db.database import initialize_db, set_profile
 from modules.reports import REPORT_MENU
+from modules.render import print_plain
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'verify_golden.json')
+DEFAULT_WORKERS = 4
+DEFAULT_BUDGET_MS = 1_000
+
+# Date-dependent reports run as of a fixed day, so their rows and
+# digests do not drift with the calendar
+REFERENCE_DATE = "2025-01-01"
+PINNED_ARGS = {
+    "inactive_customers": {"as_of": REFERENCE_DATE},
+}
 
 
 def print_divider(title: str):
@@ -12,34 +40,133 @@ def print_divider(title: str):
     print("=" * 65)
 
 
-def print_rows(rows):
-    if not rows:
-        print("  (no results)")
-        return
-    # Print column headers
-    keys = rows[0].keys()
-    col_widths = {k: max(len(str(k)), max(len(str(row[k] or '')) for row in rows))
-                  for k in keys}
-    header = "  " + " | ".join(str(k).ljust(col_widths[k]) for k in keys)
-    sep    = "  " + "-+-".join("-" * col_widths[k] for k in keys)
-    print(header)
-    print(sep)
-    for row in rows:
-        print("  " + " | ".join(str(row[k] or '').ljust(col_widths[k]) for k in keys))
-    print(f"\n  [{len(rows)} row(s) returned]")
+class Digest:
+    """Order-insensitive digest of a result, built one row at a time.
+
+    Row hashes are summed, so the digest needs constant memory and a plan
+    change that returns ties in a different order is not a mismatch.
+    Floats are compared to the cent for the same reason (summation order).
+    """
+
+    def __init__(self):
+        self.keys = None
+        self.count = 0
+        self._sum = 0
+
+    def add(self, row):
+        if self.keys is None:
+            self.keys = list(row.keys())
+        line = json.dumps([f"{row[k]:.2f}" if isinstance(row[k], float) else row[k]
+                           for k in self.keys])
+        self._sum = (self._sum + int(hashlib.sha256(line.encode()).hexdigest()[:32], 16)) % 2**128
+        self.count += 1
+
+    def hexdigest(self) -> str:
+        body = f"{json.dumps(self.keys or [])}\n{self.count}\n{self._sum:032x}"
+        return hashlib.sha256(body.encode()).hexdigest()[:16]
+
+
+def run_query(index: int, label: str, fn, keep_rows: bool = False) -> dict:
+    digest = Digest()
+    kept = [] if keep_rows else None
+    started = time.perf_counter()
+    for row in fn(stream=True, **PINNED_ARGS.get(fn.__name__, {})):
+        digest.add(row)
+        if kept is not None:
+            kept.append(row)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return {
+        "index":  index,
+        "label":  label,
+        "rows":   kept,
+        "count":  digest.count,
+        "ms":     elapsed_ms,
+        "digest": digest.hexdigest(),
+    }
+
+
+def run_all(workers: int, keep_rows: bool = False) -> list:
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_query, i, label, fn, keep_rows)
+                   for i, (label, fn) in enumerate(REPORT_MENU, 1)]
+        return [f.result() for f in futures]
+
+
+def load_golden(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_golden(path: str, dataset: str, results: list):
+    golden = load_golden(path)
+    golden[dataset] = {r["label"]: {"rows": r["count"], "digest": r["digest"]} for r in results}
+    with open(path, 'w') as f:
+        json.dump(golden, f, indent=2, sort_keys=True)
+        f.write("\n")
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run and verify the business queries")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent queries")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="latency budget per query")
+    parser.add_argument("--dataset", default="seed",
+                        help="name the golden digests are stored under (default: seed)")
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="golden digest file")
+    parser.add_argument("--record", action="store_true", help="record digests instead of verifying")
+    parser.add_argument("--show", action="store_true",
+                        help="print every result (results are then held in memory)")
+    args = parser.parse_args()
+
     print("\n[ERP SIMULATION] Initializing database...")
     initialize_db(seed=True)
+    set_profile("read-only-analytics")
+
+    print(f"\n[ERP SIMULATION] Running all {len(REPORT_MENU)} business queries "
+          f"({args.workers} worker(s))...\n")
+
+    started = time.perf_counter()
+    results = run_all(args.workers, keep_rows=args.show)
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    if args.show:
+        for r in results:
+            print_divider(f"Query {r['index']:02d}: {r['label']}")
+            print_plain(r["rows"])
+
+    if args.record:
+        save_golden(args.golden, args.dataset, results)
+        print(f"[ERP SIMULATION] Recorded {len(results)} digest(s) for dataset "
+              f"'{args.dataset}' in {os.path.basename(args.golden)}.")
+        sys.exit(0)
 
-    print("\n[ERP SIMULATION] Running all 10 business queries...\n")
+    golden = load_golden(args.golden).get(args.dataset)
+    if golden is None:
+        print(f"[ERP SIMULATION] No golden digests for dataset '{args.dataset}'; "
+              f"digests are not checked (use --record).")
+        golden = {}
 
-    for i, (label, fn) in enumerate(REPORT_MENU, 1):
-        print_divider(f"Query {i:02d}: {label}")
-        rows = fn()
-        print_rows(rows)
+    failures = 0
+    print(f"  {'#':>2}  {'QUERY':<30}  {'ROWS':>6}  {'MS':>8}  {'DIGEST':<16}  RESULT")
+    print("  " + "-" * 80)
+    for r in results:
+        problems = []
+        expected = golden.get(r["label"])
+        if expected is not None and expected["digest"] != r["digest"]:
+            problems.append(f"digest differs (golden {expected['rows']} row(s))")
+        if r["ms"] > args.budget_ms:
+            problems.append(f"over {args.budget_ms:g} ms budget")
+        status = "; ".join(problems) or ("OK" if expected is not None else "unchecked")
+        failures += bool(problems)
+        print(f"  {r['index']:>2}  {r['label'][:30]:<30}  {r['count']:>6}  {r['ms']:>8.1f}  "
+              f"{r['digest']:<16}  {status}")
 
     print("\n" + "=" * 65)
-    print("  All 10 queries executed successfully.")
+    if failures:
+        print(f"  {failures} of {len(results)} queries FAILED verification ({wall_ms:.0f} ms wall).")
+    else:
+        print(f"  All {len(results)} queries executed successfully ({wall_ms:.0f} ms wall).")
     print("=" * 65 + "\n")
+    sys.exit(1 if failures else 0)